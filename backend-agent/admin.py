@@ -1,46 +1,40 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from firebase_admin import credentials, db
+import cache_sync
+import entity_index
+import refresh_coordinator
+import storage
 
 ADMIN_CACHE = {}
+ADMIN_INDEX = entity_index.EntityIndex('fullName')
 
-# Initialize FastAPI
-app = FastAPI()
-
-# Handle CORS (This allows your Angular app to talk to this server)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 1. INITIALIZE FIREBASE
-# Use the automatic credentials (no file needed)
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app'
-    }) #fuel-flow-india-default-rtdb.asia-southeast1.firebasedatabase.app
-except Exception as e:
-    print(f"Firebase Init Error in ADMIN: {e}")
+def set_admin_cache(snapshot):
+    """Replaces the cache and rebuilds its name index"""
+    global ADMIN_CACHE
+    ADMIN_CACHE = snapshot
+    ADMIN_INDEX.build(snapshot)
 
-def refresh_admin_cache():
+def fetch_admin_cache():
     """Fetches all admins from /admin and stores them in memory"""
-    global ADMIN_CACHE
     try:
         print("Refreshing Admin Cache...")
-        ref = db.reference('admin')
+        ref = storage.reference('admin')
         snapshot = ref.get()
         if snapshot:
-            ADMIN_CACHE = snapshot
+            ADMIN_SYNC.load(snapshot)
             print(f"Loaded {len(snapshot)} admins.")
         else:
             print("No admins found in admin")
     except Exception as e:
         print(f"Error fetching admins: {e}")
 
-refresh_admin_cache()
+# Keeps the cache current from /admin listener deltas once main starts the sync engine
+ADMIN_SYNC = cache_sync.SyncedCache('admin', lambda: ADMIN_CACHE, set_admin_cache, ADMIN_INDEX, lambda: refresh_admin_cache())
+
+# All callers share one in-flight download of /admin (see refresh_coordinator)
+ADMIN_REFRESH = refresh_coordinator.RefreshCoordinator('admin', fetch_admin_cache, lambda: ADMIN_SYNC.live)
+
+def refresh_admin_cache(force=False):
+    """Refreshes the cache, joining a refresh already in flight instead of downloading again"""
+    return ADMIN_REFRESH.refresh(force=force)
 
 def find_admin_by_name(search_name):
     """Searches the in-memory cache for an admin name"""
@@ -49,23 +43,24 @@ def find_admin_by_name(search_name):
     # If cache is empty, try to refresh it once
     if not ADMIN_CACHE:
         refresh_admin_cache()
+    else:
+        ADMIN_REFRESH.revalidate()
 
-    search_lower = search_name.lower()
-    search_response = []
+    # Substring match served by the precomputed name index (same order as the bucket)
+    search_response = ADMIN_INDEX.search(search_name)
 
-    # Iterate through the bucket structure
-    # Structure: { "USER_ID": { "data": { "fullName": "...", ... }, "others": ... } }
-    for user_id, record in ADMIN_CACHE.items():
-        user_data = record.get('data', {})
-        full_name = user_data.get('fullName', '')
-        
-        # Check for name match
-        if full_name and search_lower in full_name.lower():
-            search_response.append(user_data)
-        
     return search_response if len(search_response) > 0 else None 
     # Returns the inner 'data' object which has userId, address, etc.
 
+def match_admin_by_name(search_name, k=5, within=None):
+    """Ranks cached admins (or only `within`) against a possibly misspelled name, best first with confidence scores"""
+    if not search_name: return []
+
+    if not ADMIN_CACHE:
+        refresh_admin_cache()
+
+    return ADMIN_INDEX.top_k(search_name, k, within)
+
 def execute_get_admin_details(admin_name):
     """Logic to search cache and return object"""
     admin = find_admin_by_name(admin_name)
@@ -0,0 +1,226 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import math
+import os
+import re
+import time
+from collections import OrderedDict, deque
+
+import fast_path
+
+# Admission control in front of the model.
+# offload.MODEL caps the threads calling Vertex AI, but every other request still queued without
+# limit, first come first served, so a spike at shift change queued up far past the timeout and
+# exhausted the quota for everyone at once. Here a request that needs the model first takes a
+# token from its user's bucket (MODEL_RATE per second, bursts of MODEL_BURST), then waits for one
+# of MAX_CONCURRENCY slots in a bounded queue where messages that look like writes go ahead of
+# lookups. A request that cannot be served soon is rejected right away with a retry-after
+# (rate limited, queue full, or waited MAX_WAIT seconds) instead of timing out late.
+#
+# Set ADMISSION_CONTROL=0 to pass every request straight through (old behaviour)
+
+ENABLED = os.environ.get("ADMISSION_CONTROL", "1") == "1"
+
+MAX_CONCURRENCY = int(os.environ.get("MODEL_ADMISSION_CONCURRENCY", os.environ.get("MODEL_CONCURRENCY", "8")))
+MAX_QUEUE = int(os.environ.get("MODEL_QUEUE_DEPTH", "32"))
+MAX_WAIT = float(os.environ.get("MODEL_QUEUE_WAIT", "20"))      # seconds
+RATE = float(os.environ.get("MODEL_RATE", "0.5"))               # requests per second per user, 0 = unlimited
+BURST = int(os.environ.get("MODEL_BURST", "5"))
+MAX_TENANTS = 10000
+MAX_RETRY_AFTER = 60
+WAIT_SAMPLES = 1000
+
+WRITE = 0       # lower runs first
+LOOKUP = 1
+PRIORITY_NAMES = {WRITE: "write", LOOKUP: "lookup"}
+
+# Quantities and delivery verbs mark a message that will most likely log or change entries
+WRITE_HINT = re.compile(
+    rf'\d|\b(?:{fast_path.SENT_VERBS}|deliver|got|took|collected|received|returned|paid|payment|log|logged|note|move|moved)\b',
+    re.IGNORECASE
+)
+
+USER_HEADER = "x-user-id"
+USER_FIELD = "userId"
+
+REASONS = {
+    "rateLimited": "Too many messages from this user",
+    "queueFull": "The assistant is busy",
+    "timedOut": "The assistant is busy",
+}
+
+
+class Rejected(Exception):
+    """The request was not admitted; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{REASONS[reason]}, please retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def priority_of(message):
+    return WRITE if WRITE_HINT.search(str(message or '')) else LOOKUP
+
+
+def tenant_of(headers, body=None, fallback=None):
+    """Whose bucket a request draws from: X-User-Id / "userId", else `fallback` (session or client address)"""
+    tenant = (headers or {}).get(USER_HEADER)
+    if not tenant and isinstance(body, dict):
+        tenant = body.get(USER_FIELD)
+    return str(tenant or fallback or "anonymous")[:100]
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        """0 if a token was taken, else the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Scheduler:
+    """Per-user token buckets plus MAX_CONCURRENCY slots behind a bounded priority queue"""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE, max_wait=MAX_WAIT, rate=RATE,
+                 burst=BURST, max_tenants=MAX_TENANTS, enabled=ENABLED, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.rate = rate
+        self.burst = burst
+        self.max_tenants = max_tenants
+        self.enabled = enabled
+        self.clock = clock
+        self.active = 0
+        self._waiting = []              # heap of [priority, sequence, future]
+        self._sequence = itertools.count()
+        self._buckets = OrderedDict()   # tenant -> TokenBucket, least recently used first
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.service_seconds = 2.0      # moving average of how long a slot is held
+        self.peak_queued = 0
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.queued = 0
+        self.rejected = {reason: 0 for reason in REASONS}
+
+    def _take_token(self, tenant, now):
+        if self.rate <= 0 or tenant is None:
+            return
+        bucket = self._buckets.get(tenant)
+        if bucket is None:
+            bucket = self._buckets[tenant] = TokenBucket(self.rate, self.burst, now)
+            while len(self._buckets) > self.max_tenants:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(tenant)
+        wait = bucket.take(now)
+        if wait:
+            self._reject("rateLimited", wait)
+
+    def _reject(self, reason, wait):
+        self.rejected[reason] += 1
+        raise Rejected(reason, min(MAX_RETRY_AFTER, max(1, math.ceil(wait))))
+
+    def _queue_wait(self):
+        """Roughly how long the queue takes to drain"""
+        return self.service_seconds * (len(self._waiting) + 1) / max(self.max_concurrency, 1)
+
+    async def acquire(self, priority=LOOKUP, tenant=None):
+        """Waits for a slot; raises Rejected when rate limited, the queue is full or the wait is too long"""
+        now = self.clock()
+        self._take_token(tenant, now)
+        if self.active < self.max_concurrency and not self._waiting:
+            self.active += 1
+            self._admitted(priority, 0.0)
+            return
+        if len(self._waiting) >= self.max_queue:
+            self._reject("queueFull", self._queue_wait())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._waiting, entry)
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, len(self._waiting))
+        try:
+            # release() hands its slot over by resolving the future (active stays counted)
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            self._reject("timedOut", self._queue_wait())
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release(0.0)     # handed a slot just as the request was cancelled
+            else:
+                self._discard(entry)
+            raise
+        self._admitted(priority, self.clock() - now)
+
+    def _discard(self, entry):
+        if entry in self._waiting:
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+
+    def _admitted(self, priority, waited):
+        self.admitted[PRIORITY_NAMES[priority]] += 1
+        self._waits.append(waited)
+
+    def release(self, held):
+        """Frees a slot, handing it to the highest-priority waiter (oldest first within a priority)"""
+        if held:
+            self.service_seconds += 0.2 * (held - self.service_seconds)
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority=LOOKUP, tenant=None):
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(priority, tenant)
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.release(self.clock() - started)
+
+    def stats(self):
+        waits = sorted(self._waits)
+
+        def percentile(fraction):
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 3) if waits else None
+
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "maxConcurrency": self.max_concurrency,
+            "queueDepth": len(self._waiting),
+            "maxQueue": self.max_queue,
+            "peakQueueDepth": self.peak_queued,
+            "maxWait": self.max_wait,
+            "admitted": dict(self.admitted),
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "waitSeconds": {"p50": percentile(0.5), "p95": percentile(0.95), "max": round(waits[-1], 3) if waits else None},
+            "serviceSeconds": round(self.service_seconds, 3),
+            "tenants": len(self._buckets),
+            "rate": self.rate,
+            "burst": self.burst
+        }
+
+
+SCHEDULER = Scheduler()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import random
+import time
+
+# Benchmark for the columnar analytics engine: the same questions answered by a per-object loop over
+# the transaction dicts (what the dashboard does today) and by columnar.SNAPSHOT.aggregate.
+#
+#   python bench_analytics.py --transactions 1000000
+
+os.environ["CACHE_SYNC"] = "0"
+
+PRODUCTS = [("P0", "LPG 14KG", 900), ("P1", "LPG 19KG", 1500), ("P2", "Oxygen", 400), ("P3", "Nitrogen", 700)]
+
+
+def generate(count, customers, delivery_persons):
+    """Transactions shaped like /transactionList; shared sub-dicts keep 1M of them within a few GB"""
+    rng = random.Random(1)
+    customer_list = [{"userId": f"C{i}", "fullName": f"Customer {i}"} for i in range(customers)]
+    product_list = [{"productId": product_id, "name": name, "rate": rate} for product_id, name, rate in PRODUCTS]
+    cache = {}
+    for i in range(count):
+        lines = [{"productData": product_data, "sentUnits": rng.randint(1, 10), "recievedUnits": rng.randint(0, 5)}
+                 for product_data in rng.sample(product_list, rng.randint(1, 2))]
+        total = sum(line['sentUnits'] * line['productData']['rate'] for line in lines)
+        key = f"T{i:07d}"
+        cache[key] = {"data": {
+            "transactionId": key,
+            "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.choice((2024, 2025))}",
+            "customer": rng.choice(customer_list),
+            "deliveryBoyList": [{"userId": f"D{rng.randrange(delivery_persons)}", "deliveryDone": []}],
+            "selectedProducts": lines,
+            "total": total,
+            "payment": rng.choice((0, total, total // 2))
+        }}
+    return cache
+
+
+def loop_product_sold_by(cache, product_id, delivery_id, date_from, date_to):
+    total = 0
+    for record in cache.values():
+        data = record['data']
+        day, month, year = (int(part) for part in data['date'].split('/'))
+        if not date_from <= year * 10000 + month * 100 + day <= date_to:
+            continue
+        if data['deliveryBoyList'][0]['userId'] != delivery_id:
+            continue
+        for line in data['selectedProducts']:
+            if line['productData']['productId'] == product_id:
+                total += line['sentUnits']
+    return total
+
+
+def loop_due_above(cache, threshold):
+    due = {}
+    for record in cache.values():
+        data = record['data']
+        customer_id = data['customer']['userId']
+        due[customer_id] = due.get(customer_id, 0) + data['total'] - data['payment']
+    return sorted((value for value in due.values() if value > threshold), reverse=True)
+
+
+def loop_monthly_sent(cache):
+    months = {}
+    for record in cache.values():
+        data = record['data']
+        _, month, year = data['date'].split('/')
+        key = int(year + month)
+        months[key] = months.get(key, 0) + sum(line['sentUnits'] for line in data['selectedProducts'])
+    return months
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Per-object loops vs the columnar snapshot")
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--delivery-persons", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import storage
+    storage.use(storage.MemoryStorage())
+    import columnar
+
+    started = time.perf_counter()
+    cache = generate(args.transactions, args.customers, args.delivery_persons)
+    print(f"generated {len(cache):,} transactions in {time.perf_counter() - started:.1f}s")
+
+    snapshot = columnar.ColumnarSnapshot()
+    _, build = timed(lambda: snapshot.build(cache), 1)
+    print(f"columnar build: {build:.2f}s ({len(snapshot.lines):,} line rows)")
+
+    questions = [
+        ("LPG 14KG sold by D3 in Q3 2025",
+         lambda: loop_product_sold_by(cache, "P0", "D3", 20250701, 20250930),
+         lambda: snapshot.aggregate('sent', filters={'product': "P0", 'deliveryPerson': "D3"},
+                                    date_from=20250701, date_to=20250930)[0]['value']),
+        ("customers with due above 5000",
+         lambda: loop_due_above(cache, 5000),
+         lambda: [row['value'] for row in snapshot.aggregate('due', 'customer', min_value=5000)]),
+        ("units sent per month",
+         lambda: loop_monthly_sent(cache),
+         lambda: {row['key']: row['value'] for row in snapshot.aggregate('sent', 'month')}),
+    ]
+    print(f"{'question':<34} {'loop ms':>10} {'columnar ms':>12} {'speedup':>8}")
+    for title, loop, vectorized in questions:
+        expected, loop_seconds = timed(loop, args.repeat)
+        actual, columnar_seconds = timed(vectorized, args.repeat)
+        assert expected == actual, title
+        print(f"{title:<34} {loop_seconds * 1000:>10.1f} {columnar_seconds * 1000:>12.1f} "
+              f"{loop_seconds / columnar_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
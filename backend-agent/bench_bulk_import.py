@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# Benchmark for /transactions/bulk: streams a generated CSV through bulk_import.import_stream
+# against the in-memory storage backend and reports rows/second.
+#
+#   python bench_bulk_import.py --rows 100000 --customers 5000 --db-latency 0.05
+
+os.environ["CACHE_SYNC"] = "0"
+
+PRODUCTS = [("LPG 14KG", 900), ("LPG 19KG", 1500), ("Oxygen", 400), ("Nitrogen", 700)]
+FIRST_NAMES = ["Rakesh", "Ramesh", "Sweta", "Harsh", "Animesh", "Priya", "Sunil", "Kavita", "Manoj", "Anita"]
+LAST_NAMES = ["Gupta", "Kumar", "Sharma", "Das", "Verma", "Singh", "Yadav", "Patel", "Jain", "Mehta"]
+
+
+def seed_data(customers, delivery_persons):
+    names = [f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)} {i}" for i in range(customers)]
+    return names, {
+        "customer": {"bucket": {
+            f"C{i}": {"data": {"fullName": name, "userId": f"C{i}", "phoneNumber": "", "shippingAddress": ["Main Road"]}}
+            for i, name in enumerate(names)
+        }},
+        "deliveryPerson": {"bucket": {
+            f"D{i}": {"data": {"fullName": f"Driver {i}", "userId": f"D{i}"}} for i in range(delivery_persons)
+        }},
+        "productList": {
+            f"P{i}": {"data": {"name": name, "productId": f"P{i}", "rate": rate, "productReturnable": True}}
+            for i, (name, rate) in enumerate(PRODUCTS)
+        }
+    }
+
+
+def generate_csv(rows, customer_names, delivery_persons, bad_ratio):
+    lines = ["Date,Customer,Delivery Person,Product,Sent,Receieved,Paid Amount"]
+    for i in range(rows):
+        customer_name = "Unknown Person" if random.random() < bad_ratio else random.choice(customer_names)
+        lines.append(
+            f"{random.randint(1, 28):02d}/{random.randint(1, 12):02d}/2025,{customer_name},"
+            f"Driver {random.randrange(delivery_persons)},{random.choice(PRODUCTS)[0]},"
+            f"{random.randint(1, 10)},{random.randint(0, 5)},{random.choice(['', '0', '1000'])}"
+        )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def body_stream(body, chunk_size):
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bulk import throughput against in-memory storage")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--delivery-persons", type=int, default=20)
+    parser.add_argument("--chunk-rows", type=int, default=500)
+    parser.add_argument("--db-latency", type=float, default=0.05, help="seconds per storage call")
+    parser.add_argument("--bad-ratio", type=float, default=0.01, help="share of rows with an unknown customer")
+    args = parser.parse_args()
+
+    import storage
+    customer_names, data = seed_data(args.customers, args.delivery_persons)
+    store = storage.use(storage.MemoryStorage(data, latency=args.db_latency))
+
+    import bulk_import
+    import customer
+    import delivery
+    import product
+    customer.refresh_customer_cache(force=True)
+    delivery.refresh_delivery_boy_cache(force=True)
+    product.refresh_product_cache(force=True)
+
+    body = generate_csv(args.rows, customer_names, args.delivery_persons, args.bad_ratio)
+    started = time.perf_counter()
+    report = asyncio.run(bulk_import.import_stream(body_stream(body, 64 * 1024), "csv", chunk_rows=args.chunk_rows))
+    elapsed = time.perf_counter() - started
+
+    print(f"rows={report['rows']} written={report['written']} failed={report['failed']} "
+          f"chunks={report['chunks']} storage_writes={store.writes}")
+    print(f"{len(body) / 1e6:.1f} MB in {elapsed:.2f}s  ->  {report['rows'] / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import resource
+import time
+
+# Benchmark for /export: streams the full layout (and a sheet per customer) of a generated
+# transactionList through export.export_stream and reports throughput and memory growth.
+#
+#   python bench_export.py --transactions 500000
+
+os.environ["CACHE_SYNC"] = "0"
+
+PRODUCTS = [("P0", "LPG 14KG", 900, True), ("P1", "LPG 19KG", 1500, True), ("P2", "Oxygen", 400, False)]
+
+
+def generate(count, customers):
+    rng = random.Random(1)
+    customer_list = [{"userId": f"C{i}", "fullName": f"Customer {i}", "phoneNumber": ""} for i in range(customers)]
+    product_list = [{"productId": product_id, "name": name, "rate": rate, "productReturnable": returnable}
+                    for product_id, name, rate, returnable in PRODUCTS]
+    delivery = [{"userId": f"D{i}", "fullName": f"Driver {i}"} for i in range(20)]
+    cache = {}
+    for i in range(count):
+        lines = [{"productData": product_data, "sentUnits": rng.randint(1, 10), "recievedUnits": rng.randint(0, 5)}
+                 for product_data in rng.sample(product_list, rng.randint(1, 2))]
+        total = sum(line['sentUnits'] * line['productData']['rate'] for line in lines)
+        key = f"{20240101 + i % 28:08d}_{i:07d}"
+        cache[key] = {"data": {
+            "transactionId": key,
+            "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            "customer": rng.choice(customer_list),
+            "shippingAddress": f"Street {rng.randrange(50)}",
+            "deliveryBoyList": [rng.choice(delivery)],
+            "selectedProducts": lines,
+            "total": total,
+            "payment": rng.choice((0, total)),
+            "status": "Pending",
+            "extraDetails": ""
+        }}
+    return cache
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Streaming export throughput")
+    parser.add_argument("--transactions", type=int, default=500000)
+    parser.add_argument("--customers", type=int, default=2000)
+    args = parser.parse_args()
+
+    import storage
+    storage.use(storage.MemoryStorage())
+    import export
+    import transaction_store
+
+    cache = generate(args.transactions, args.customers)
+    transaction_store.set_transaction_cache(cache)
+    print(f"{len(cache):,} transactions loaded, peak RSS {rss_mb():.0f} MB")
+
+    for data_format, per_sheet in (("csv", None), ("xlsx", None), ("xlsx", "customer")):
+        before = rss_mb()
+        started = time.perf_counter()
+        _, _, body = export.export_stream(data_format, per_sheet=per_sheet)
+        size = chunks = largest = 0
+        first_byte = None
+        for chunk in body:
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+            chunks += 1
+            largest = max(largest, len(chunk))
+        elapsed = time.perf_counter() - started
+        print(f"{data_format:<4} perSheet={str(per_sheet):<8} {size / 1e6:7.1f} MB in {elapsed:6.2f}s "
+              f"({len(cache) / elapsed:,.0f} entries/s)  first byte {first_byte * 1000:.0f} ms  "
+              f"largest chunk {largest / 1024:.0f} kB  peak RSS +{rss_mb() - before:.0f} MB")
+
+
+if __name__ == "__main__":
+    main_cli()
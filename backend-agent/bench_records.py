@@ -0,0 +1,115 @@
+import argparse
+import gc
+import json
+import os
+import random
+import time
+
+import records
+
+# Memory benchmark for records.py: bytes per cached record as downloaded JSON dicts vs compact records.
+# Records go through json.loads so nothing is shared, as with a Firebase download. Holding 1M raw
+# transactions takes several GB, so the raw figure comes from --raw-sample records unless --raw-full.
+#
+#   python bench_records.py --customers 100000 --transactions 1000000
+
+FIRST_NAMES = ["Rakesh", "Ramesh", "Sweta", "Harsh", "Animesh", "Priya", "Sunil", "Kavita", "Manoj", "Anita"]
+LAST_NAMES = ["Gupta", "Kumar", "Sharma", "Das", "Verma", "Singh", "Yadav", "Patel", "Jain", "Mehta"]
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+PRODUCTS = [("P0", "LPG 14KG", 900, True), ("P1", "LPG 19KG", 1500, True), ("P2", "Oxygen", 400, False)]
+
+
+def customer_json(rng, i):
+    return {"data": {"userId": f"C{i:06d}", "fullName": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+                     "phoneNumber": f"98{rng.randrange(10 ** 8):08d}", "shippingAddress": [f"House {i}, Main Road"],
+                     "extraNote": ""},
+            "others": {"createdBy": "ADMIN", "createdTime": 1736000000000 + i, "editedBy": "ADMIN",
+                       "editedTime": 1736000000000 + i}}
+
+
+def transaction_json(rng, i, customers):
+    customer_id = rng.randrange(customers)
+    products = rng.sample(PRODUCTS, rng.randint(1, 2))
+    sent = [rng.randint(1, 10) for _ in products]
+    total = sum(units * rate for units, (_, _, rate, _) in zip(sent, products))
+    key = f"2025{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}_{rng.randrange(240000):06d}_{i:05X}"
+    return {
+        "data": {
+            "transactionId": key, "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            "customer": {"userId": f"C{customer_id:06d}", "fullName": f"Customer {customer_id}",
+                         "phoneNumber": f"98{customer_id:08d}", "address": [f"House {customer_id}, Main Road"]},
+            "deliveryBoyList": [{"userId": f"D{rng.randrange(20)}", "fullName": f"Driver {rng.randrange(20)}",
+                                 "deliveryDone": [{"productId": product_id, "sentUnits": units, "recievedUnits": 0}
+                                                  for units, (product_id, _, _, _) in zip(sent, products)]}],
+            "selectedProducts": [{"productData": {"productId": product_id, "name": name, "rate": rate,
+                                                  "productReturnable": returnable},
+                                  "sentUnits": units, "recievedUnits": rng.randint(0, units), "paymentAmt": 0}
+                                 for units, (product_id, name, rate, returnable) in zip(sent, products)],
+            "payment": rng.choice((0, total)), "total": total, "status": "Pending", "importIndex": 0,
+            "extraDetails": rng.choice(("", "Logged via AI Agent"))
+        },
+        "others": {"createdBy": "AI_AGENT", "createdTime": 1736000000000 + i, "editedBy": "AI_AGENT",
+                   "editedTime": 1736000000000 + i}
+    }
+
+
+def rss_bytes():
+    """Current resident set size (Linux)"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+def measure(count, make, holder):
+    """Bytes per record that `holder` (a dict or a CompactCache) grows by while `count` records are added"""
+    gc.collect()
+    before = rss_bytes()
+    convert = 0.0
+    for i in range(count):
+        key, value = make(i)
+        value = json.loads(json.dumps(value))
+        started = time.perf_counter()
+        holder[key] = value
+        convert += time.perf_counter() - started
+    gc.collect()
+    return (rss_bytes() - before) / count, convert
+
+
+def report(kind, count, raw_count, make, record_type, raw_full):
+    raw_count = count if raw_full else min(raw_count, count)
+    raw = {}
+    raw_per_record, _ = measure(raw_count, make, raw)
+    del raw
+
+    compact = records.CompactCache(record_type)
+    compact_per_record, convert = measure(count, make, compact)
+    key, value = make(count - 1)
+    assert compact[key] == value    # lossless
+
+    print(f"{kind:<13} {count:>9,}  raw {raw_per_record:7,.0f} B/record (over {raw_count:,})  "
+          f"compact {compact_per_record:7,.0f} B/record  {raw_per_record / compact_per_record:.1f}x smaller, "
+          f"{count * (raw_per_record - compact_per_record) / 2 ** 20:,.0f} MB saved  "
+          f"(from_json {convert / count * 1e6:.1f} us/record)")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Bytes per cached record: JSON dicts vs records.py")
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--raw-sample", type=int, default=100000, help="raw records measured when not --raw-full")
+    parser.add_argument("--raw-full", action="store_true", help="hold every raw record (needs several GB)")
+    args = parser.parse_args()
+
+    def make_customer(i):
+        return f"C{i:06d}", customer_json(random.Random(i), i)
+
+    report("customers", args.customers, args.raw_sample, make_customer, records.Entity, args.raw_full)
+
+    def make_transaction(i):
+        value = transaction_json(random.Random(i), i, args.customers)
+        return value["data"]["transactionId"], value
+
+    report("transactions", args.transactions, args.raw_sample, make_transaction, records.Transaction, args.raw_full)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import random
+import resource
+import statistics
+import time
+
+# Latency benchmark for search.py: builds the inverted index over a generated transactionList and
+# times ranked queries against the inventory page's approach (join every row's text, lowercase it
+# and test `includes`), plus single-entry updates.
+#
+#   python bench_search.py --transactions 1000000
+
+os.environ["CACHE_SYNC"] = "0"
+
+FIRST_NAMES = ["Rakesh", "Ramesh", "Sweta", "Harsh", "Animesh", "Priya", "Sunil", "Kavita", "Manoj", "Anita"]
+LAST_NAMES = ["Gupta", "Kumar", "Sharma", "Das", "Verma", "Singh", "Yadav", "Patel", "Jain", "Mehta"]
+STREETS = ["Main Road", "Station Road", "Gandhi Nagar", "Civil Lines", "Nehru Chowk", "Ring Road", "Mall Road"]
+NOTES = ["", "", "", "Logged via AI Agent", "gate pass needed", "call before delivery", "cash collected at gate",
+         "cylinder valve leaking", "deliver after 5pm"]
+PRODUCTS = [("P0", "LPG 14KG", 900), ("P1", "LPG 19KG", 1500), ("P2", "Oxygen", 400), ("P3", "Nitrogen", 700)]
+QUERIES = ["rakesh", "rakesh gupta", "kavita jain station", "lpg 19", "valve", "gate pass", "oxygen main road",
+           "ne", "4711", "nobody"]
+
+
+def generate(count, customers):
+    rng = random.Random(1)
+    customer_list = [{"userId": f"C{i}", "fullName": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+                      "phoneNumber": f"98{rng.randrange(10 ** 8):08d}"} for i in range(customers)]
+    delivery = [{"userId": f"D{i}", "fullName": f"{rng.choice(FIRST_NAMES)} Driver"} for i in range(20)]
+    cache = {}
+    for i in range(count):
+        key = f"2025{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}_{i:07d}"
+        cache[key] = {"data": {
+            "transactionId": key, "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            "customer": rng.choice(customer_list), "shippingAddress": f"{rng.randrange(200)} {rng.choice(STREETS)}",
+            "deliveryBoyList": [rng.choice(delivery)],
+            "selectedProducts": [{"productData": {"productId": product_id, "name": name, "rate": rate},
+                                  "sentUnits": rng.randint(1, 5), "recievedUnits": 0}
+                                 for product_id, name, rate in rng.sample(PRODUCTS, rng.randint(1, 2))],
+            "extraDetails": rng.choice(NOTES), "tags": rng.sample(["urgent", "monthly", "credit"], rng.randint(0, 1))
+        }}
+    return cache
+
+
+def row_text(record):
+    """Roughly what inventory.component.ts forSearch() joins for each row"""
+    data = record['data']
+    return ' '.join(filter(None, [data.get('date'), data['customer'].get('fullName'), data['customer'].get('phoneNumber'),
+                                  data.get('shippingAddress'), data.get('extraDetails')]
+                           + [person.get('fullName') for person in data['deliveryBoyList']]
+                           + [item['productData']['name'] for item in data['selectedProducts']])).lower()
+
+
+def millis(samples):
+    return f"p50 {statistics.median(samples) * 1000:7.2f} ms  max {max(samples) * 1000:7.2f} ms"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Inverted index search latency")
+    parser.add_argument("--transactions", type=int, default=1000000)
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    import storage
+    storage.use(storage.MemoryStorage())
+    import search
+
+    cache = generate(args.transactions, args.customers)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    search.SEARCH.build(cache)
+    print(f"index over {len(cache):,} transactions built in {time.perf_counter() - started:.1f}s, "
+          f"{search.SEARCH.stats()['words']:,} words, peak RSS +{(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024:,.0f} MB")
+
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            count, _ = search.SEARCH.search(query, limit=20)
+            samples.append(time.perf_counter() - started)
+        print(f"  {query!r:<24} {count:>9,} matches  {millis(samples)}")
+
+    needle = "gate pass"
+    started = time.perf_counter()
+    scanned = sum(1 for record in cache.values() if needle in row_text(record))
+    print(f"  linear scan {needle!r}: {scanned:,} matches in {(time.perf_counter() - started) * 1000:,.0f} ms")
+
+    keys = list(cache)
+    rng = random.Random(2)
+    samples = []
+    for _ in range(1000):
+        key = rng.choice(keys)
+        record = cache[key]
+        record['data']['extraDetails'] = rng.choice(NOTES)
+        started = time.perf_counter()
+        search.SEARCH.upsert(key, record)
+        samples.append(time.perf_counter() - started)
+    print(f"  upsert one entry:        {millis(samples)}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,118 @@
+import argparse
+import importlib
+import json
+import os
+import random
+import tempfile
+import time
+
+# Cold-start benchmark for warm_start: time until the caches are loaded for
+#   before    - every module downloading its node on import, then refresh_memory() downloading all again
+#   parallel  - warm_start.fetch_all(): each node once, all at the same time
+#   snapshot  - warm_start.load() from the binary snapshot (the database is caught up afterwards)
+# The in-memory database adds --rtt per read plus the payload size over --bandwidth to emulate Firebase.
+#
+#   python bench_startup.py --customers 20000 --transactions 200000
+
+os.environ["CACHE_SYNC"] = "0"
+
+import storage  # noqa: E402
+
+PRODUCTS = [("P0", "LPG 14KG", 900, True), ("P1", "LPG 19KG", 1500, True), ("P2", "Oxygen", 400, False)]
+
+
+class NetworkStorage(storage.MemoryStorage):
+    """MemoryStorage whose reads cost a round-trip plus transfer time"""
+
+    def __init__(self, data, rtt, bandwidth):
+        super().__init__(data)
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+
+    def get(self, path):
+        value = super().get(path)
+        time.sleep(self.rtt + len(json.dumps(value)) / self.bandwidth)
+        return value
+
+
+def generate(customers, transactions):
+    rng = random.Random(1)
+    customer_bucket = {f"C{i}": {"data": {"userId": f"C{i}", "fullName": f"Customer {i}", "phoneNumber": "",
+                                          "shippingAddress": [f"House {i}"]}} for i in range(customers)}
+    products = {product_id: {"data": {"productId": product_id, "name": name, "rate": rate,
+                                      "productReturnable": returnable}}
+                for product_id, name, rate, returnable in PRODUCTS}
+    transaction_list = {}
+    for i in range(transactions):
+        customer_data = customer_bucket[f"C{rng.randrange(customers)}"]["data"]
+        lines = [{"productData": products[product_id]["data"], "sentUnits": rng.randint(1, 10),
+                  "recievedUnits": rng.randint(0, 5)} for product_id in rng.sample(sorted(products), 2)]
+        key = f"2025{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}_{i:07d}"
+        total = sum(line["sentUnits"] * line["productData"]["rate"] for line in lines)
+        transaction_list[key] = {"data": {
+            "transactionId": key, "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            "customer": customer_data, "deliveryBoyList": [{"userId": "D1", "fullName": "Driver 1"}],
+            "selectedProducts": lines, "total": total, "payment": rng.choice((0, total)), "status": "Pending"
+        }}
+    return {
+        "customer": {"bucket": customer_bucket},
+        "deliveryPerson": {"bucket": {f"D{i}": {"data": {"userId": f"D{i}", "fullName": f"Driver {i}"}}
+                                      for i in range(20)}},
+        "admin": {"A1": {"data": {"userId": "A1", "fullName": "Admin"}}},
+        "productList": products,
+        "transactionList": transaction_list,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Cold start: sequential double download vs warm_start")
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--rtt", type=float, default=0.15, help="seconds per database read")
+    parser.add_argument("--bandwidth", type=float, default=50e6, help="bytes per second per read")
+    args = parser.parse_args()
+
+    backend = storage.use(NetworkStorage(generate(args.customers, args.transactions), args.rtt, args.bandwidth))
+
+    for module in ("admin", "delivery", "deposit", "product"):
+        importlib.import_module(module)     # registers the module's cache
+    import customer
+    import refresh_coordinator
+    import transaction_store
+    import warm_start
+
+    def reset():
+        for synced in warm_start.cache_sync.SYNCED_CACHES.values():
+            synced.set_cache({})
+
+    def timed(label, run):
+        reset()
+        reads = backend.reads
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<9} {elapsed:7.2f}s  {backend.reads - reads:2d} reads  "
+              f"{len(customer.CUSTOMER_CACHE):,} customers, {len(transaction_store.TRANSACTION_CACHE):,} transactions")
+        return elapsed
+
+    def before():
+        # Import-time refresh in each module, then refresh_memory() forcing every node again
+        for _ in range(2):
+            for coordinator in refresh_coordinator.COORDINATORS.values():
+                coordinator.refresh(force=True)
+
+    baseline = timed("before", before)
+    timed("parallel", warm_start.fetch_all)
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_file = os.path.join(directory, "warm.snapshot")
+        size = warm_start.save(snapshot_file)
+        warm = timed("snapshot", lambda: warm_start.load(snapshot_file))
+        started = time.perf_counter()
+        warm_start.read(snapshot_file)
+        decode = time.perf_counter() - started
+    print(f"snapshot file {size / 1e6:.1f} MB decoded in {decode:.2f}s (the rest is rebuilding indexes and views); "
+          f"ready {baseline / warm:.1f}x sooner than before")
+
+
+if __name__ == "__main__":
+    main_cli()
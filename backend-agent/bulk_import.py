@@ -0,0 +1,251 @@
+import asyncio
+import codecs
+import csv
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import traceback
+
+import offload
+import transactions
+
+# Bulk transaction import without the LLM.
+# The request body (CSV or NDJSON) is read as a stream and cut into chunks of CHUNK_ROWS rows.
+# Each chunk is validated, resolved against the indexed caches and committed with one multi-path
+# update(). At most one chunk is being written while the next one is prepared, so a 100k-row upload
+# never sits in memory at once and a slow database slows the upload down instead of piling up
+# pending writes (backpressure).
+
+CHUNK_ROWS = int(os.environ.get("BULK_CHUNK_ROWS", "500"))
+MAX_REPORTED_ERRORS = 1000
+
+# Accepted column names: the process_transaction argument names, or the headers of the
+# spreadsheet the bulk-entry page imports (see ImportModel in the frontend)
+COLUMN_ALIASES = {
+    "customer_name": "customer_name", "customer": "customer_name",
+    "delivery_boy_name": "delivery_boy_name", "delivery person": "delivery_boy_name", "delivery_person": "delivery_boy_name",
+    "product_name": "product_name", "product": "product_name",
+    "sent_units": "sent_units", "sent": "sent_units",
+    "received_units": "received_units", "receieved": "received_units", "received": "received_units",
+    "payment_amount": "payment_amount", "paid amount": "payment_amount", "payment": "payment_amount",
+    "date": "date",
+    "extra_details": "extra_details", "extra note": "extra_details",
+}
+DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y"]
+
+
+class RowError(Exception):
+    """A row that cannot become a transaction"""
+
+
+def parse_int(value, column, default=None):
+    if value is None or str(value).strip() == '':
+        return default
+    try:
+        return int(float(str(value).strip()))
+    except ValueError:
+        raise RowError(f"'{column}' must be a number, got '{value}'")
+
+
+@functools.lru_cache(maxsize=256)
+def column_key(column):
+    """Canonical name of a column header, None for columns that are ignored"""
+    return COLUMN_ALIASES.get(str(column).strip().lower())
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(value):
+    """Returns the date as dd/mm/yyyy (the format stored in transactionList), None when empty.
+
+    Cached: a bulk file repeats the same few hundred dates across all of its rows.
+    """
+    if value is None or str(value).strip() == '':
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(str(value).strip(), date_format).strftime("%d/%m/%Y")
+        except ValueError:
+            continue
+    raise RowError(f"unrecognized date '{value}'")
+
+
+def normalize_row(raw):
+    """Maps one CSV/NDJSON record to prepare_transaction keywords"""
+    if not isinstance(raw, dict):
+        raise RowError("row is not an object")
+
+    row = {}
+    for column, value in raw.items():
+        key = column_key(column)
+        if key:
+            row[key] = value.strip() if isinstance(value, str) else value
+
+    for required in ("customer_name", "delivery_boy_name", "product_name"):
+        if not row.get(required):
+            raise RowError(f"missing '{required}'")
+
+    return {
+        "cust_name": row["customer_name"],
+        "boy_name": row["delivery_boy_name"],
+        "prod_name": row["product_name"],
+        "sent": parse_int(row.get("sent_units"), "sent_units", 0),
+        "received": parse_int(row.get("received_units"), "received_units", 0),
+        "payment": parse_int(row.get("payment_amount"), "payment_amount"),
+        "date": parse_date(str(row["date"]) if row.get("date") is not None else None),
+        "extra_details": row.get("extra_details") or "Imported via bulk upload",
+    }
+
+
+class BulkImport:
+    """State of one upload: memoized name resolution, used IDs, counters and per-row errors"""
+
+    def __init__(self, data_format, dry_run=False):
+        self.data_format = data_format
+        self.dry_run = dry_run
+        self.entities = transactions.EntityResolver()
+        self.used_ids = set()
+        self.header = None
+        self.rows = 0
+        self.written = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors = []
+        self._lock = threading.Lock()   # chunk N is written while chunk N+1 is prepared
+        self.started = time.perf_counter()
+
+    def _error(self, row_number, text):
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"row": row_number, "error": text})
+
+    def _records(self, lines):
+        """Yields (row number, raw dict) for a list of complete lines, or (row number, RowError)"""
+        if self.data_format == "ndjson":
+            for line in lines:
+                if not line.strip():
+                    continue
+                self.rows += 1
+                try:
+                    yield self.rows, json.loads(line)
+                except ValueError as e:
+                    yield self.rows, RowError(f"invalid JSON: {e}")
+            return
+
+        for values in csv.reader(lines):
+            if not values or not any(value.strip() for value in values):
+                continue
+            if self.header is None:
+                self.header = values
+                continue
+            self.rows += 1
+            yield self.rows, dict(zip(self.header, values))
+
+    def prepare_chunk(self, lines):
+        """Validates and resolves one chunk (blocking; runs on the DB pool). Returns [(row number, entry)]"""
+        prepared = []
+        for row_number, raw in self._records(lines):
+            try:
+                if isinstance(raw, RowError):
+                    raise raw
+                transaction_data, error = transactions.prepare_transaction(
+                    self.entities, **normalize_row(raw), used_ids=self.used_ids, created_by="BULK_IMPORT"
+                )
+                if error:
+                    raise RowError(transactions.error_text(error))
+                prepared.append((row_number, transaction_data))
+            except RowError as e:
+                self._error(row_number, str(e))
+        return prepared
+
+    def write_chunk(self, prepared):
+        """Commits one prepared chunk with a single multi-path update (blocking; runs on the DB pool)"""
+        with self._lock:
+            self.chunks += 1
+        if self.dry_run or not prepared:
+            return
+
+        try:
+            transactions.write_transactions([transaction_data for _, transaction_data in prepared])
+            with self._lock:
+                self.written += len(prepared)
+        except Exception as e:
+            print(traceback.format_exc())
+            for row_number, _ in prepared:
+                self._error(row_number, f"DB ERROR: {str(e)}")
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "response": f"Imported {self.written} of {self.rows} rows." if not self.dry_run
+            else f"Validated {self.rows} rows, {self.rows - self.failed} can be imported.",
+            "rows": self.rows,
+            "written": self.written,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "dryRun": self.dry_run,
+            "seconds": round(elapsed, 3),
+            "rowsPerSecond": round(self.rows / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+            "errorsTruncated": self.failed > len(self.errors)
+        }
+
+
+async def iter_lines(byte_chunks, balance_quotes=True):
+    """Turns an async stream of byte chunks into complete text lines.
+
+    A CSV record may span lines inside a quoted field, so with `balance_quotes` lines are only
+    released once the quotes seen so far are balanced. NDJSON is strictly one record per line
+    (and escapes quotes as \\"), so it is read with balance_quotes=False.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    record = ''
+    async for chunk in byte_chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            record += line + '\n'
+            if not balance_quotes or record.count('"') % 2 == 0:
+                yield record
+                record = ''
+    record += pending + decoder.decode(b'', final=True)
+    if record.strip():
+        yield record
+
+
+def detect_format(data_format, content_type):
+    if data_format:
+        return "ndjson" if data_format.lower() in ("ndjson", "jsonl", "json") else "csv"
+    if content_type and ("ndjson" in content_type or "jsonl" in content_type):
+        return "ndjson"
+    return "csv"
+
+
+async def import_stream(byte_chunks, data_format="csv", chunk_rows=CHUNK_ROWS, dry_run=False):
+    """Imports an async stream of CSV/NDJSON bytes chunk by chunk and returns the import report"""
+    job = BulkImport(data_format, dry_run)
+    writing = None
+
+    async def flush(lines):
+        nonlocal writing
+        prepared = await offload.DB.run_to_completion(job.prepare_chunk, lines)
+        # Only one write in flight: the next chunk is read once the previous one is stored
+        if writing is not None:
+            await writing
+        writing = asyncio.ensure_future(offload.DB.run_to_completion(job.write_chunk, prepared))
+
+    lines = []
+    async for line in iter_lines(byte_chunks, balance_quotes=job.data_format != "ndjson"):
+        lines.append(line)
+        if len(lines) >= chunk_rows:
+            await flush(lines)
+            lines = []
+    if lines:
+        await flush(lines)
+    if writing is not None:
+        await writing
+    return job.report()
@@ -0,0 +1,274 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Background sync engine for the entity caches.
+# Instead of downloading a whole node with db.reference(path).get() every time a lookup misses,
+# each registered cache listens to its node once: the first 'put' event carries the full snapshot,
+# every later event is a delta that is applied in place to the cache dict and its EntityIndex.
+# firebase_admin's listen() returns before that snapshot arrives (on a background thread), so a
+# cache only counts as live, and stops falling back to full refreshes, once it has been applied.
+
+# Set CACHE_SYNC=0 to fall back to full downloads on import and on every refresh
+ENABLED = os.environ.get("CACHE_SYNC", "1") == "1"
+
+SYNCED_CACHES = {}  # Firebase path -> SyncedCache
+
+
+class SyncEvent:
+    """Same shape as firebase_admin.db.Event (event_type, path, data)"""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class LocalEventSource:
+    """In-process stand-in for db.reference(path) so the engine can be driven without Firebase"""
+
+    def __init__(self, data=None):
+        self.data = data
+        self._callbacks = []
+
+    def listen(self, callback):
+        self._callbacks.append(callback)
+        callback(SyncEvent('put', '/', self.data))
+        return _LocalRegistration(self, callback)
+
+    def emit(self, event_type, path, data):
+        """Delivers one 'put' or 'patch' event to every listener"""
+        for callback in list(self._callbacks):
+            callback(SyncEvent(event_type, path, data))
+
+
+class _LocalRegistration:
+    def __init__(self, source, callback):
+        self._source = source
+        self._callback = callback
+
+    def close(self):
+        if self._callback in self._source._callbacks:
+            self._source._callbacks.remove(self._callback)
+
+
+def split_path(path):
+    return [segment for segment in (path or '').split('/') if segment]
+
+
+def _child(node, segment):
+    """Descends one path segment, creating the node; Firebase arrays arrive as lists indexed by position"""
+    if isinstance(node, list):
+        position = int(segment)
+        node.extend([None] * (position + 1 - len(node)))
+        if not isinstance(node[position], (dict, list)):
+            node[position] = {}
+        return node[position]
+    if not isinstance(node.get(segment), (dict, list)):
+        node[segment] = {}
+    return node[segment]
+
+
+def _assign(node, segment, value):
+    if isinstance(node, list):
+        position = int(segment)
+        if position >= len(node):
+            if value is None:
+                return
+            node.extend([None] * (position + 1 - len(node)))
+        node[position] = value
+    elif value is None:
+        node.pop(segment, None)
+    else:
+        node[segment] = value
+
+
+class ViewSet:
+    """Fans one cache's changes out to several derived views (indexes, ledgers, rollups).
+
+    Passed to SyncedCache in place of a single index: every view gets build(cache),
+    upsert(key, record) and remove(key) calls.
+    """
+
+    def __init__(self, *views):
+        self.views = list(views)
+        self.version = 0
+        self.updated_at = None
+
+    def add(self, view, cache):
+        """Registers another view and builds it from the current cache"""
+        view.build(cache)
+        self.views.append(view)
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = int(time.time() * 1000)
+
+    def build(self, cache):
+        for view in self.views:
+            view.build(cache)
+        self._touch()
+
+    def upsert(self, key, record):
+        for view in self.views:
+            view.upsert(key, record)
+        self._touch()
+
+    def remove(self, key):
+        for view in self.views:
+            view.remove(key)
+        self._touch()
+
+
+class SyncedCache:
+    """Keeps one module-level cache (and its index) in step with a Firebase node"""
+
+    def __init__(self, path, get_cache, set_cache, index, refresh_cache):
+        self.path = path
+        self.get_cache = get_cache          # returns the module's current cache dict
+        self.set_cache = set_cache          # replaces the module's cache and rebuilds the index
+        self.index = index
+        self.refresh_cache = refresh_cache  # full download, used when the listener is not live
+        self.live = False                   # set once the listener's first snapshot is applied
+        self.snapshot_received = threading.Event()
+        self.events = 0
+        self.registration = None
+        self._lock = threading.Lock()
+        SYNCED_CACHES[path] = self
+
+    def start(self, source):
+        """Attaches to an event source (db.reference(path) or a LocalEventSource)"""
+        try:
+            self.registration = source.listen(self.handle)
+            print(f"Cache sync listening on /{self.path}")
+        except Exception as e:
+            self.live = False
+            print(f"Cache sync error for /{self.path}: {e}")
+
+    def stop(self):
+        if self.registration:
+            self.registration.close()
+        self.registration = None
+        self.live = False
+        self.snapshot_received.clear()
+
+    def wait_live(self, timeout=None):
+        """Blocks until the first snapshot is applied; False on timeout or when not listening"""
+        if self.registration is None:
+            return self.live
+        return self.snapshot_received.wait(timeout)
+
+    def load(self, snapshot):
+        """Stores a full download, unless a listener already keeps the cache current.
+
+        Runs under the event lock so a snapshot fetched before the listener attached can never
+        overwrite deltas the listener has applied since.
+        """
+        with self._lock:
+            if self.live:
+                return False
+            self.set_cache(snapshot)
+            return True
+
+    def refresh_on_miss(self):
+        """Falls back to a full refresh only when no listener keeps the cache current"""
+        if self.live:
+            return False
+        self.refresh_cache()
+        return True
+
+    def apply_local(self, key, record):
+        """Applies a write this service just made to one record, ahead of the listener's echo"""
+        with self._lock:
+            self._put([key], record)
+
+    def handle(self, event):
+        """Applies one listener event to the cache and index"""
+        try:
+            with self._lock:
+                if event.event_type == 'put':
+                    self._put(split_path(event.path), event.data)
+                    if not split_path(event.path):
+                        self.live = True
+                        self.snapshot_received.set()
+                elif event.event_type == 'patch':
+                    for child, value in (event.data or {}).items():
+                        self._put(split_path(event.path) + split_path(child), value)
+                self.events += 1
+        except Exception as e:
+            print(f"Cache sync event error for /{self.path}: {e}")
+
+    def _put(self, segments, value):
+        if not segments:
+            # Initial snapshot (or the whole node was overwritten)
+            self.set_cache(value or {})
+            return
+
+        cache = self.get_cache()
+        key = segments[0]
+        if len(segments) == 1:
+            if value is None:
+                cache.pop(key, None)
+                self.index.remove(key)
+                return
+            record = value
+        else:
+            # Edit the record and store it back: a compact cache (records.py) hands out copies on reads
+            record = cache[key] if key in cache else {}
+            node = record
+            for segment in segments[1:-1]:
+                node = _child(node, segment)
+            _assign(node, segments[-1], value)
+        cache[key] = record
+        self.index.upsert(key, record)
+
+    def status(self):
+        return {
+            "live": self.live,
+            "version": self.index.version,
+            "lastSynced": self.index.updated_at,
+            "events": self.events
+        }
+
+
+def _start_one(synced, source_for_path):
+    try:
+        source = source_for_path(synced.path)
+    except Exception as e:
+        # e.g. Firebase init failed: keep serving, lookups fall back to full refreshes
+        print(f"Cache sync error for /{synced.path}: {e}")
+        return
+    synced.start(source)
+
+
+def start(source_for_path, workers=1):
+    """Starts every registered cache; source_for_path(path) returns something with .listen().
+
+    With workers > 1 the listeners are opened in parallel (each one is a round-trip to Firebase).
+    """
+    if workers <= 1:
+        for synced in SYNCED_CACHES.values():
+            _start_one(synced, source_for_path)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cache-sync") as pool:
+        list(pool.map(lambda synced: _start_one(synced, source_for_path), list(SYNCED_CACHES.values())))
+
+
+def wait_live(timeout=None):
+    """Waits for every listening cache's first snapshot; False if any did not arrive within `timeout` seconds"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    live = True
+    for synced in SYNCED_CACHES.values():
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        live = synced.wait_live(remaining) and live
+    return live
+
+
+def stop():
+    for synced in SYNCED_CACHES.values():
+        synced.stop()
+
+
+def status():
+    return {path: synced.status() for path, synced in SYNCED_CACHES.items()}
@@ -0,0 +1,299 @@
+import threading
+
+import numpy as np
+
+import ledger
+import transaction_store
+
+# Columnar copy of /transactionList for ad-hoc aggregations.
+# Customer, product and delivery person ids are dictionary-encoded to int32 codes and every numeric
+# field lives in its own NumPy array, so "LPG 14KG sold by Sweta in Q3" is a few boolean masks and a
+# bincount instead of a Python loop over every entry. Two tables are kept:
+#   lines   - one row per selectedProducts item (sent, received, billed), for product questions
+#   entries - one row per transaction (total, payment), for money questions
+# Writes append to small Python buffers and mark the rows they replace as dead; the buffers are
+# turned into arrays on the next query, so a chat write never rebuilds the snapshot.
+
+LINE_METRICS = ('sent', 'received', 'billed', 'pending')
+ENTRY_METRICS = ('transactions', 'total', 'payment', 'due')
+METRICS = LINE_METRICS + ENTRY_METRICS
+GROUP_BY = ('customer', 'product', 'deliveryPerson', 'day', 'month', 'year')
+DIMENSIONS = ('customer', 'product', 'deliveryPerson')
+
+
+class Encoder:
+    """Dictionary encoding of ids: id <-> dense int code, plus the latest display name"""
+
+    def __init__(self):
+        self.ids = []
+        self.codes = {}
+        self.names = {}
+
+    def encode(self, value, name=None):
+        if not value:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.ids)
+            self.ids.append(value)
+        if name:
+            self.names[value] = name
+        return code
+
+
+class _Table:
+    """Columns as NumPy arrays plus a buffer of rows appended since the last query"""
+
+    def __init__(self, columns):
+        self.dtypes = columns
+        self.arrays = {name: np.empty(0, dtype) for name, dtype in columns.items()}
+        self.alive = np.empty(0, bool)
+        self.pending = {name: [] for name in columns}
+        self._appenders = [values.append for values in self.pending.values()]
+        self.dead = []
+
+    def __len__(self):
+        return len(self.alive) + len(self.pending['day'])
+
+    def append(self, *row):
+        """Adds one row given in column order; returns its row number"""
+        for append, value in zip(self._appenders, row):
+            append(value)
+        return len(self) - 1
+
+    def kill(self, rows):
+        self.dead.extend(rows)
+
+    def flush(self):
+        added = len(self.pending['day'])
+        if added:
+            for name, values in self.pending.items():
+                self.arrays[name] = np.concatenate([self.arrays[name], np.asarray(values, self.dtypes[name])])
+                values.clear()
+            self.alive = np.concatenate([self.alive, np.ones(added, bool)])
+        if self.dead:
+            self.alive[self.dead] = False
+            self.dead.clear()
+
+
+def _lines_table():
+    return _Table({'day': np.int32, 'customer': np.int32, 'product': np.int32, 'deliveryPerson': np.int32,
+                   'sent': np.int64, 'received': np.int64, 'billed': np.int64})
+
+
+def _entries_table():
+    return _Table({'day': np.int32, 'customer': np.int32, 'deliveryPerson': np.int32,
+                   'total': np.int64, 'payment': np.int64})
+
+
+class ColumnarSnapshot:
+    """Both tables, kept current from the transaction cache's deltas"""
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.encoders = {dimension: Encoder() for dimension in DIMENSIONS}
+        self.lines = _lines_table()
+        self.entries = _entries_table()
+        self._rows = {}     # transaction key -> (entry row, [line rows])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def build(self, cache):
+        with self._lock:
+            self._reset()
+            for key, record in (cache or {}).items():
+                self._add(key, record)
+            self.lines.flush()
+            self.entries.flush()
+            self.version += 1
+
+    def upsert(self, key, record):
+        with self._lock:
+            self._drop(key)
+            self._add(key, record)
+            self.version += 1
+
+    def remove(self, key):
+        with self._lock:
+            if self._drop(key):
+                self.version += 1
+
+    def _drop(self, key):
+        rows = self._rows.pop(key, None)
+        if rows is None:
+            return False
+        self.entries.kill([rows[0]])
+        self.lines.kill(rows[1])
+        return True
+
+    def _add(self, key, record):
+        data = record.get('data') if isinstance(record, dict) else None
+        if not isinstance(data, dict):
+            return
+        encoders = self.encoders
+        day = transaction_store.day_key(data.get('date'), data.get('transactionId'))
+        customer_data = data.get('customer') or {}
+        customer_code = encoders['customer'].encode(customer_data.get('userId'), customer_data.get('fullName'))
+
+        # Each product is credited to the delivery person whose deliveryDone lists it (else the first one)
+        delivery_codes = {}
+        first_delivery = -1
+        for delivery_person in data.get('deliveryBoyList') or []:
+            if not isinstance(delivery_person, dict) or not delivery_person.get('userId'):
+                continue
+            code = encoders['deliveryPerson'].encode(delivery_person['userId'], delivery_person.get('fullName'))
+            if first_delivery < 0:
+                first_delivery = code
+            for done in delivery_person.get('deliveryDone') or []:
+                if isinstance(done, dict) and done.get('productId'):
+                    delivery_codes.setdefault(done['productId'], code)
+
+        line_rows = []
+        for selected in data.get('selectedProducts') or []:
+            if not isinstance(selected, dict):
+                continue
+            product_data = selected.get('productData') or {}
+            product_id = product_data.get('productId')
+            sent = ledger.to_int(selected.get('sentUnits'))
+            line_rows.append(self.lines.append(
+                day, customer_code, encoders['product'].encode(product_id, product_data.get('name')),
+                delivery_codes.get(product_id, first_delivery),
+                sent, ledger.to_int(selected.get('recievedUnits')), sent * ledger.to_int(product_data.get('rate'))
+            ))
+
+        entry_row = self.entries.append(
+            day, customer_code, first_delivery, ledger.to_int(data.get('total')), ledger.to_int(data.get('payment'))
+        )
+        self._rows[key] = (entry_row, line_rows)
+
+    def aggregate(self, metric='sent', group_by=None, filters=None, date_from=None, date_to=None,
+                  min_value=None, max_value=None, limit=None):
+        """Sums `metric` over the rows matching every { dimension: id } filter and the date range.
+
+        Returns [{key, name, value}] sorted by value (largest first), or one row when group_by is None.
+        Product filters and line metrics read the lines table; the rest read the entries table.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+        if group_by is not None and group_by not in GROUP_BY:
+            raise ValueError(f"unknown group_by '{group_by}', expected one of {', '.join(GROUP_BY)}")
+        filters = {field: value for field, value in (filters or {}).items() if value not in (None, '')}
+        for field in filters:
+            if field not in DIMENSIONS:
+                raise ValueError(f"unknown filter '{field}'")
+        if metric in ENTRY_METRICS and ('product' in filters or group_by == 'product'):
+            raise ValueError(f"'{metric}' is recorded per transaction and cannot be split by product")
+
+        with self._lock:
+            table = self.lines if metric in LINE_METRICS else self.entries
+            table.flush()
+            columns = table.arrays
+
+            mask = table.alive.copy()
+            if date_from is not None:
+                mask &= columns['day'] >= date_from
+            if date_to is not None:
+                mask &= columns['day'] <= date_to
+            for field, value in filters.items():
+                code = self.encoders[field].codes.get(value)
+                if code is None:
+                    return []
+                mask &= columns[field] == code
+
+            if metric == 'pending':
+                values = columns['sent'][mask] - columns['received'][mask]
+            elif metric == 'due':
+                values = columns['total'][mask] - columns['payment'][mask]
+            elif metric == 'transactions':
+                values = np.ones(int(mask.sum()), np.int64)
+            else:
+                values = columns[metric][mask]
+
+            if group_by is None:
+                return [{"key": None, "name": None, "value": int(values.sum())}]
+
+            if group_by in DIMENSIONS:
+                codes = columns[group_by][mask]
+                known = codes >= 0
+                encoder = self.encoders[group_by]
+                sums = np.bincount(codes[known], weights=values[known], minlength=len(encoder.ids))
+                counts = np.bincount(codes[known], minlength=len(encoder.ids))
+                keys = np.nonzero(counts)[0]
+                labels = [encoder.ids[code] for code in keys]
+                names = [encoder.names.get(label) for label in labels]
+            else:
+                divisor = {'day': 1, 'month': 100, 'year': 10000}[group_by]
+                buckets, inverse = np.unique(columns['day'][mask] // divisor, return_inverse=True)
+                sums = np.bincount(inverse, weights=values, minlength=len(buckets))
+                keys = np.arange(len(buckets))
+                labels = [int(bucket) for bucket in buckets]
+                names = [None] * len(labels)
+
+        # Weighted bincount sums in float64; exact for the integer totals this data holds
+        rows = [{"key": label, "name": name, "value": int(round(sums[code]))}
+                for code, label, name in zip(keys, labels, names)]
+        if min_value is not None:
+            rows = [row for row in rows if row['value'] > min_value]
+        if max_value is not None:
+            rows = [row for row in rows if row['value'] < max_value]
+        if group_by in ('day', 'month', 'year'):
+            rows.sort(key=lambda row: row['key'])
+        else:
+            rows.sort(key=lambda row: -row['value'])
+        return rows[:limit] if limit else rows
+
+    def stats(self):
+        return {"transactions": len(self._rows), "lineRows": len(self.lines), "entryRows": len(self.entries),
+                "version": self.version}
+
+
+SNAPSHOT = ColumnarSnapshot()
+transaction_store.TRANSACTION_VIEWS.add(SNAPSHOT, transaction_store.TRANSACTION_CACHE)
+
+
+def execute_query_sales(metric, group_by=None, customer_name=None, product_name=None, delivery_boy_name=None,
+                        date_from=None, date_to=None, min_value=None, limit=10):
+    """Agent tool: one filtered (and optionally grouped) aggregation over every transaction"""
+    import transactions
+
+    if not transaction_store.TRANSACTION_CACHE:
+        transaction_store.refresh_transaction_cache()
+
+    entities = transactions.EntityResolver()
+    filters = {}
+    labels = []
+    for field, search_name, resolve in (('customer', customer_name, entities.customer),
+                                        ('product', product_name, entities.product),
+                                        ('deliveryPerson', delivery_boy_name, entities.delivery_person)):
+        if not search_name:
+            continue
+        record_data, error = resolve(search_name)
+        if error:
+            return error
+        filters[field] = record_data.get('productId') if field == 'product' else record_data.get('userId')
+        labels.append(record_data.get('name') if field == 'product' else record_data.get('fullName'))
+
+    try:
+        rows = SNAPSHOT.aggregate(metric, group_by, filters, transaction_store.parse_day(date_from),
+                                  transaction_store.parse_day(date_to), min_value, limit=limit)
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID QUERY: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+
+    scope = f" for {', '.join(labels)}" if labels else ""
+    if group_by is None:
+        value = rows[0]['value'] if rows else 0
+        return {"response": f"{metric.capitalize()}{scope}: {value}.", "objectArray": rows}
+    if not rows:
+        return {"response": f"No {metric} found{scope}.", "objectArray": rows}
+    listed = ", ".join(f"{row['name'] or row['key']}: {row['value']}" for row in rows)
+    return {"response": f"{metric.capitalize()} by {group_by}{scope}: {listed}.", "objectArray": rows}
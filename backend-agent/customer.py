@@ -1,46 +1,40 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from firebase_admin import credentials, db
+import cache_sync
+import entity_index
+import refresh_coordinator
+import storage
 
 CUSTOMER_CACHE = {}
+CUSTOMER_INDEX = entity_index.EntityIndex('fullName')
 
-# Initialize FastAPI
-app = FastAPI()
-
-# Handle CORS (This allows your Angular app to talk to this server)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 1. INITIALIZE FIREBASE
-# Use the automatic credentials (no file needed)
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app'
-    }) #fuel-flow-india-default-rtdb.asia-southeast1.firebasedatabase.app
-except Exception as e:
-    print(f"Firebase Init Error in CUSTOMER: {e}")
+def set_customer_cache(snapshot):
+    """Replaces the cache and rebuilds its name index"""
+    global CUSTOMER_CACHE
+    CUSTOMER_CACHE = snapshot
+    CUSTOMER_INDEX.build(snapshot)
 
-def refresh_customer_cache():
+def fetch_customer_cache():
     """Fetches all customers from /customer/bucket and stores them in memory"""
-    global CUSTOMER_CACHE
     try:
         print("Refreshing Customer Cache...")
-        ref = db.reference('customer/bucket')
+        ref = storage.reference('customer/bucket')
         snapshot = ref.get()
         if snapshot:
-            CUSTOMER_CACHE = snapshot
+            CUSTOMER_SYNC.load(snapshot)
             print(f"Loaded {len(snapshot)} customers.")
         else:
             print("No customers found in /customer/bucket")
     except Exception as e:
         print(f"Error fetching customers: {e}")
 
-refresh_customer_cache()
+# Keeps the cache current from /customer/bucket listener deltas once main starts the sync engine
+CUSTOMER_SYNC = cache_sync.SyncedCache('customer/bucket', lambda: CUSTOMER_CACHE, set_customer_cache, CUSTOMER_INDEX, lambda: refresh_customer_cache())
+
+# All callers share one in-flight download of /customer/bucket (see refresh_coordinator)
+CUSTOMER_REFRESH = refresh_coordinator.RefreshCoordinator('customer/bucket', fetch_customer_cache, lambda: CUSTOMER_SYNC.live)
+
+def refresh_customer_cache(force=False):
+    """Refreshes the cache, joining a refresh already in flight instead of downloading again"""
+    return CUSTOMER_REFRESH.refresh(force=force)
 
 def find_customer_by_name(search_name):
     """Searches the in-memory cache for a customer name"""
@@ -49,23 +43,24 @@ def find_customer_by_name(search_name):
     # If cache is empty, try to refresh it once
     if not CUSTOMER_CACHE:
         refresh_customer_cache()
+    else:
+        CUSTOMER_REFRESH.revalidate()
+
+    # Substring match served by the precomputed name index (same order as the bucket)
+    search_response = CUSTOMER_INDEX.search(search_name)
 
-    search_lower = search_name.lower()
-    search_response = []
-    
-    # Iterate through the bucket structure
-    # Structure: { "USER_ID": { "data": { "fullName": "...", ... }, "others": ... } }
-    for user_id, record in CUSTOMER_CACHE.items():
-        user_data = record.get('data', {})
-        full_name = user_data.get('fullName', '')
-        
-        # Check for name match
-        if full_name and search_lower in full_name.lower():
-            search_response.append(user_data)
-        
     return search_response if len(search_response) > 0 else None 
     # Returns the inner 'data' object which has userId, address, etc.
 
+def match_customer_by_name(search_name, k=5, within=None):
+    """Ranks cached customers (or only `within`) against a possibly misspelled name, best first with confidence scores"""
+    if not search_name: return []
+
+    if not CUSTOMER_CACHE:
+        refresh_customer_cache()
+
+    return CUSTOMER_INDEX.top_k(search_name, k, within)
+
 def execute_get_customer_details(customer_name):
     """Logic to search cache and return object"""
     customer = find_customer_by_name(customer_name)
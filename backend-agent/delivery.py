@@ -1,47 +1,40 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from firebase_admin import credentials, db
+import cache_sync
+import entity_index
+import refresh_coordinator
+import storage
 
 DELIVERY_BOY_CACHE = {}
+DELIVERY_BOY_INDEX = entity_index.EntityIndex('fullName')
 
-# Initialize FastAPI
-app = FastAPI()
-
-# Handle CORS (This allows your Angular app to talk to this server)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 1. INITIALIZE FIREBASE
-# Use the automatic credentials (no file needed)
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app'
-    }) #fuel-flow-india-default-rtdb.asia-southeast1.firebasedatabase.app
-except Exception as e:
-    print(f"Firebase Init Error in CUSTOMER: {e}")
-
+def set_delivery_boy_cache(snapshot):
+    """Replaces the cache and rebuilds its name index"""
+    global DELIVERY_BOY_CACHE
+    DELIVERY_BOY_CACHE = snapshot
+    DELIVERY_BOY_INDEX.build(snapshot)
 
-def refresh_delivery_boy_cache():
+def fetch_delivery_boy_cache():
     """Fetches all delivery persom from /deliveryPerson/bucket and stores them in memory"""
-    global DELIVERY_BOY_CACHE
     try:
         print("Refreshing delivery Person Cache...")
-        ref = db.reference('deliveryPerson/bucket')
+        ref = storage.reference('deliveryPerson/bucket')
         snapshot = ref.get()
         if snapshot:
-            DELIVERY_BOY_CACHE = snapshot
+            DELIVERY_BOY_SYNC.load(snapshot)
             print(f"Loaded {len(snapshot)} delivery persons.")
         else:
             print("No delivery persons found in /deliveryPerson/bucket")
     except Exception as e:
         print(f"Error fetching delivery persons: {e}")
 
-refresh_delivery_boy_cache()
+# Keeps the cache current from /deliveryPerson/bucket listener deltas once main starts the sync engine
+DELIVERY_BOY_SYNC = cache_sync.SyncedCache('deliveryPerson/bucket', lambda: DELIVERY_BOY_CACHE, set_delivery_boy_cache, DELIVERY_BOY_INDEX, lambda: refresh_delivery_boy_cache())
+
+# All callers share one in-flight download of /deliveryPerson/bucket (see refresh_coordinator)
+DELIVERY_BOY_REFRESH = refresh_coordinator.RefreshCoordinator('deliveryPerson/bucket', fetch_delivery_boy_cache, lambda: DELIVERY_BOY_SYNC.live)
+
+def refresh_delivery_boy_cache(force=False):
+    """Refreshes the cache, joining a refresh already in flight instead of downloading again"""
+    return DELIVERY_BOY_REFRESH.refresh(force=force)
 
 def find_delivery_boy_by_name(search_name):
     """Searches the in-memory cache for a delivery name"""
@@ -50,23 +43,24 @@ def find_delivery_boy_by_name(search_name):
     # If cache is empty, try to refresh it once
     if not DELIVERY_BOY_CACHE:
         refresh_delivery_boy_cache()
+    else:
+        DELIVERY_BOY_REFRESH.revalidate()
+
+    # Substring match served by the precomputed name index (same order as the bucket)
+    search_response = DELIVERY_BOY_INDEX.search(search_name)
 
-    search_lower = search_name.lower()
-    search_response = []
-    
-    # Iterate through the bucket structure
-    # Structure: { "USER_ID": { "data": { "fullName": "...", ... }, "others": ... } }
-    for user_id, record in DELIVERY_BOY_CACHE.items():
-        user_data = record.get('data', {})
-        full_name = user_data.get('fullName', '')
-        
-        # Check for name match
-        if full_name and search_lower in full_name.lower():
-            search_response.append(user_data)
-        
     return search_response if len(search_response) > 0 else None 
     # Returns the inner 'data' object which has userId, address, etc.
 
+def match_delivery_boy_by_name(search_name, k=5, within=None):
+    """Ranks cached delivery persons (or only `within`) against a possibly misspelled name, best first with confidence scores"""
+    if not search_name: return []
+
+    if not DELIVERY_BOY_CACHE:
+        refresh_delivery_boy_cache()
+
+    return DELIVERY_BOY_INDEX.top_k(search_name, k, within)
+
 def execute_get_delivery_boy_details(delivery_boy_name):
     """Logic to search cache and return object"""
     delivery = find_delivery_boy_by_name(delivery_boy_name)
@@ -0,0 +1,39 @@
+import cache_sync
+import refresh_coordinator
+import storage
+
+# Deposits from /depositObjectList/{customerId}/{transactionId}, kept in memory like the entity caches.
+# Views derived from them (the ledger) register on DEPOSIT_VIEWS and follow the same deltas.
+
+DEPOSIT_CACHE = {}  # customerId -> { transactionId: DepositEntry }
+DEPOSIT_VIEWS = cache_sync.ViewSet()
+
+def set_deposit_cache(snapshot):
+    """Replaces the cache and rebuilds every view"""
+    global DEPOSIT_CACHE
+    DEPOSIT_CACHE = snapshot
+    DEPOSIT_VIEWS.build(snapshot)
+
+def fetch_deposit_cache():
+    """Fetches all deposits from /depositObjectList and stores them in memory"""
+    try:
+        print("Refreshing Deposit Cache...")
+        ref = storage.reference('depositObjectList')
+        snapshot = ref.get()
+        if snapshot:
+            DEPOSIT_SYNC.load(snapshot)
+            print(f"Loaded deposits of {len(snapshot)} customers.")
+        else:
+            print("No deposits found in /depositObjectList")
+    except Exception as e:
+        print(f"Error fetching deposits: {e}")
+
+# Keeps the cache current from /depositObjectList listener deltas once main starts the sync engine
+DEPOSIT_SYNC = cache_sync.SyncedCache('depositObjectList', lambda: DEPOSIT_CACHE, set_deposit_cache, DEPOSIT_VIEWS, lambda: refresh_deposit_cache())
+
+# All callers share one in-flight download of /depositObjectList (see refresh_coordinator)
+DEPOSIT_REFRESH = refresh_coordinator.RefreshCoordinator('depositObjectList', fetch_deposit_cache, lambda: DEPOSIT_SYNC.live)
+
+def refresh_deposit_cache(force=False):
+    """Refreshes the cache, joining a refresh already in flight instead of downloading again"""
+    return DEPOSIT_REFRESH.refresh(force=force)
@@ -0,0 +1,323 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+
+# Shared name index for the in-memory entity caches (customer, delivery, admin, product).
+# Each cache module owns one EntityIndex and rebuilds it whenever its cache is refreshed,
+# so find_*_by_name no longer walks the whole bucket and lowercases every name per lookup.
+
+GRAM_SIZE = 3
+
+# Fuzzy matching: how many trigram-overlap candidates get fully scored, and when the
+# best candidate is trusted enough to be used without asking the user
+FUZZY_CANDIDATES = 50
+AUTO_RESOLVE_SCORE = 0.8
+AUTO_RESOLVE_MARGIN = 0.1
+# When several names already contain the query, only an exact name may win without asking
+EXACT_MATCH_SCORE = 1.0
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+PHONETIC_RULES = [
+    ('ph', 'f'), ('sh', 's'), ('kh', 'k'), ('gh', 'g'), ('th', 't'), ('dh', 'd'),
+    ('bh', 'b'), ('ch', 'c'), ('ck', 'k'), ('q', 'k'), ('x', 'ks'), ('w', 'v'), ('z', 'j'),
+]
+
+
+def normalize_name(name):
+    """Normalizes a name the same way the old linear scans compared them"""
+    return name.lower() if isinstance(name, str) else ''
+
+
+def name_grams(name):
+    """Returns the distinct trigrams of an already normalized name"""
+    return {name[i:i + GRAM_SIZE] for i in range(len(name) - GRAM_SIZE + 1)}
+
+
+def index_grams(name):
+    """Returns every distinct 1-, 2- and 3-character substring of a normalized name.
+
+    Short grams get their own postings so one- and two-letter queries are answered
+    straight from the index instead of by scanning every name.
+    """
+    return {name[i:i + size] for size in range(1, GRAM_SIZE + 1) for i in range(len(name) - size + 1)}
+
+
+def name_tokens(name):
+    """Splits an already normalized name into alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(name)
+
+
+def phonetic_key(token):
+    """Coarse sound-alike key tuned for transliterated names (Rakesh/Raakesh, Oxgen/Oxygen)"""
+    if not token or token.isdigit():
+        return token
+    for pattern, replacement in PHONETIC_RULES:
+        token = token.replace(pattern, replacement)
+
+    key = token[0]
+    for char in token[1:]:
+        if char in 'aeiouyh' or char == key[-1]:
+            continue
+        key += char
+    return key
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def similarity(a, b):
+    """Edit-distance similarity in [0, 1]"""
+    if a == b:
+        return 1.0
+    longest = max(len(a), len(b))
+    return 1 - edit_distance(a, b) / longest if longest else 0.0
+
+
+def token_similarity(query_token, name_token):
+    """Similarity of two tokens, treating a typed prefix (Ramesh -> Rameshwar) as a strong hint"""
+    score = similarity(query_token, name_token)
+    if name_token.startswith(query_token):
+        score = max(score, 0.8)
+    return score
+
+
+def _discard_sorted(items, value):
+    """Removes value from an ascending list if present"""
+    position = bisect.bisect_left(items, value)
+    if position < len(items) and items[position] == value:
+        del items[position]
+
+
+def confident_match(candidates, min_score=AUTO_RESOLVE_SCORE):
+    """Returns the top candidate's data when it is confident and clearly ahead of every other candidate"""
+    if not candidates:
+        return None
+    best = candidates[0]
+    runner_up = candidates[1]['score'] if len(candidates) > 1 else 0
+    if best['score'] >= min_score and best['score'] - runner_up >= AUTO_RESOLVE_MARGIN:
+        return best['data']
+    return None
+
+
+class EntityIndex:
+    """Precomputed normalized names with trigram postings for a Firebase bucket"""
+
+    def __init__(self, name_field):
+        self.name_field = name_field
+        self.version = 0        # bumped on every build/upsert/remove
+        self.updated_at = None  # epoch ms of the last change
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._slots = {}    # record key -> slot (slot order == cache order)
+        self._names = []    # slot -> normalized name ('' when the record has no name)
+        self._data = []     # slot -> inner 'data' object of the record
+        self._grams = {}    # 1/2/3-char gram -> ascending list of slots
+        self._sorted = []   # (normalized name, slot) pairs for prefix lookups
+        self._tokens = []   # slot -> list of (token, phonetic key)
+        self._sounds = {}   # phonetic key -> ascending list of slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def build(self, cache):
+        """Rebuilds the index from a { KEY: { "data": {...}, "others": ... } } bucket"""
+        with self._lock:
+            self._reset()
+            for key, record in (cache or {}).items():
+                self._add(key, record)
+            self._sorted.sort()
+            self._touch()
+
+    def upsert(self, key, record):
+        """Adds or replaces a single record without rebuilding the whole index"""
+        with self._lock:
+            if key in self._slots:
+                slot = self._slots[key]
+                self._unlink(slot)
+                self._link(slot, record)
+            else:
+                self._add(key, record)
+                if self._names[-1]:
+                    # _add appended the pair, move it to its sorted position
+                    self._sorted.pop()
+                    bisect.insort(self._sorted, (self._names[-1], len(self._names) - 1))
+            self._touch()
+
+    def remove(self, key):
+        """Drops a record; its slot stays behind as an empty tombstone until the next build"""
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return
+            self._unlink(slot)
+            self._names[slot] = ''
+            self._data[slot] = {}
+            self._tokens[slot] = []
+            self._touch()
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = int(time.time() * 1000)
+
+    def _unlink(self, slot):
+        name = self._names[slot]
+        if not name:
+            return
+        for gram in index_grams(name):
+            _discard_sorted(self._grams.get(gram, []), slot)
+        for sound in {sound for _, sound in self._tokens[slot]}:
+            _discard_sorted(self._sounds.get(sound, []), slot)
+        _discard_sorted(self._sorted, (name, slot))
+
+    def _link(self, slot, record):
+        record_data = record.get('data', {}) if isinstance(record, dict) else {}
+        name = normalize_name(record_data.get(self.name_field, ''))
+
+        self._names[slot] = name
+        self._data[slot] = record_data
+        self._tokens[slot] = [(token, phonetic_key(token)) for token in name_tokens(name)]
+        if not name:
+            return
+
+        for gram in index_grams(name):
+            bisect.insort(self._grams.setdefault(gram, []), slot)
+        for sound in {sound for _, sound in self._tokens[slot]}:
+            bisect.insort(self._sounds.setdefault(sound, []), slot)
+        bisect.insort(self._sorted, (name, slot))
+
+    def _add(self, key, record):
+        slot = len(self._names)
+        record_data = record.get('data', {}) if isinstance(record, dict) else {}
+        name = normalize_name(record_data.get(self.name_field, ''))
+
+        self._slots[key] = slot
+        self._names.append(name)
+        self._data.append(record_data)
+        self._tokens.append([(token, phonetic_key(token)) for token in name_tokens(name)])
+        if not name:
+            return
+
+        for gram in index_grams(name):
+            self._grams.setdefault(gram, []).append(slot)
+        for sound in {sound for _, sound in self._tokens[slot]}:
+            self._sounds.setdefault(sound, []).append(slot)
+        self._sorted.append((name, slot))
+
+    def search(self, query):
+        """Returns the 'data' objects whose name contains the query, in cache order"""
+        needle = normalize_name(query)
+        if not needle:
+            return []
+
+        with self._lock:
+            if len(needle) <= GRAM_SIZE:
+                # Every gram this short is indexed, so its postings are exactly the matches
+                return [self._data[slot] for slot in self._grams.get(needle, ())]
+
+            candidates = None
+            for gram in name_grams(needle):
+                postings = self._grams.get(gram)
+                if not postings:
+                    return []
+                if candidates is None or len(postings) < len(candidates):
+                    candidates = postings
+
+            names = self._names
+            return [self._data[slot] for slot in candidates if needle in names[slot]]
+
+    def prefix(self, query):
+        """Returns the 'data' objects whose name starts with the query, in cache order"""
+        needle = normalize_name(query)
+        if not needle:
+            return []
+
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, (needle,))
+            slots = []
+            for name, slot in self._sorted[start:]:
+                if not name.startswith(needle):
+                    break
+                slots.append(slot)
+            slots.sort()
+            return [self._data[slot] for slot in slots]
+
+    def top_k(self, query, k=5, within=None):
+        """Ranks records by edit-distance, phonetic and token-overlap similarity to the query.
+
+        Returns up to k { "score": 0..1, "data": {...} } entries, best first. With `within`
+        (a list of 'data' objects, e.g. substring hits) only those records are ranked.
+        """
+        needle = normalize_name(query)
+        query_tokens = [(token, phonetic_key(token)) for token in name_tokens(needle)]
+        if not query_tokens:
+            return []
+
+        if within is not None:
+            scored = []
+            for position, record_data in enumerate(within):
+                name = normalize_name(record_data.get(self.name_field, ''))
+                tokens = [(token, phonetic_key(token)) for token in name_tokens(name)]
+                scored.append((-self._score(needle, query_tokens, name, tokens), position))
+            best = heapq.nsmallest(k, scored)
+            return [{'score': round(-score, 3), 'data': within[position]} for score, position in best]
+
+        with self._lock:
+            # Candidates: records sharing the most trigrams, plus every sound-alike token
+            overlap = {}
+            for gram in name_grams(needle):
+                for slot in self._grams.get(gram, ()):
+                    overlap[slot] = overlap.get(slot, 0) + 1
+            candidates = set(heapq.nlargest(FUZZY_CANDIDATES, overlap, key=overlap.get))
+            for _, sound in query_tokens:
+                candidates.update(self._sounds.get(sound, ()))
+
+            scored = []
+            for slot in candidates:
+                name = self._names[slot]
+                if not name:
+                    continue
+                score = self._score(needle, query_tokens, name, self._tokens[slot])
+                scored.append((-score, slot))
+
+            best = heapq.nsmallest(k, scored)
+            return [{'score': round(-score, 3), 'data': self._data[slot]} for score, slot in best]
+
+    @staticmethod
+    def _score(needle, query_tokens, name, tokens):
+        # Spacing is noise in dictated names ("LPG 14 KG" vs "LPG 14KG")
+        compact_needle = ''.join(token for token, _ in query_tokens)
+        compact_name = ''.join(token for token, _ in tokens)
+        if compact_needle == compact_name:
+            return 1.0
+
+        token_scores = []
+        sound_hits = 0
+        for query_token, query_sound in query_tokens:
+            token_scores.append(max((token_similarity(query_token, token) for token, _ in tokens), default=0.0))
+            if any(sound == query_sound for _, sound in tokens):
+                sound_hits += 1
+
+        token_score = sum(token_scores) / len(token_scores)
+        overlap_score = sum(1 for score in token_scores if score >= 0.8) / len(token_scores)
+        phonetic_score = sound_hits / len(query_tokens)
+        full_score = similarity(compact_needle, compact_name)
+
+        return 0.45 * token_score + 0.2 * full_score + 0.2 * phonetic_score + 0.15 * overlap_score
@@ -0,0 +1,341 @@
+import csv
+import datetime
+import functools
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import customer
+import ledger
+import transaction_store
+
+# Streaming CSV/XLSX export with the same layouts as the frontend's ExportService.
+# Rows are selected through the transaction index and written one at a time, so neither the browser
+# nor this service holds the whole workbook: the XLSX is a zip whose sheet XML is deflated as it is
+# generated and handed to the response in CHUNK_BYTES pieces.
+
+CHUNK_BYTES = 64 * 1024
+
+FULL_COLUMNS = ['Date', 'Customer', 'Address', 'Delivery Person', 'Product', 'Sent', 'Receieved', 'Pending',
+                'Rate/Unit', 'Total Amount', 'Paid Amount', 'Due Amount', 'Extra Note', 'Status']
+SHEET_NAME_INVALID = re.compile(r'[\[\]:*?/\\]')
+XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+@functools.lru_cache(maxsize=4096)
+def display_date(date_text):
+    """'dd/mm/yyyy' -> 'dd Month yyyy', as dateConverter does in the frontend"""
+    day = transaction_store.day_key(date_text)
+    try:
+        return datetime.date(day // 10000, day // 100 % 100, day % 100).strftime('%d %B %Y')
+    except ValueError:
+        return date_text or ''
+
+
+def customer_name(customer_data):
+    """The customer's current name, falling back to the one stored on the entry"""
+    user_id = (customer_data or {}).get('userId')
+    current = ((customer.CUSTOMER_CACHE.get(user_id) or {}).get('data') or {}).get('fullName') if user_id else None
+    return current or (customer_data or {}).get('fullName') or ''
+
+
+class SheetTotals:
+    """Running 'Total' row of a sheet (convertData's exportTotal)"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.sums = {'Sent': 0, 'Receieved': 0, 'Pending': 0, 'Total Amount': 0, 'Paid Amount': 0, 'Due Amount': 0}
+
+    def add(self, row, returnable):
+        if row['Total Amount'] != '':
+            for field in ('Total Amount', 'Paid Amount', 'Due Amount'):
+                self.sums[field] += row[field]
+        if returnable:
+            for field in ('Sent', 'Receieved', 'Pending'):
+                self.sums[field] += row[field] or 0
+
+    def row(self):
+        return [self.sums.get(column, 'Total' if column == 'Product' else '') for column in self.columns]
+
+
+def entry_rows(record):
+    """Yields (row dict, product returnable) for one entry: one row per product, money on the first"""
+    data = record.get('data') or {}
+    total = ledger.to_int(data.get('total'))
+    payment = ledger.to_int(data.get('payment'))
+    first = {
+        'Date': display_date(data.get('date')),
+        'Customer': customer_name(data.get('customer')),
+        'Address': data.get('shippingAddress') or '',
+        'Delivery Person': ', '.join((person or {}).get('fullName') or '' for person in data.get('deliveryBoyList') or []),
+    }
+    blank = dict.fromkeys(first, '')
+    extra = data.get('extraDetails') or ''
+    status = data.get('status') or ''
+
+    products = [item for item in data.get('selectedProducts') or [] if isinstance(item, dict)]
+    if not products:
+        yield {**first, 'Product': '', 'Sent': '', 'Receieved': '', 'Pending': '', 'Rate/Unit': '',
+               'Total Amount': 0, 'Paid Amount': payment, 'Due Amount': -payment,
+               'Extra Note': extra, 'Status': status}, False
+        return
+
+    for position, product_line in enumerate(products):
+        product_data = product_line.get('productData') or {}
+        returnable = bool(product_data.get('productReturnable'))
+        sent = ledger.to_int(product_line.get('sentUnits'))
+        received = ledger.to_int(product_line.get('recievedUnits'))
+        row = {
+            **(first if position == 0 else blank),
+            'Product': product_data.get('name') or '',
+            'Sent': sent,
+            'Receieved': received if returnable else 0,
+            'Pending': sent - received if returnable else 0,
+            'Rate/Unit': product_data.get('rate') or 0,
+            'Total Amount': total if position == 0 else '',
+            'Paid Amount': payment if position == 0 else '',
+            'Due Amount': total - payment if position == 0 else '',
+            'Extra Note': extra,
+            'Status': status if position == 0 else ''
+        }
+        yield row, returnable
+
+
+def full_sheet_rows(keys):
+    """Header, one row per product line of every entry, a blank row and the total row"""
+    totals = SheetTotals(FULL_COLUMNS)
+    yield FULL_COLUMNS
+    cache = transaction_store.TRANSACTION_CACHE
+    for key in keys:
+        record = cache.get(key)
+        if record is None:
+            continue
+        for row, returnable in entry_rows(record):
+            totals.add(row, returnable)
+            yield [row[column] for column in FULL_COLUMNS]
+    yield []
+    yield totals.row()
+
+
+def pending_rows(customer_id=None, include_negative=False):
+    """The pending-returns sheet: one row per customer, a column per returnable product, then totals"""
+    balances = [ledger.LEDGER.balance(customer_id)] if customer_id else \
+        [ledger.LEDGER.balance(user_id) for user_id in ledger.LEDGER.customer_ids()]
+
+    rows = []
+    product_names = []
+    for balance in balances:
+        if balance is None:
+            continue
+        pending = {item['name']: item['pending'] for item in balance['products'] if item['productReturnable']}
+        total = sum(pending.values())
+        if total > 0 or include_negative and total != 0:
+            rows.append((customer_name({'userId': balance['customerId'], 'fullName': balance['fullName']}), total, pending))
+            product_names.extend(name for name in pending if name not in product_names)
+    rows.sort(key=lambda row: -row[1])
+
+    yield ['Customer Name', 'Total Pending'] + product_names
+    column_totals = dict.fromkeys(product_names, 0)
+    for name, total, pending in rows:
+        for product_name, value in pending.items():
+            column_totals[product_name] += value
+        yield [name, total] + [pending.get(product_name, '') for product_name in product_names]
+    yield []
+    yield ['Total', sum(row[1] for row in rows)] + [column_totals[product_name] for product_name in product_names]
+
+
+def sheet_name(name, used):
+    """Excel sheet names: at most 31 characters, no []:*?/\\, unique within the workbook"""
+    name = SHEET_NAME_INVALID.sub(' ', str(name or 'Unknown')).strip() or 'Unknown'
+    if len(name) > 30:
+        name = name[:25] + '...'
+    candidate, suffix = name, 2
+    while candidate.lower() in used:
+        candidate = f"{name[:27]} ({suffix})"
+        suffix += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def select_keys(customer_id=None, tag=None, date_from=None, date_to=None):
+    """Matching transaction keys, oldest first (the order convertData writes in)"""
+    if not transaction_store.TRANSACTION_CACHE:
+        transaction_store.refresh_transaction_cache()
+    else:
+        transaction_store.TRANSACTION_REFRESH.revalidate()
+    return transaction_store.TRANSACTION_INDEX.query(
+        {'customer': customer_id, 'tag': tag},
+        transaction_store.parse_day(date_from), transaction_store.parse_day(date_to)
+    )
+
+
+def plan_sheets(layout, per_sheet=None, customer_id=None, tag=None, date_from=None, date_to=None, include_negative=False):
+    """Returns [(sheet name, row iterator factory)] for a layout ('full' or 'pending')"""
+    if layout == 'pending':
+        return [('Pending Returns', lambda: pending_rows(customer_id, include_negative))]
+    if layout != 'full':
+        raise ValueError(f"unknown layout '{layout}', expected full or pending")
+
+    keys = select_keys(customer_id, tag, date_from, date_to)
+    used = {'full data'}
+    sheets = [('Full Data', lambda: full_sheet_rows(keys))]
+    if per_sheet == 'customer':
+        # The customer index already groups the entries; only the selected keys are kept
+        selected = set(keys)
+        customers = transaction_store.TRANSACTION_INDEX.values('customer')
+        customers = [user_id for user_id in customers if not customer_id or user_id == customer_id]
+        cache = transaction_store.TRANSACTION_CACHE
+        named = []
+        for user_id in customers:
+            customer_keys = [key for key in transaction_store.TRANSACTION_INDEX.query({'customer': user_id})
+                             if key in selected]
+            if customer_keys:
+                stored = ((cache.get(customer_keys[0]) or {}).get('data') or {}).get('customer')
+                named.append((customer_name(stored) or user_id, customer_keys))
+        for name, customer_keys in sorted(named, key=lambda item: item[0].lower()):
+            sheets.append((sheet_name(name, used), functools.partial(full_sheet_rows, customer_keys)))
+    elif per_sheet == 'address':
+        by_address = {}
+        cache = transaction_store.TRANSACTION_CACHE
+        for key in keys:
+            address = ((cache.get(key) or {}).get('data') or {}).get('shippingAddress') or 'No Address'
+            by_address.setdefault(str(address), []).append(key)
+        for address, address_keys in by_address.items():
+            sheets.append((sheet_name(address, used), functools.partial(full_sheet_rows, address_keys)))
+    elif per_sheet:
+        raise ValueError(f"unknown perSheet '{per_sheet}', expected customer or address")
+    return sheets
+
+
+class _Sink:
+    """Write-only, non-seekable file that hands its bytes to the caller in chunks"""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self, minimum=0):
+        if self._size < minimum or not self._size:
+            return b''
+        data = b''.join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        return data
+
+
+@functools.lru_cache(maxsize=65536)
+def _text_cell(text):
+    text = XML_INVALID.sub('', text)
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _cell(value):
+    if type(value) is int or type(value) is float:
+        return f'<c><v>{value}</v></c>'
+    # Names, dates and products repeat on most rows: their XML is built once
+    return _text_cell(str(value))
+
+
+def _workbook_parts(names):
+    sheets = ''.join(f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{n}" r:id="rId{n}"/>'
+                     for n, name in enumerate(names, 1))
+    relationships = ''.join(
+        f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{n}.xml"/>' for n in range(1, len(names) + 1))
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for n in range(1, len(names) + 1))
+    return {
+        '[Content_Types].xml':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{overrides}</Types>',
+        '_rels/.rels':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>',
+        'xl/workbook.xml':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheets}</sheets></workbook>',
+        'xl/_rels/workbook.xml.rels':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relationships}</Relationships>',
+    }
+
+
+def stream_xlsx(sheets, chunk_bytes=CHUNK_BYTES):
+    """Yields an .xlsx file (inline strings, no styles) for [(sheet name, row iterator factory)]"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for part, xml in _workbook_parts([name for name, _ in sheets]).items():
+            archive.writestr(part, xml)
+
+        for number, (_, rows) in enumerate(sheets, 1):
+            with archive.open(f'xl/worksheets/sheet{number}.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+                batch = []
+                for row in rows():
+                    batch.append('<row>' + ''.join(map(_cell, row)) + '</row>')
+                    if len(batch) >= 256:
+                        sheet.write(''.join(batch).encode('utf-8'))
+                        batch.clear()
+                        chunk = sink.drain(chunk_bytes)
+                        if chunk:
+                            yield chunk
+                sheet.write(''.join(batch).encode('utf-8'))
+                sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def stream_csv(rows, chunk_bytes=CHUNK_BYTES):
+    """Yields UTF-8 CSV (with a BOM so Excel detects the encoding) for one sheet's rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def export_stream(data_format='xlsx', layout='full', per_sheet=None, customer_id=None, tag=None,
+                  date_from=None, date_to=None, include_negative=False):
+    """Returns (media type, file name, byte iterator). Raises ValueError for bad parameters"""
+    sheets = plan_sheets(layout, per_sheet, customer_id, tag, date_from, date_to, include_negative)
+    prefix = 'Pending Returns' if layout == 'pending' else 'Inventory'
+    file_name = f"{prefix}_{datetime.datetime.now().strftime('%d-%m-%Y_%H-%M-%S')}"
+    if data_format == 'xlsx':
+        return ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', f"{file_name}.xlsx",
+                stream_xlsx(sheets))
+    if data_format == 'csv':
+        if len(sheets) > 1:
+            raise ValueError("CSV holds a single sheet; use format=xlsx with perSheet")
+        return 'text/csv', f"{file_name}.csv", stream_csv(sheets[0][1]())
+    raise ValueError(f"unknown format '{data_format}', expected xlsx or csv")
@@ -0,0 +1,184 @@
+import os
+import re
+import threading
+import time
+
+import customer
+import delivery
+import entity_index
+import product
+
+# Deterministic parser for routine delivery messages.
+# "Sweta delivered 5 LPG 14KG to Rakesh, got 3 back, paid 2000" is turned into process_transaction
+# arguments without a Gemini round-trip. A message is only taken when every clause is understood
+# and every name resolves to exactly one indexed record; anything else goes to the model as before.
+# Each line of a message is one delivery, so a dictated summary becomes a batch.
+
+# Set FAST_PATH=0 to send every message to the model
+ENABLED = os.environ.get("FAST_PATH", "1") == "1"
+
+SENT_VERBS = r'(?:delivered|gave|given|sold|dropped|supplied|sent)'
+UNIT_WORDS = r'(?:(?:cylinders?|cyl|units?|pcs|nos)\s+(?:of\s+)?)?'
+NUMBER = r'(\d+)'
+
+# "<boy> delivered 5 LPG 14KG to <customer>"
+DELIVERY_PATTERN = re.compile(
+    rf'^(?P<boy>.+?)\s+(?:has\s+)?{SENT_VERBS}\s+(?P<sent>\d+)\s+{UNIT_WORDS}(?P<product>.+?)\s+(?:to|for|at)\s+(?P<customer>.+)$',
+    re.IGNORECASE
+)
+# "delivered 5 LPG 14KG to <customer> by <boy>"
+PASSIVE_PATTERN = re.compile(
+    rf'^{SENT_VERBS}\s+(?P<sent>\d+)\s+{UNIT_WORDS}(?P<product>.+?)\s+(?:to|for|at)\s+(?P<customer>.+?)\s+(?:by|via)\s+(?P<boy>.+)$',
+    re.IGNORECASE
+)
+RECEIVED_PATTERNS = [
+    re.compile(rf'^(?:.+?\s+)?(?:got|took|collected|received)\s+{NUMBER}\s+(?:\w+\s+)?(?:back|empt(?:y|ies)|returns?)$', re.IGNORECASE),
+    re.compile(rf'^(?:.+?\s+)?returned\s+{NUMBER}(?:\s+\w+)?$', re.IGNORECASE),
+    re.compile(rf'^{NUMBER}\s+(?:empt(?:y|ies)|returns?)(?:\s+(?:back|received|collected|returned))?$', re.IGNORECASE),
+]
+CURRENCY = r'(?:rs\.?|inr|₹)'
+CURRENCY_SUFFIX = r'\s*(?:rs|rupees|/-)'
+PAYMENT_PATTERNS = [
+    re.compile(rf'^(?:.+?\s+)?(?:paid|payment(?:\s+of)?)\s*{CURRENCY}?\s*{NUMBER}(?:{CURRENCY_SUFFIX})?$', re.IGNORECASE),
+    # "collected 2" / "received 3" may be cylinders as well as rupees: only taken with a currency marker
+    re.compile(rf'^(?:.+?\s+)?(?:collected|received)\s*(?:{CURRENCY}\s*{NUMBER}(?:{CURRENCY_SUFFIX})?|{NUMBER}{CURRENCY_SUFFIX})$', re.IGNORECASE),
+]
+CLAUSE_SEPARATOR = re.compile(r'\s*(?:[,;]|\band\b)\s*', re.IGNORECASE)
+
+# Running numbers for /health
+_lock = threading.Lock()
+_stats = {"attempts": 0, "hits": 0, "misses": 0, "rejected": 0, "parseSeconds": 0.0}
+_model_latency = None   # moving average of observed model round-trips, in seconds
+MODEL_LATENCY_WEIGHT = 0.2
+
+
+def lookup(name, index):
+    """Same decision as resolver.resolve_entity, without refreshes: the one record `name` resolves to, or None"""
+    hits = index.search(name)
+    if len(hits) == 1:
+        return hits[0]
+    if hits:
+        # Among several hits only an exact, clearly leading name wins
+        return entity_index.confident_match(
+            index.top_k(name, k=len(hits), within=hits), min_score=entity_index.EXACT_MATCH_SCORE
+        )
+    return entity_index.confident_match(index.top_k(name))
+
+
+def spot(name, index):
+    """Returns the exact stored name if `name` resolves to one indexed record without asking, else None"""
+    name = (name or '').strip(' .')
+    if not name:
+        return None
+
+    record_data = lookup(name, index)
+    if not record_data:
+        return None
+    resolved = record_data.get(index.name_field)
+    # The write path resolves the stored name again; it must land on this same record
+    if not resolved or lookup(resolved, index) is not record_data:
+        return None
+    return resolved
+
+
+def parse_line(line):
+    """Parses one delivery line into process_transaction arguments, None if not confident"""
+    clauses = [clause.strip(' .') for clause in CLAUSE_SEPARATOR.split(line.strip()) if clause.strip(' .')]
+    if not clauses:
+        return None
+
+    core = DELIVERY_PATTERN.match(clauses[0]) or PASSIVE_PATTERN.match(clauses[0])
+    if not core:
+        return None
+
+    received = None
+    payment = None
+    for clause in clauses[1:]:
+        received_match = next((match for match in (pattern.match(clause) for pattern in RECEIVED_PATTERNS) if match), None)
+        if received_match and received is None:
+            received = int(received_match.group(1))
+            continue
+        payment_match = next((match for match in (pattern.match(clause) for pattern in PAYMENT_PATTERNS) if match), None)
+        if payment_match and payment is None:
+            payment = int(next(group for group in payment_match.groups() if group))
+            continue
+        return None     # a clause we do not understand: let the model read it
+
+    customer_name = spot(core.group('customer'), customer.CUSTOMER_INDEX)
+    boy_name = spot(core.group('boy'), delivery.DELIVERY_BOY_INDEX)
+    product_name = spot(core.group('product'), product.PRODUCT_INDEX)
+    if not (customer_name and boy_name and product_name):
+        return None
+
+    args = {
+        "customer_name": customer_name,
+        "delivery_boy_name": boy_name,
+        "product_name": product_name,
+        "sent_units": int(core.group('sent')),
+        "received_units": received or 0
+    }
+    if payment is not None:
+        args["payment_amount"] = payment
+    return args
+
+
+def parse(message):
+    """Returns [("process_transaction", args), ...] for a fully understood message, else None"""
+    if not ENABLED or not message:
+        return None
+
+    started = time.perf_counter()
+    lines = [line for line in str(message).splitlines() if line.strip()]
+    calls = []
+    matched = bool(lines)
+    for line in lines:
+        args = parse_line(line)
+        if args is None:
+            matched = False
+            break
+        calls.append(("process_transaction", args))
+
+    with _lock:
+        _stats["attempts"] += 1
+        _stats["parseSeconds"] += time.perf_counter() - started
+        if matched:
+            _stats["hits"] += 1
+        elif any(DELIVERY_PATTERN.match(line.strip()) or PASSIVE_PATTERN.match(line.strip()) for line in lines):
+            _stats["rejected"] += 1     # looked like a delivery, but a name or clause was unsure
+        else:
+            _stats["misses"] += 1
+    return calls if matched else None
+
+
+def record_model_latency(seconds):
+    """Feeds the moving average used to estimate the latency each fast-path hit saved"""
+    global _model_latency
+    with _lock:
+        if _model_latency is None:
+            _model_latency = seconds
+        else:
+            _model_latency += MODEL_LATENCY_WEIGHT * (seconds - _model_latency)
+
+
+def stats():
+    with _lock:
+        attempts = _stats["attempts"]
+        hits = _stats["hits"]
+        return {
+            "enabled": ENABLED,
+            "attempts": attempts,
+            "hits": hits,
+            "rejected": _stats["rejected"],
+            "misses": _stats["misses"],
+            "hitRate": round(hits / attempts, 3) if attempts else None,
+            "avgParseMs": round(_stats["parseSeconds"] / attempts * 1000, 3) if attempts else None,
+            "avgModelMs": round(_model_latency * 1000, 1) if _model_latency is not None else None,
+            "latencySavedMs": round(hits * _model_latency * 1000) if _model_latency is not None else None
+        }
+
+
+def reset_stats():
+    global _model_latency
+    with _lock:
+        _stats.update({"attempts": 0, "hits": 0, "misses": 0, "rejected": 0, "parseSeconds": 0.0})
+        _model_latency = None
@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Idempotency keys for the write endpoints.
+# A client sends the same Idempotency-Key header (or "idempotencyKey" in the JSON body) with every
+# retry of one submission. The first request with a key runs; a duplicate that arrives while it is
+# still running waits for it, and one that arrives later gets the stored reply - either way the
+# duplicate never reaches Firebase. Keys live in a bounded in-memory LRU for IDEMPOTENCY_TTL seconds.
+#
+# A run that fails before writing anything (e.g. the model timed out) calls retryable(), so the key
+# is released and a retry runs again instead of replaying the error.
+
+MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "10000"))
+TTL = int(os.environ.get("IDEMPOTENCY_TTL", str(24 * 60 * 60)))    # seconds
+MAX_KEY_LENGTH = 200
+
+HEADER = "idempotency-key"
+BODY_FIELD = "idempotencyKey"
+
+
+class Claim:
+    """One key's run: the reply (once known) and whether it wrote anything"""
+
+    def __init__(self, key, expires_at):
+        self.key = key
+        self.expires_at = expires_at
+        self.done = asyncio.Event()
+        self.reply = None
+        self.wrote = False
+        self.retry = False
+
+
+_CURRENT = contextvars.ContextVar("idempotency_claim", default=None)
+
+
+class IdempotencyCache:
+    def __init__(self, max_keys=MAX_KEYS, ttl=TTL, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.clock = clock
+        self._claims = OrderedDict()    # key -> Claim, oldest first
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.duplicates = 0
+        self.released = 0
+        self.evicted = 0
+
+    def claim(self, key):
+        """Returns (claim, True) for the first request with `key`, (its claim, False) for a duplicate"""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            claim = self._claims.get(key)
+            if claim is not None:
+                self.duplicates += 1
+                self._claims.move_to_end(key)
+                return claim, False
+            claim = self._claims[key] = Claim(key, now + self.ttl)
+            self.runs += 1
+            while len(self._claims) > self.max_keys:
+                self._claims.popitem(last=False)
+                self.evicted += 1
+            return claim, True
+
+    def _expire(self, now):
+        # Entries are ordered by last use; TTL counts from the first request
+        for key in [key for key, claim in self._claims.items() if claim.expires_at <= now and claim.done.is_set()]:
+            del self._claims[key]
+
+    def finish(self, claim, reply):
+        claim.reply = reply
+        if claim.retry and not claim.wrote:
+            with self._lock:
+                if self._claims.get(claim.key) is claim:
+                    del self._claims[claim.key]
+                self.released += 1
+        claim.done.set()
+
+    def __len__(self):
+        return len(self._claims)
+
+    def stats(self):
+        return {"keys": len(self._claims), "maxKeys": self.max_keys, "ttl": self.ttl, "runs": self.runs,
+                "duplicates": self.duplicates, "released": self.released, "evicted": self.evicted}
+
+
+IDEMPOTENCY = IdempotencyCache()
+
+
+def key_of(headers, body=None):
+    """The request's idempotency key (header first, then the JSON body), or None"""
+    key = (headers or {}).get(HEADER)
+    if not key and isinstance(body, dict):
+        key = body.get(BODY_FIELD)
+    if not key:
+        return None
+    return str(key)[:MAX_KEY_LENGTH]
+
+
+async def run_once(key, handler, cache=None):
+    """Awaits handler() for the first request with `key`; duplicates get that request's reply"""
+    if not key:
+        return await handler()
+    cache = IDEMPOTENCY if cache is None else cache
+    claim, first = cache.claim(key)
+    if not first:
+        await claim.done.wait()
+        if claim.retry and not claim.wrote:
+            return await run_once(key, handler, cache)     # the first run gave up without writing
+        return {**claim.reply, "replayed": True} if isinstance(claim.reply, dict) else claim.reply
+
+    token = _CURRENT.set(claim)
+    reply = None
+    try:
+        reply = await handler()
+        return reply
+    except BaseException:
+        retryable()     # released if nothing was written yet
+        reply = {
+                'warning': {
+                    'text': "An earlier request with this idempotency key failed part-way. Check the entries before sending it again.",
+                    'action': 'call_admin'
+                }
+            }
+        raise
+    finally:
+        _CURRENT.reset(token)
+        cache.finish(claim, reply)
+
+
+def writing():
+    """Called before the running request writes to Firebase: from here on its key is never released"""
+    claim = _CURRENT.get()
+    if claim is not None:
+        claim.wrote = True
+
+
+def retryable():
+    """The running request failed in a way a retry can fix; releases its key unless it already wrote"""
+    claim = _CURRENT.get()
+    if claim is not None:
+        claim.retry = True
@@ -0,0 +1,72 @@
+import datetime
+import os
+import threading
+
+# Collision-free transaction IDs in the frontend's YYYYMMDD_HHmmSS_xxxxx format.
+# The 5-char suffix is no longer random: 2 base-36 chars of node id (one per running instance)
+# followed by a 3 base-36 char sequence that restarts every second. Within an instance every ID is
+# unique and sorts after the previous one - if the clock steps back, or a second's 46,656 IDs are
+# used up, the generator keeps counting on the last second it issued instead of going backwards.
+# Digits sort before capitals, so the IDs still sort lexically in creation order.
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NODE_CHARS = 2
+SEQUENCE_CHARS = 3
+MAX_NODES = len(ALPHABET) ** NODE_CHARS
+MAX_SEQUENCE = len(ALPHABET) ** SEQUENCE_CHARS
+
+
+def base36(value, width):
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def default_node():
+    """TRANSACTION_ID_NODE (0-1295) when set, else a random node per process.
+
+    Give each instance its own node id to rule out cross-instance collisions entirely; with random
+    nodes two instances only collide if they pick the same node and log in the same second.
+    """
+    configured = os.environ.get("TRANSACTION_ID_NODE")
+    if configured:
+        return int(configured) % MAX_NODES
+    return int.from_bytes(os.urandom(2), 'big') % MAX_NODES
+
+
+class IdGenerator:
+    """Monotonic time + sequence + node IDs (thread-safe)"""
+
+    def __init__(self, node=None, clock=datetime.datetime.now):
+        self.node = default_node() if node is None else node
+        self.clock = clock
+        self._node_part = base36(self.node, NODE_CHARS)
+        self._lock = threading.Lock()
+        self._second = None     # datetime (truncated to the second) of the last ID
+        self._sequence = 0
+        self.issued = 0
+        self.borrowed = 0       # IDs stamped with a later second than the clock's (clock skew or overflow)
+
+    def next(self):
+        with self._lock:
+            now = self.clock().replace(microsecond=0)
+            if self._second is None or now > self._second:
+                self._second, self._sequence = now, 0
+            else:
+                # Same second, or the clock went back: continue from the last second issued
+                self._sequence += 1
+                if self._sequence >= MAX_SEQUENCE:
+                    self._second += datetime.timedelta(seconds=1)
+                    self._sequence = 0
+                if now < self._second:
+                    self.borrowed += 1
+            self.issued += 1
+            return f"{self._second.strftime('%Y%m%d_%H%M%S')}_{self._node_part}{base36(self._sequence, SEQUENCE_CHARS)}"
+
+    def stats(self):
+        return {"node": self._node_part, "issued": self.issued, "borrowed": self.borrowed}
+
+
+TRANSACTION_IDS = IdGenerator()
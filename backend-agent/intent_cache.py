@@ -0,0 +1,123 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import admin
+import customer
+import delivery
+import ledger
+import product
+import search
+
+# Reply cache for read-only chat intents.
+# "show me customer Rakesh" maps to the same get_customer_details call every time, so the reply is
+# kept per normalized prompt and served without a model round-trip. Entries expire after a TTL, are
+# evicted least-recently-used, and are dropped as soon as the index they were answered from changes.
+
+CACHE_SIZE = int(os.environ.get("INTENT_CACHE_SIZE", "1024"))
+TTL = float(os.environ.get("INTENT_CACHE_TTL", "300"))    # seconds
+
+# Read-only function -> index whose version the reply depends on
+READ_ONLY_INDEXES = {
+    "get_customer_details": customer.CUSTOMER_INDEX,
+    "get_admin_details": admin.ADMIN_INDEX,
+    "get_delivery_person_details": delivery.DELIVERY_BOY_INDEX,
+    "get_product_details": product.PRODUCT_INDEX,
+    "get_customer_balance": ledger.LEDGER,
+    "search_transactions": search.SEARCH,
+}
+
+PUNCTUATION = re.compile(r'[^\w\s]')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(message):
+    """Case, punctuation and spacing do not change a lookup ("Show me customer Rakesh?")"""
+    return WHITESPACE.sub(' ', PUNCTUATION.sub(' ', str(message or '').lower())).strip()
+
+
+def is_read_only(name):
+    return name in READ_ONLY_INDEXES
+
+
+def version_of(name):
+    """Current version of the index a read-only function answers from"""
+    return READ_ONLY_INDEXES[name].version
+
+
+class IntentCache:
+    """LRU + TTL map of normalized prompt -> (function name, index version, reply)"""
+
+    def __init__(self, max_size=CACHE_SIZE, ttl=TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evicted = 0
+
+    def get(self, message):
+        """Returns the cached reply for a prompt, or None"""
+        entry = self.get_entry(message)
+        return entry[1] if entry is not None else None
+
+    def get_entry(self, message):
+        """Returns (function name, reply) cached for a prompt, or None"""
+        key = normalize_prompt(message)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            name, version, reply, expires = entry
+            if time.monotonic() >= expires:
+                self.expired += 1
+            elif version != version_of(name):
+                self.invalidated += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return name, reply
+
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, message, name, version, reply):
+        """Stores a reply computed from the index at `version` (read before the lookup ran)"""
+        if not is_read_only(name) or self.max_size <= 0:
+            return
+        key = normalize_prompt(message)
+        with self._lock:
+            self._entries[key] = (name, version, reply, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 3) if lookups else None,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "evicted": self.evicted
+        }
+
+
+INTENT_CACHE = IntentCache()
@@ -0,0 +1,315 @@
+import threading
+import time
+
+import deposit
+import transaction_store
+
+# Running cylinder and payment balances per (customer, product).
+# The statistics, customer and inventory pages recompute these by walking every transaction's
+# selectedProducts and every deposit. Here each transaction and each customer's deposits contribute
+# a small delta that is added on write and subtracted on edit/delete, so an update costs O(entry)
+# and a balance lookup is a dict read. rebuild() recomputes everything and verify() checks the
+# running totals against a plain scan.
+
+PRODUCT_FIELDS = ('sent', 'received', 'billed', 'depositSent', 'depositReceived', 'depositAmount')
+CUSTOMER_FIELDS = ('transactions', 'billed', 'paid', 'depositPaid', 'depositReturned')
+
+
+def to_int(value):
+    """parseInt-like: the frontend stores numbers, numeric strings or NaN/None"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(number) if number == number else 0
+
+
+def transaction_contribution(record):
+    """What one transactionList entry adds: (customerId, {productId: deltas}, customer deltas, product info)"""
+    data = record.get('data') if isinstance(record, dict) else None
+    if not isinstance(data, dict):
+        return None
+    customer_id = (data.get('customer') or {}).get('userId')
+    if not customer_id:
+        return None
+
+    products = {}
+    info = {}
+    for selected in data.get('selectedProducts') or []:
+        product_data = (selected or {}).get('productData') or {} if isinstance(selected, dict) else {}
+        product_id = product_data.get('productId')
+        if not product_id:
+            continue
+        sent = to_int(selected.get('sentUnits'))
+        deltas = products.setdefault(product_id, {})
+        deltas['sent'] = deltas.get('sent', 0) + sent
+        deltas['received'] = deltas.get('received', 0) + to_int(selected.get('recievedUnits'))
+        deltas['billed'] = deltas.get('billed', 0) + sent * to_int(product_data.get('rate'))
+        info[product_id] = product_data
+
+    totals = {'transactions': 1, 'billed': to_int(data.get('total')), 'paid': to_int(data.get('payment'))}
+    return customer_id, products, totals, info, (data.get('customer') or {}).get('fullName')
+
+
+def deposit_contribution(customer_id, deposits):
+    """What all deposits of one customer add: (customerId, {productId: deltas}, customer deltas, product info)"""
+    products = {}
+    info = {}
+    totals = {'depositPaid': 0, 'depositReturned': 0}
+    full_name = None
+    for entry in (deposits or {}).values():
+        data = entry.get('data') if isinstance(entry, dict) else None
+        if not isinstance(data, dict):
+            continue
+        full_name = full_name or (data.get('customer') or {}).get('fullName')
+        totals['depositPaid'] += to_int(data.get('paymentAmt'))
+        totals['depositReturned'] += to_int(data.get('returnAmt'))
+        for selected in data.get('selectedProducts') or []:
+            product_data = (selected or {}).get('productData') or {} if isinstance(selected, dict) else {}
+            product_id = product_data.get('productId')
+            if not product_id:
+                continue
+            deltas = products.setdefault(product_id, {})
+            deltas['depositSent'] = deltas.get('depositSent', 0) + to_int(selected.get('sentUnits'))
+            deltas['depositReceived'] = deltas.get('depositReceived', 0) + to_int(selected.get('recievedUnits'))
+            deltas['depositAmount'] = deltas.get('depositAmount', 0) + to_int(selected.get('paymentAmt'))
+            info[product_id] = product_data
+    return customer_id, products, totals, info, full_name
+
+
+class _View:
+    """Adapts one source (transactions or deposits) to the build/upsert/remove calls of a ViewSet"""
+
+    def __init__(self, ledger, contribution):
+        self._ledger = ledger
+        self._contribution = contribution
+        self._applied = {}      # source key -> contribution currently added to the totals
+
+    def build(self, cache):
+        with self._ledger.lock:
+            for key in list(self._applied):
+                self._ledger._apply(self._applied.pop(key), -1)
+            for key, record in (cache or {}).items():
+                self._set(key, record)
+            self._ledger._touch()
+
+    def upsert(self, key, record):
+        with self._ledger.lock:
+            previous = self._applied.pop(key, None)
+            if previous:
+                self._ledger._apply(previous, -1)
+            self._set(key, record)
+            self._ledger._touch()
+
+    def remove(self, key):
+        with self._ledger.lock:
+            previous = self._applied.pop(key, None)
+            if previous:
+                self._ledger._apply(previous, -1)
+                self._ledger._touch()
+
+    def _set(self, key, record):
+        contribution = self._contribution(key, record)
+        if contribution:
+            self._applied[key] = contribution
+            self._ledger._apply(contribution, 1)
+
+
+class Ledger:
+    """Per-(customer, product) and per-customer running totals"""
+
+    def __init__(self):
+        self.version = 0
+        self.updated_at = None
+        self.lock = threading.RLock()
+        self._products = {}     # customerId -> { productId: { PRODUCT_FIELDS } }
+        self._customers = {}    # customerId -> { CUSTOMER_FIELDS }
+        self._names = {}        # customerId -> fullName
+        self._product_info = {} # productId -> latest productData seen
+        self.transactions_view = _View(self, lambda key, record: transaction_contribution(record))
+        self.deposits_view = _View(self, deposit_contribution)
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = int(time.time() * 1000)
+
+    def _apply(self, contribution, sign):
+        customer_id, products, totals, info, full_name = contribution
+        if full_name and sign > 0:
+            self._names[customer_id] = full_name
+        self._product_info.update(info)
+
+        customer_products = self._products.setdefault(customer_id, {})
+        for product_id, deltas in products.items():
+            balance = customer_products.setdefault(product_id, dict.fromkeys(PRODUCT_FIELDS, 0))
+            for field, delta in deltas.items():
+                balance[field] += sign * delta
+            if not any(balance.values()):
+                del customer_products[product_id]
+
+        customer_totals = self._customers.setdefault(customer_id, dict.fromkeys(CUSTOMER_FIELDS, 0))
+        for field, delta in totals.items():
+            customer_totals[field] += sign * delta
+        if not any(customer_totals.values()) and not customer_products:
+            del self._customers[customer_id]
+            del self._products[customer_id]
+
+    def customer_ids(self):
+        with self.lock:
+            return list(self._customers)
+
+    def balance(self, customer_id, include_products=True):
+        """Balances of one customer, or None if the ledger has nothing for them"""
+        with self.lock:
+            totals = self._customers.get(customer_id)
+            if totals is None:
+                return None
+
+            products = []
+            held = 0
+            for product_id, balance in self._products.get(customer_id, {}).items():
+                info = self._product_info.get(product_id, {})
+                pending = balance['sent'] - balance['received']
+                if info.get('productReturnable'):
+                    held += pending
+                products.append({
+                    "productId": product_id,
+                    "name": info.get('name'),
+                    "productReturnable": bool(info.get('productReturnable')),
+                    **balance,
+                    "pending": pending,
+                    "depositHeld": balance['depositSent'] - balance['depositReceived']
+                })
+
+            result = {
+                "customerId": customer_id,
+                "fullName": self._names.get(customer_id),
+                **totals,
+                "due": totals['billed'] - totals['paid'],
+                "depositBalance": totals['depositPaid'] - totals['depositReturned'],
+                "cylindersHeld": held
+            }
+            if include_products:
+                result["products"] = sorted(products, key=lambda item: item['name'] or item['productId'])
+            return result
+
+    def balances(self, min_due=None, include_products=False):
+        """Every customer's balance, highest due first"""
+        with self.lock:
+            rows = [self.balance(customer_id, include_products) for customer_id in self._customers]
+        if min_due is not None:
+            rows = [row for row in rows if row['due'] > min_due]
+        return sorted(rows, key=lambda row: -row['due'])
+
+    def snapshot(self):
+        """Raw totals, comparable with scan()"""
+        with self.lock:
+            return (
+                {customer_id: dict(totals) for customer_id, totals in self._customers.items()},
+                {(customer_id, product_id): dict(balance)
+                 for customer_id, products in self._products.items() for product_id, balance in products.items()}
+            )
+
+
+def scan(transaction_cache, deposit_cache):
+    """Reference totals computed the way the frontend does it: one pass over every entry"""
+    customers = {}
+    products = {}
+
+    def customer_row(customer_id):
+        return customers.setdefault(customer_id, dict.fromkeys(CUSTOMER_FIELDS, 0))
+
+    def product_row(customer_id, product_id):
+        return products.setdefault((customer_id, product_id), dict.fromkeys(PRODUCT_FIELDS, 0))
+
+    for record in (transaction_cache or {}).values():
+        data = (record or {}).get('data') or {}
+        customer_id = (data.get('customer') or {}).get('userId')
+        if not customer_id:
+            continue
+        row = customer_row(customer_id)
+        row['transactions'] += 1
+        row['billed'] += to_int(data.get('total'))
+        row['paid'] += to_int(data.get('payment'))
+        for selected in data.get('selectedProducts') or []:
+            product_data = (selected or {}).get('productData') or {}
+            if not product_data.get('productId'):
+                continue
+            balance = product_row(customer_id, product_data['productId'])
+            balance['sent'] += to_int(selected.get('sentUnits'))
+            balance['received'] += to_int(selected.get('recievedUnits'))
+            balance['billed'] += to_int(selected.get('sentUnits')) * to_int(product_data.get('rate'))
+
+    for customer_id, deposits in (deposit_cache or {}).items():
+        if not deposits:
+            continue
+        row = customer_row(customer_id)
+        for entry in deposits.values():
+            data = (entry or {}).get('data') or {}
+            row['depositPaid'] += to_int(data.get('paymentAmt'))
+            row['depositReturned'] += to_int(data.get('returnAmt'))
+            for selected in data.get('selectedProducts') or []:
+                product_data = (selected or {}).get('productData') or {}
+                if not product_data.get('productId'):
+                    continue
+                balance = product_row(customer_id, product_data['productId'])
+                balance['depositSent'] += to_int(selected.get('sentUnits'))
+                balance['depositReceived'] += to_int(selected.get('recievedUnits'))
+                balance['depositAmount'] += to_int(selected.get('paymentAmt'))
+
+    return (
+        {customer_id: row for customer_id, row in customers.items() if any(row.values())},
+        {key: balance for key, balance in products.items() if any(balance.values())}
+    )
+
+
+LEDGER = Ledger()
+transaction_store.TRANSACTION_VIEWS.add(LEDGER.transactions_view, transaction_store.TRANSACTION_CACHE)
+deposit.DEPOSIT_VIEWS.add(LEDGER.deposits_view, deposit.DEPOSIT_CACHE)
+
+
+def rebuild():
+    """Recomputes every balance from the cached transactions and deposits"""
+    LEDGER.transactions_view.build(transaction_store.TRANSACTION_CACHE)
+    LEDGER.deposits_view.build(deposit.DEPOSIT_CACHE)
+
+
+def verify(max_mismatches=20):
+    """Compares the running totals with a full scan of the caches"""
+    expected_customers, expected_products = scan(transaction_store.TRANSACTION_CACHE, deposit.DEPOSIT_CACHE)
+    actual_customers, actual_products = LEDGER.snapshot()
+
+    mismatches = []
+    for kind, expected, actual in (("customer", expected_customers, actual_customers),
+                                   ("product", expected_products, actual_products)):
+        for key in sorted(set(expected) | set(actual), key=str):
+            if expected.get(key) != actual.get(key):
+                mismatches.append({"kind": kind, "key": list(key) if isinstance(key, tuple) else key,
+                                   "expected": expected.get(key), "ledger": actual.get(key)})
+    return {
+        "ok": not mismatches,
+        "customers": len(expected_customers),
+        "balances": len(expected_products),
+        "mismatches": mismatches[:max_mismatches],
+        "mismatchCount": len(mismatches)
+    }
+
+
+def execute_get_customer_balance(customer_name):
+    """Agent tool: cylinders a customer still holds, deposits and payment due"""
+    import transactions
+
+    customer_data, error = transactions.EntityResolver().customer(customer_name)
+    if error:
+        return error
+
+    balance = LEDGER.balance(customer_data.get('userId'))
+    if balance is None:
+        return {"response": f"{customer_data.get('fullName')} has no entries yet.", "balance": None}
+
+    held = [f"{item['pending']} {item['name']}" for item in balance['products']
+            if item['productReturnable'] and item['pending']]
+    text = f"{customer_data.get('fullName')} holds {balance['cylindersHeld']} cylinder(s)"
+    text += f" ({', '.join(held)})." if held else "."
+    text += f" Payment due: {balance['due']}. Deposit balance: {balance['depositBalance']}."
+    return {"response": text, "balance": balance}
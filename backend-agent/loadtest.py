@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# Load test for /chat against a stubbed Gemini model and the in-memory storage backend.
+# Both block with time.sleep() exactly like the real synchronous SDK calls, so the run shows
+# how request latency behaves under concurrent traffic with and without offloading.
+#
+#   python loadtest.py --requests 200 --concurrency 50 --model-latency 0.3 --db-latency 0.05
+
+os.environ["CACHE_SYNC"] = "0"
+# Every request comes from one client address and repeats a few prompts: per-user admission and
+# the reply cache would reject or short-circuit most of them instead of measuring the model path
+os.environ["ADMISSION_CONTROL"] = "0"
+os.environ["INTENT_CACHE_SIZE"] = "0"
+
+CUSTOMER_NAMES = ["Rakesh Gupta", "Ramesh Kumar", "Sweta Sharma", "Harsh Gupta", "Animesh Das", "Priya Verma"]
+DELIVERY_NAMES = ["Sweta Singh", "Animesh Yadav", "Ravi Patel"]
+PRODUCT_NAMES = ["LPG 14KG", "LPG 19KG", "Oxygen"]
+
+
+def seed_data():
+    """A small database export with the names the stub model picks from"""
+    return {
+        "customer": {"bucket": {
+            f"C{i}": {"data": {"fullName": name, "userId": f"C{i}", "phoneNumber": "", "shippingAddress": ["Main Road"]}}
+            for i, name in enumerate(CUSTOMER_NAMES)
+        }},
+        "deliveryPerson": {"bucket": {
+            f"D{i}": {"data": {"fullName": name, "userId": f"D{i}"}} for i, name in enumerate(DELIVERY_NAMES)
+        }},
+        "productList": {
+            f"P{i}": {"data": {"name": name, "productId": f"P{i}", "rate": 900, "productReturnable": True}}
+            for i, name in enumerate(PRODUCT_NAMES)
+        }
+    }
+
+
+def install_stub_backends(model_latency, db_latency):
+    """Installs in-memory storage and a stub model, then imports the service.
+
+    Must run before main (or any cache module) is imported: the storage backend is chosen on
+    the first reference(), which would otherwise reach the production project.
+    """
+    import storage
+    storage.use(storage.MemoryStorage(seed_data(), latency=db_latency))
+
+    import main
+    import model_client
+    # Every model call goes through model_client.get_model(); _model also makes /ready report it built
+    model = StubModel(model_latency)
+    model_client.get_model = lambda: model
+    model_client._model = model
+    return main
+
+
+def function_call_response(name, args):
+    part = SimpleNamespace(function_call=SimpleNamespace(name=name, args=args), text="")
+    content = SimpleNamespace(parts=[part])
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)], text="")
+
+
+class StubChat:
+    def __init__(self, model):
+        self.model = model
+
+    def send_message(self, message, **kwargs):
+        time.sleep(self.model.latency)
+        return self.model.respond(message)
+
+
+class StubModel:
+    """Replaces GenerativeModel; send_message blocks for `latency` seconds then returns a function call"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def start_chat(self, **kwargs):
+        return StubChat(self)
+
+    def respond(self, message):
+        if message.startswith("show"):
+            return function_call_response("get_customer_details", {"customer_name": random.choice(CUSTOMER_NAMES)})
+        return function_call_response("process_transaction", {
+            "customer_name": random.choice(CUSTOMER_NAMES),
+            "delivery_boy_name": random.choice(DELIVERY_NAMES),
+            "product_name": random.choice(PRODUCT_NAMES),
+            "sent_units": random.randint(1, 10),
+            "received_units": random.randint(0, 5)
+        })
+
+
+async def call_app(app, method, path, payload=None):
+    """Sends one request straight through the ASGI app and returns (status, body)"""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 5000), "server": ("loadtest", 80),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    }
+    request_sent = False
+    messages = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+
+def run(app, total, concurrency):
+    """Fires `total` requests from `concurrency` client threads at an app served on its own loop.
+
+    The clients live outside the server's event loop, like real HTTP clients, so each latency
+    starts when the request is submitted and includes any time the loop spent blocked.
+    """
+    loop = asyncio.new_event_loop()
+    server = threading.Thread(target=loop.run_forever, daemon=True)
+    server.start()
+
+    def one(i):
+        message = "show customer" if i % 4 == 0 else "delivered cylinders"
+        started = time.perf_counter()
+        asyncio.run_coroutine_threadsafe(call_app(app, "POST", "/chat", {"message": message}), loop).result()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        latencies = list(clients.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    loop.call_soon_threadsafe(loop.stop)
+    server.join()
+    loop.close()
+    return latencies, elapsed
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, latencies, elapsed):
+    print(f"{label:<10} n={len(latencies)}  p50={percentile(latencies, 50) * 1000:8.1f} ms  "
+          f"p99={percentile(latencies, 99) * 1000:8.1f} ms  mean={statistics.mean(latencies) * 1000:8.1f} ms  "
+          f"throughput={len(latencies) / elapsed:7.1f} req/s")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Concurrent /chat load test with stubbed model and DB")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--model-latency", type=float, default=0.3)
+    parser.add_argument("--db-latency", type=float, default=0.05)
+    parser.add_argument("--mode", choices=["both", "offload", "inline"], default="both")
+    args = parser.parse_args()
+
+    main = install_stub_backends(args.model_latency, args.db_latency)
+    import offload
+
+    modes = ["inline", "offload"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        offload.ENABLED = mode == "offload"
+        latencies, elapsed = run(main.app, args.requests, args.concurrency)
+        report(mode, latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main_cli()
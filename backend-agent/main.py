@@ -1,24 +1,59 @@
+import time
+STARTED = time.perf_counter()   # startup phase timings begin here (see warm_start)
+
 import os
 import traceback
-import firebase_admin
-from firebase_admin import credentials, db
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import vertexai
-from vertexai.generative_models import GenerativeModel, Tool, Part, FunctionDeclaration
-import datetime
-import random
-import string
-import time
 
 # imporing helper functions
+import cache_sync
+import offload
+import refresh_coordinator
+import storage
+import transactions
+import bulk_import
+import move_entries
+import fast_path
+import idempotency
+import admission
+import sessions
+import progress
+import ids
+import intent_cache
+import transaction_store
+import deposit
+import ledger
+import rollups
+import columnar
+import search
+import export
 import customer
 import admin
 import delivery
 import product
+import model_client
+import warm_start
+
+warm_start.record("imports", time.perf_counter() - STARTED)
+
+@asynccontextmanager
+async def lifespan(app):
+    if warm_start.LAZY:
+        # The port is bound as soon as this returns; caches and the model load in the background
+        warm_start.start_in_background(storage.reference)
+        model_client.warm_up()
+    yield
+    # On shutdown (Cloud Run sends SIGTERM) save the caches so the next instance starts warm
+    try:
+        warm_start.save()
+    except Exception as e:
+        print(f"Warm-start snapshot save error: {e}")
 
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Handle CORS (This allows your Angular app to talk to this server)
 app.add_middleware(
@@ -28,47 +63,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 1. INITIALIZE FIREBASE
-# Use the automatic credentials (no file needed)
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app'
-    }) #fuel-flow-india-default-rtdb.asia-southeast1.firebasedatabase.app
-except Exception as e:
-    print(f"Firebase Init Error: {e}")
+# 1. STORAGE
+# Firebase (or the in-memory backend, see storage.py) is initialized once by the storage module
 
 # 2. INITIALIZE VERTEX AI
-# We wrap this to catch errors early
-try:
-    vertexai.init(project="ethereal-yen-478212-v9", location="europe-west1")
-    print("Vertex AI Initialized")
-except Exception as e:
-    print(f"Vertex Init Error: {e}")
+# Deferred to model_client: the SDK is imported and initialized when the model is first built
 
 # 3. Load Objects first
 def refresh_memory():
-    # Fetch data on startup
-    customer.refresh_customer_cache()
-    admin.refresh_admin_cache()
-    delivery.refresh_delivery_boy_cache()
-    product.refresh_product_cache()
+    # Downloads every node once, in parallel
+    warm_start.fetch_all()
 
-refresh_memory()
+# Keep the caches current from Firebase listeners (first event is the full snapshot, then deltas).
+# Set CACHE_SYNC=0 to fall back to full downloads on every refresh. With WARM_START_SNAPSHOT set,
+# the caches start from the snapshot saved at the last shutdown and catch up in the background.
+# With LAZY_STARTUP=1 this (and building the model) happens in lifespan, after the port is bound.
+if not warm_start.LAZY:
+    warm_start.start(storage.reference)
 
 @app.get("/health")
 async def health_endpoint():
+    """Liveness: answers as soon as the server is up, whether or not the caches are loaded"""
     return {
             "status": "OK",
+            "READY": warm_start.READY.is_set() and model_client.ready(),
             "CUSTOMER": len(customer.CUSTOMER_CACHE),
             "ADMIN": len(admin.ADMIN_CACHE),
             "DELIVERY_BOY": len(delivery.DELIVERY_BOY_CACHE),
-            "PRODUCT": len(product.PRODUCT_CACHE)
+            "PRODUCT": len(product.PRODUCT_CACHE),
+            "TRANSACTION": len(transaction_store.TRANSACTION_CACHE),
+            "DEPOSIT": len(deposit.DEPOSIT_CACHE),
+            "ROLLUPS": rollups.ROLLUPS.stats(),
+            "COLUMNAR": columnar.SNAPSHOT.stats(),
+            "SEARCH": search.SEARCH.stats(),
+            "LEDGER": {"customers": len(ledger.LEDGER.customer_ids()), "version": ledger.LEDGER.version},
+            "SYNC": cache_sync.status(),
+            "STARTUP": {**warm_start.status(), "model": model_client.ready()},
+            "REFRESH": refresh_coordinator.stats(),
+            "OFFLOAD": offload.stats(),
+            "FAST_PATH": fast_path.stats(),
+            "INTENT_CACHE": intent_cache.INTENT_CACHE.stats(),
+            "IDEMPOTENCY": idempotency.IDEMPOTENCY.stats(),
+            "SESSIONS": sessions.SESSIONS.stats(),
+            "ADMISSION": admission.SCHEDULER.stats(),
+            "TRANSACTION_IDS": ids.TRANSACTION_IDS.stats()
         }
 
+@app.get("/ready")
+async def ready_endpoint():
+    """Readiness: 503 until the caches are loaded and the model is built"""
+    caches, model = warm_start.READY.is_set(), model_client.ready()
+    body = {"ready": caches and model, "caches": caches, "model": model, "phases": dict(warm_start.PHASES)}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
 # 3. DEFINE TOOLS
 # Tool 1: Process Transactions
-# log_transaction_func = FunctionDeclaration(
+# log_transaction_func = model_client.function_declaration(
 #     name="log_transaction",
 #     description="Log a delivery (OUT) or return (IN) of specific product.",
 #     parameters={
@@ -83,9 +133,10 @@ async def health_endpoint():
 #     }
 # )
 
-complex_transaction_func = FunctionDeclaration(
+complex_transaction_func = model_client.function_declaration(
     name="process_transaction",
-    description="Log a business transaction where goods are delivered to a customer or returned by them.",
+    description="Log a business transaction where goods are delivered to a customer or returned by them. "
+                "When a message covers several deliveries (e.g. an end-of-day summary), call this once per delivery.",
     parameters={
         "type": "object",
         "properties": {
@@ -113,7 +164,7 @@ complex_transaction_func = FunctionDeclaration(
 )
 
 # Tool 2: Get Customer Profile (NEW)
-get_customer_details_func = FunctionDeclaration(
+get_customer_details_func = model_client.function_declaration(
     name="get_customer_details",
     description="Retrieve full profile details for a specific customer by name.",
     parameters={
@@ -126,7 +177,7 @@ get_customer_details_func = FunctionDeclaration(
 )
 
 # Tool 2: Get admin Profile (NEW)
-get_admin_details_func = FunctionDeclaration(
+get_admin_details_func = model_client.function_declaration(
     name="get_admin_details",
     description="Retrieve full profile details for a specific admin by name.",
     parameters={
@@ -139,7 +190,7 @@ get_admin_details_func = FunctionDeclaration(
 )
 
 # Tool 2: Get delivery Profile (NEW)
-get_delivery_person_details_func = FunctionDeclaration(
+get_delivery_person_details_func = model_client.function_declaration(
     name="get_delivery_person_details",
     description="Retrieve full profile details for a specific delivery person by name.",
     parameters={
@@ -152,7 +203,7 @@ get_delivery_person_details_func = FunctionDeclaration(
 )
 
 # Tool 2: Get delivery Profile (NEW)
-get_product_details_func = FunctionDeclaration(
+get_product_details_func = model_client.function_declaration(
     name="get_product_details",
     description="Retrieve full details for a specific product by name.",
     parameters={
@@ -164,8 +215,80 @@ get_product_details_func = FunctionDeclaration(
     }
 )
 
+# Tool 2: Customer balance (cylinders held, deposit, payment due)
+get_customer_balance_func = model_client.function_declaration(
+    name="get_customer_balance",
+    description="How many cylinders a customer still holds (sent minus received, per product), their deposit balance and payment due.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "customer_name": {"type": "string", "description": "Name of the customer"}
+        },
+        "required": ["customer_name"]
+    }
+)
+
+# Tool 2: Ad-hoc sales questions over every transaction
+query_sales_func = model_client.function_declaration(
+    name="query_sales",
+    description="Answer aggregate questions about past transactions, e.g. 'total LPG 14KG sold by Sweta in Q3' "
+                "or 'customers with payment due above 5000'. Sums one metric over the matching transactions, optionally grouped.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "metric": {
+                "type": "string",
+                "enum": list(columnar.METRICS),
+                "description": "sent/received/billed/pending are per product; transactions/total/payment/due are per transaction (due = total - payment)."
+            },
+            "group_by": {"type": "string", "enum": list(columnar.GROUP_BY), "description": "Split the result, e.g. 'customer' for a per-customer list."},
+            "customer_name": {"type": "string", "description": "Only this customer's transactions"},
+            "product_name": {"type": "string", "description": "Only this product (not with transaction-level metrics)"},
+            "delivery_boy_name": {"type": "string", "description": "Only deliveries by this person"},
+            "date_from": {"type": "string", "description": "First day, yyyy-mm-dd (Q3 2025 = 2025-07-01 to 2025-09-30)"},
+            "date_to": {"type": "string", "description": "Last day, yyyy-mm-dd"},
+            "min_value": {"type": "integer", "description": "With group_by: only groups whose value is above this"},
+            "limit": {"type": "integer", "description": "With group_by: maximum number of groups (default 10)"}
+        },
+        "required": ["metric"]
+    }
+)
+
+# Tool 2: Keyword search over entries
+search_transactions_func = model_client.function_declaration(
+    name="search_transactions",
+    description="Find past entries by keywords from customer names, addresses, phone numbers, delivery persons, "
+                "product names, tags or entry notes, e.g. 'entries for Main Road' or 'find the entry with gate pass'.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "Keywords; every word must match"},
+            "limit": {"type": "integer", "description": "Maximum number of entries to list (default 5)"}
+        },
+        "required": ["query"]
+    }
+)
+
+# Tool 2: Move entries between customer accounts
+move_entries_func = model_client.function_declaration(
+    name="move_entries",
+    description="Move entries from one customer account to another, e.g. 'move all of Ramesh's entries to Ramesh Kumar' "
+                "or 'move Rakesh's July entries to Harsh'. Only when the user explicitly asks to move entries.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "from_customer_name": {"type": "string", "description": "The account the entries are on now"},
+            "to_customer_name": {"type": "string", "description": "The account they should be moved to"},
+            "transaction_ids": {"type": "array", "items": {"type": "string"}, "description": "Only these entries"},
+            "date_from": {"type": "string", "description": "Only entries on or after this day, yyyy-mm-dd"},
+            "date_to": {"type": "string", "description": "Only entries on or before this day, yyyy-mm-dd"}
+        },
+        "required": ["from_customer_name", "to_customer_name"]
+    }
+)
+
 # Tool 2: Refresh Memory
-refresh_memory_func = FunctionDeclaration(
+refresh_memory_func = model_client.function_declaration(
     name="refresh_memory",
     description="Reloads the database from the server. Use this when data seems outdated.",
     parameters={
@@ -174,16 +297,17 @@ refresh_memory_func = FunctionDeclaration(
     }
 )
 
-cylinder_tool = Tool(
-    function_declarations=[
-        complex_transaction_func, 
-        get_admin_details_func, get_customer_details_func, get_delivery_person_details_func, get_product_details_func, 
-        refresh_memory_func
-    ]
-)
+cylinder_tool = [
+    complex_transaction_func, 
+    get_admin_details_func, get_customer_details_func, get_delivery_person_details_func, get_product_details_func, 
+    get_customer_balance_func, query_sales_func, search_transactions_func, move_entries_func, refresh_memory_func
+]
 
-# The latest stable 2.5 Flash model
-model = GenerativeModel("gemini-2.5-flash", tools=[cylinder_tool])
+# The GenerativeModel is built on first use (or warmed up after startup), see model_client
+model_client.set_tools(cylinder_tool)
+if not warm_start.LAZY:
+    model_client.get_model()
+warm_start.record("startup", time.perf_counter() - STARTED)
 
 # 4. DB LOGIC
 # def execute_db_write(customer, product, qty, action):
@@ -211,184 +335,417 @@ model = GenerativeModel("gemini-2.5-flash", tools=[cylinder_tool])
 #                 }
 #             }
 
-def execute_complex_write(cust_name, boy_name, prod_name, sent, received, payment):
-    try:
-        # customer_data = find_customer_by_name(cust_name)
-        customer_data = customer.execute_get_customer_details(cust_name)
-        if 'objectArray' in customer_data:
-            if len(customer_data['objectArray']) > 1:
-                return {
-                    "response": f"{len(customer_data['objectArray'])} Customers found. Please provide full name to be specific!",
-                    "objectArray": customer_data['objectArray'],
+async def execute_function_call(name, args):
+    """Runs one read-only or maintenance function call and returns its chat reply"""
+    if name == "get_customer_details":
+        result_data = await offload.DB.run(customer.execute_get_customer_details, customer_name=args.get("customer_name"))
+        if 'objectArray' in result_data:
+            return {
+                    "response": f"{len(result_data['objectArray'])} Customers found.",
+                    "objectArray": result_data['objectArray'],
                     'action': 'click_to_redirect'
                 }
-            else:
-                customer_data = customer_data['objectArray'][0]
         else:
-            customer.refresh_customer_cache()
-            customer_data = customer.execute_get_customer_details(cust_name)
-            if 'objectArray' in customer_data:
-                if len(customer_data['objectArray']) > 1:
-                    return {
-                        "response": f"{len(customer_data['objectArray'])} Customers found. Please provide full name to be specific!",
-                        "objectArray": customer_data['objectArray'],
-                        'action': 'click_to_redirect'
-                    }
-                else:
-                    customer_data = customer_data['objectArray'][0]
-            else:
-                return {
-                    'warning': {
-                        'text': f"No customer named '{cust_name}' in bucket. Hence cant proceed!"
-                    }
-                }
-        
-        delivery_data = delivery.execute_get_delivery_boy_details(boy_name)
-        if 'objectArray' in delivery_data:
-            if len(delivery_data['objectArray']) > 1:
-                return {
-                    "response": f"{len(delivery_data['objectArray'])} Delivery Person found. Please provide full name to be specific!",
-                    "objectArray": delivery_data['objectArray'],
+            return result_data
+
+
+    elif name == "get_admin_details":
+        result_data = await offload.DB.run(admin.execute_get_admin_details, admin_name=args.get("admin_name"))
+        if 'objectArray' in result_data:
+            return {
+                    "response": f"{len(result_data['objectArray'])} Admins found.",
+                    "objectArray": result_data['objectArray'],
                     'action': 'click_to_redirect'
                 }
-            else:
-                delivery_data = delivery_data['objectArray'][0]
         else:
-            delivery.refresh_delivery_boy_cache()
-            delivery_data = delivery.execute_get_delivery_boy_details(boy_name)
-            if 'objectArray' in delivery_data:
-                if len(delivery_data['objectArray']) > 1:
-                    return {
-                        "response": f"{len(delivery_data['objectArray'])} Delivery Person found. Please provide full name to be specific!",
-                        "objectArray": delivery_data['objectArray'],
-                        'action': 'click_to_redirect'
-                    }
-                else:
-                    delivery_data = delivery_data['objectArray'][0]
-            else:
-                return {
-                    'warning': {
-                        'text': f"No delivery person named '{boy_name}' in bucket. Hence cant proceed!"
-                    }
+            return result_data
+
+    elif name == "get_delivery_person_details":
+        result_data = await offload.DB.run(delivery.execute_get_delivery_boy_details, delivery_boy_name=args.get("delivery_boy_name"))
+        if 'objectArray' in result_data:
+            return {
+                    "response": f"{len(result_data['objectArray'])} Delivery Person(s) found.",
+                    "objectArray": result_data['objectArray'],
+                    'action': 'click_to_redirect'
                 }
+        else:
+            return result_data
 
-        product_data = product.execute_get_product_details(prod_name)
-        if 'objectArray' in product_data:
-            if len(product_data['objectArray']) > 1:
-                return {
-                    "response": f"{len(product_data['objectArray'])} Products. Please provide full name to be specific!",
-                    "objectArray": product_data['objectArray'],
+    elif name == "get_product_details":
+        result_data = await offload.DB.run(product.execute_get_product_details, product_name=args.get("product_name"))
+        if 'objectArray' in result_data:
+            return {
+                    "response": f"{len(result_data['objectArray'])} Product(s) found.",
+                    "objectArray": result_data['objectArray'],
                     'action': 'click_to_redirect'
                 }
-            else:
-                product_data = product_data['objectArray'][0]
         else:
-            product.refresh_product_cache()
-            product_data = product.execute_get_product_details(prod_name)
-            if 'objectArray' in product_data:
-                if len(product_data['objectArray']) > 1:
-                    return {
-                        "response": f"{len(product_data['objectArray'])} Products. Please provide full name to be specific!",
-                        "objectArray": product_data['objectArray'],
-                        'action': 'click_to_redirect'
-                    }
-                else:
-                    product_data = product_data['objectArray'][0]
-            else:
-                return {
+            return result_data
+
+
+    elif name == "get_customer_balance":
+        return await offload.DB.run(ledger.execute_get_customer_balance, customer_name=args.get("customer_name"))
+
+    elif name == "query_sales":
+        return await offload.DB.run(
+            columnar.execute_query_sales, metric=args.get("metric"), group_by=args.get("group_by"),
+            customer_name=args.get("customer_name"), product_name=args.get("product_name"),
+            delivery_boy_name=args.get("delivery_boy_name"), date_from=args.get("date_from"),
+            date_to=args.get("date_to"), min_value=args.get("min_value"), limit=args.get("limit") or 10
+        )
+
+    elif name == "search_transactions":
+        return await offload.DB.run(search.execute_search_transactions, query=args.get("query"), limit=args.get("limit") or 5)
+
+    elif name == "move_entries":
+        idempotency.writing()
+        return await offload.DB.run_to_completion(
+            move_entries.execute_move_entries, from_customer_name=args.get("from_customer_name"),
+            to_customer_name=args.get("to_customer_name"), transaction_ids=args.get("transaction_ids"),
+            date_from=args.get("date_from"), date_to=args.get("date_to")
+        )
+
+    elif name == "refresh_memory":
+        await offload.DB.run(refresh_memory)
+        return {"response": "Memory Refreshed! Please ask me what you need again."}
+
+    return {
+        'warning': {
+            'text': f"Unknown function '{name}'.",
+            'action': 'call_admin'
+        }
+    }
+
+# TRANSACTION HISTORY
+@app.get("/transactions")
+async def transactions_endpoint(customerId: str = None, deliveryPersonId: str = None, productId: str = None,
+                                tag: str = None, dateFrom: str = None, dateTo: str = None, limit: int = None):
+    """Entries matching every given filter, oldest first. Dates are dd/mm/yyyy or yyyy-mm-dd (inclusive)"""
+    try:
+        entries = await offload.DB.run(
+            transaction_store.find_transactions, customer_id=customerId, delivery_person_id=deliveryPersonId,
+            product_id=productId, tag=tag, date_from=dateFrom, date_to=dateTo, limit=limit
+        )
+        return {"count": len(entries), "objectArray": entries}
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID QUERY: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+
+# BALANCES
+@app.get("/ledger")
+async def ledger_endpoint(customerId: str = None, minDue: int = None):
+    """One customer's per-product balances, or every customer's totals (highest due first)"""
+    if customerId:
+        balance = await offload.DB.run(ledger.LEDGER.balance, customerId)
+        if balance is None:
+            return {
                     'warning': {
-                        'text': f"No product named '{boy_name}' in bucket. Hence cant proceed!"
+                        'text': f"No entries found for customer '{customerId}'.",
+                        'action': 'call_admin'
                     }
                 }
+        return balance
+    # Sorting every customer's totals is a full scan: off the event loop like the other data endpoints
+    rows = await offload.DB.run(ledger.LEDGER.balances, min_due=minDue)
+    return {"count": len(rows), "objectArray": rows, "version": ledger.LEDGER.version}
+
+@app.post("/ledger/rebuild")
+async def ledger_rebuild_endpoint(verify: bool = True):
+    """Recomputes every balance from the caches; with verify, compares the result against a full scan"""
+    started = time.perf_counter()
+    await offload.DB.run_to_completion(ledger.rebuild)
+    result = {"rebuildMs": round((time.perf_counter() - started) * 1000, 1)}
+    if verify:
+        result["verify"] = await offload.DB.run(ledger.verify)
+    return result
+
+@app.get("/transactions/page")
+async def transactions_page_endpoint(customerId: str = None, deliveryPersonId: str = None, productId: str = None,
+                                     status: str = None, tag: str = None, cursor: str = None, limit: int = 50,
+                                     order: str = "desc", projection: str = "compact"):
+    """Keyset-paginated entries in transactionId order (newest first by default); pass nextCursor back as cursor"""
+    try:
+        return await offload.DB.run(
+            transaction_store.page_transactions, customer_id=customerId, delivery_person_id=deliveryPersonId,
+            product_id=productId, status=status, tag=tag, cursor=cursor, limit=limit,
+            descending=order != "asc", projection=projection
+        )
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID QUERY: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
 
-
-        now = datetime.datetime.now()
-        timestamp_part = now.strftime("%Y%m%d_%H%M%S")
-        random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-        transactionId = f"{timestamp_part}_{random_part}"
-        
-        rate = int(product_data.get('rate', 0))
-        total_amt = (sent * rate)
-        if payment is None: payment = total_amt
-
-        transaction_data = {
-            "data": {
-                "customer": {
-                    "fullName": customer_data.get('fullName'),
-                    "phoneNumber": customer_data.get('phoneNumber', ""),
-                    "userId": customer_data.get('userId'),
-                    "address": customer_data.get('shippingAddress', [customer_data.get('address')])[0]
-                },
-                "date": datetime.datetime.now().strftime("%d/%m/%Y"),
-                "transactionId": transactionId,
-                "deliveryBoyList": [
-                    {
-                        "fullName": delivery_data.get('fullName'),
-                        "userId": delivery_data.get('userId'),
-                        "deliveryDone": [
-                            {
-                                "productId": product_data.get('productId'),
-                                "sentUnits": sent,
-                                "recievedUnits": received
-                            }
-                        ]
-                    }
-                ],
-                "selectedProducts": [
-                    {
-                        "productData": product_data,
-                        "sentUnits": sent,
-                        "recievedUnits": received,
-                        "paymentAmt": 0
-                    }
-                ],
-                "payment": payment,
-                "total": total_amt,
-                "status": "Paid" if payment >= total_amt else "Pending",
-                "importIndex": 0,
-                "extraDetails": "Logged via AI Agent"
-            },
-            "others": {
-                "createdBy": "AI_AGENT",
-                "createdTime": int(time.time() * 1000),
-                "editedBy": "AI_AGENT",
-                "editedTime": int(time.time() * 1000)
+# SEARCH
+@app.get("/search")
+async def search_endpoint(q: str = None, limit: int = 20, offset: int = 0, projection: str = "compact"):
+    """Entries matching every word of `q` (the last word also as a prefix), best match first; page with nextOffset"""
+    try:
+        return await offload.DB.run(search.search_transactions, query=q, limit=limit, offset=offset, projection=projection)
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID QUERY: {str(e)}",
+                    'action': 'call_admin'
+                }
             }
-        }
 
-        print(transaction_data)
+# MOVE ENTRIES
+@app.post("/transactions/move")
+async def move_transactions_endpoint(request: Request):
+    """Moves entries between customers: { fromUserId, toUserId, transactionIdList | dateFrom/dateTo/productId/tag,
+    movedBy, extraNote, moveId, dryRun }"""
+    try:
+        data = await request.json()
+        dry_run = bool(data.get("dryRun"))
+        # A retried request with the same moveId must not move (and log) the entries twice
+        key = None if dry_run else idempotency.key_of(request.headers, data) or data.get("moveId")
+
+        async def run_move():
+            # Rejected before anything is written, so a corrected request with the same key still runs
+            await offload.DB.run(move_entries.accounts, data.get("fromUserId"), data.get("toUserId"))
+            idempotency.writing()
+            return await offload.DB.run_to_completion(
+                move_entries.move_entries, data.get("fromUserId"), data.get("toUserId"),
+                transaction_ids=data.get("transactionIdList"), moved_by=data.get("movedBy") or "AI_AGENT",
+                extra_note=data.get("extraNote"), date_from=data.get("dateFrom"), date_to=data.get("dateTo"),
+                product_id=data.get("productId"), tag=data.get("tag"), move_id=data.get("moveId"), dry_run=dry_run
+            )
+        return await idempotency.run_once(key, run_move)
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID MOVE: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
 
-        ref = db.reference('transactionList')
-        ref.child(transactionId).set(transaction_data)
+# SALES ROLLUPS
+@app.get("/analytics")
+async def analytics_endpoint(dimension: str = "all", granularity: str = "month", member: str = None,
+                             dateFrom: str = None, dateTo: str = None, top: int = None, metric: str = "paid"):
+    """Pre-aggregated sales per day/month/year and product/customer/deliveryPerson/tag (or `top` members by `metric`)"""
+    try:
+        return await offload.DB.run(
+            rollups.analytics, dimension=dimension, granularity=granularity, member=member,
+            date_from=dateFrom, date_to=dateTo, top=top, metric=metric
+        )
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID QUERY: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
 
+# EXPORT
+@app.get("/export")
+async def export_endpoint(format: str = "xlsx", layout: str = "full", perSheet: str = None, customerId: str = None,
+                          tag: str = None, dateFrom: str = None, dateTo: str = None, includeNegative: bool = False):
+    """Streams the ExportService layouts: 'full' (optionally a sheet per customer/address) or 'pending' returns"""
+    try:
+        media_type, file_name, body = await offload.DB.run(
+            export.export_stream, data_format=format, layout=layout, per_sheet=perSheet, customer_id=customerId,
+            tag=tag, date_from=dateFrom, date_to=dateTo, include_negative=includeNegative
+        )
+    except ValueError as e:
         return {
-            "response" : f"SUCCESS: Logged entry for {customer_data['fullName']}.",
-            "entry_status": "SUCCESS",
-            "context": transaction_data
-        }
+                'warning': {
+                    'text': f"INVALID EXPORT: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+    # A sync iterator: Starlette pulls it from a worker thread, so building rows never blocks the loop
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{file_name}"'})
+
+# BULK IMPORT (no LLM)
+@app.post("/transactions/bulk")
+async def bulk_transactions_endpoint(request: Request, format: str = None, dry_run: bool = False):
+    """Imports a CSV or NDJSON body (`?format=csv|ndjson`, or from Content-Type) as a stream"""
+    try:
+        data_format = bulk_import.detect_format(format, request.headers.get("content-type"))
+        key = None if dry_run else idempotency.key_of(request.headers)
 
+        async def run_import():
+            idempotency.writing()   # chunks are committed as they stream in, so a failed import is never replayed blindly
+            return await bulk_import.import_stream(request.stream(), data_format, dry_run=dry_run)
+        return await idempotency.run_once(key, run_import)
     except Exception as e:
-        print(traceback.format_exc())
+        print(f"BULK IMPORT ERROR: {traceback.format_exc()}")
         return {
-            'warning':{
-                "text": f"DB ERROR: {str(e)}",
-                "action": "call_admin"
+                'warning': {
+                    'text': f"BULK IMPORT ERROR: {str(e)}",
+                    'action': 'call_admin'
+                }
             }
-        }
+
+async def handle_function_calls(function_calls):
+    """Runs the (name, args) calls of one message: every process_transaction as one batch, then the rest"""
+    for name, args in function_calls:
+        print(f"Function Call Triggered: {name} with {args}")
+
+    transaction_calls = [args for name, args in function_calls if name == "process_transaction"]
+    results = []
+    if transaction_calls:
+        idempotency.writing()
+    if len(transaction_calls) == 1:
+        # Never abandon a write half-way: its outcome must be known before we answer
+        results.append(await offload.DB.run_to_completion(
+            transactions.execute_complex_write, **transactions.transaction_args(transaction_calls[0])
+        ))
+    elif transaction_calls:
+        # One indexed resolution pass and a single multi-path update for the whole batch
+        batch_results = await offload.DB.run_to_completion(transactions.execute_batch_write, transaction_calls)
+        results.append(transactions.summarize_batch(batch_results))
+
+    for name, args in function_calls:
+        if name != "process_transaction":
+            results.append(await execute_function_call(name, args))
+
+    if len(results) == 1:
+        return results[0]
+    return {
+        "response": " ".join(result.get('response') or (result.get('warning') or {}).get('text', '') for result in results),
+        "results": results
+    }
 
 # AI AGENT
 @app.post("/chat")
 async def chat_endpoint(request: Request):
-    # THE SAFETY NET: Catch any crash and report it
     try:
         data = await request.json()
-        user_message = data.get("message")
+        # Retries of one submission carry the same Idempotency-Key: they get the first reply, nothing is written twice
+        key = idempotency.key_of(request.headers, data)
+        # With an X-Session-Id (or "sessionId"), earlier turns and a pending "which one?" carry over
+        session = sessions.SESSIONS.get(sessions.session_id_of(request.headers, data))
+        tenant = tenant_of(request, data)
+        return await idempotency.run_once(key, lambda: answer_message(data.get("message"), session, tenant))
+    except admission.Rejected as e:
+        print(f"REJECTED ({e.reason}): {e}")
+        return JSONResponse(rejected_reply(e), status_code=429, headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        print(f"CRITICAL ERROR: {traceback.format_exc()}")
+        return {
+                'warning': {
+                    'text': f"SYSTEM ERROR: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: Request):
+    """Same request as /chat, answered as Server-Sent Events: intent, entities, committed and token
+    events as they happen, then `reply` with the body /chat would return. A message admission control
+    turns away gets `rejected` (reason, retryAfter) before its reply, where /chat answers 429"""
+    try:
+        data = await request.json()
+        key = idempotency.key_of(request.headers, data)
+        session = sessions.SESSIONS.get(sessions.session_id_of(request.headers, data))
+        tenant = tenant_of(request, data)
+    except Exception as e:
+        print(f"CRITICAL ERROR: {traceback.format_exc()}")
+        return {
+                'warning': {
+                    'text': f"SYSTEM ERROR: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+
+    def system_error(e):
+        if isinstance(e, admission.Rejected):
+            print(f"REJECTED ({e.reason}): {e}")
+            return rejected_reply(e)
+        print(f"CRITICAL ERROR: {traceback.format_exc()}")
+        return {'warning': {'text': f"SYSTEM ERROR: {str(e)}", 'action': 'call_admin'}}
+
+    frames = progress.stream(lambda: idempotency.run_once(key, lambda: answer_message(data.get("message"), session, tenant)), system_error)
+    return StreamingResponse(frames, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def tenant_of(request, data):
+    """The user whose token bucket a model-bound message draws from; the client address when unknown"""
+    client = getattr(request, "client", None)
+    return admission.tenant_of(request.headers, data, client.host if client else None)
+
+def rejected_reply(e):
+    """Chat reply for a message admission control turned away; the client retries after `retryAfter` seconds"""
+    return {
+            'warning': {
+                'text': f"SYSTEM BUSY: {str(e)}.",
+                'action': 'retry'
+            },
+            'retryAfter': e.retry_after
+        }
+
+async def answer_message(user_message, session=None, tenant=None):
+    """Replies to one chat message; with a session, the exchange is remembered for the next one.
+    Messages that need the model are admitted per `tenant`, see admission.py"""
+    reply = None
+    if session is not None:
+        picked = sessions.SESSIONS.follow_up(session, user_message)
+        if picked is not None:
+            print(f"Follow-up picked {sessions.label(picked[1])}")
+            reply = await answer_follow_up(session, *picked)
+    if reply is None:
+        reply = await answer_new_message(user_message, session, tenant)
+    if session is not None:
+        sessions.SESSIONS.remember(session, user_message, reply)
+    return reply
+
+async def answer_follow_up(session, pending, choice):
+    """Completes the call a disambiguation interrupted with the option the user picked, without the model"""
+    if pending.field is None:
+        kind = sessions.LOOKUPS.get(pending.name, "record")
+        return {"response": f"Showing {kind} {sessions.label(choice)}.", "objectArray": [choice], "action": "click_to_redirect"}
+    args = {**pending.args, pending.field: sessions.label(choice)}
+    progress.emit("intent", functions=[pending.name], source="followUp")
+    reply = await handle_function_calls([(pending.name, args)])
+    session.expect_choice(pending.name, args, reply)    # e.g. the delivery person is ambiguous too
+    return reply
+
+async def answer_new_message(user_message, session=None, tenant=None):
+    # THE SAFETY NET: Catch any crash and report it
+    try:
         print(f"Received: {user_message}")
 
-        chat = model.start_chat()
-        response = chat.send_message(user_message)
+        # Repeated lookups are answered from the reply cache without the model. A message that follows
+        # earlier turns may depend on them ("what about his balance?"), so it is neither served nor cached
+        history = session.history() if session is not None else None
+        cached = intent_cache.INTENT_CACHE.get_entry(user_message) if not history else None
+        if cached is not None:
+            cached_name, cached_reply = cached
+            print("Served from intent cache")
+            progress.emit("intent", functions=[], source="cache")
+            if session is not None:
+                session.expect_choice(cached_name, None, cached_reply)
+            return cached_reply
+
+        # Routine delivery messages are parsed locally; only the rest pays for a model round-trip
+        fast_calls = fast_path.parse(user_message)
+        if fast_calls:
+            print(f"Fast path: {fast_calls}")
+            progress.emit("intent", functions=[name for name, _ in fast_calls], source="fastPath")
+            reply = await handle_function_calls(fast_calls)
+            if session is not None and len(fast_calls) == 1:
+                session.expect_choice(*fast_calls[0], reply)
+            return reply
+
+        # Bounded, per-user admission in front of the model: likely writes are served before lookups
+        async with admission.SCHEDULER.slot(admission.priority_of(user_message), tenant):
+            chat = await offload.MODEL.run(model_client.start_chat, history)
+            model_started = time.perf_counter()
+            # Streaming clients get the model's text as it is generated
+            sent = await offload.MODEL.run(model_client.send, chat, user_message, progress.streaming())
+            fast_path.record_model_latency(time.perf_counter() - model_started)
         
-        if not response.candidates:
+        if sent is None:
             return {
                 'warning': {
                     'text':"AI returned no candidates.",
@@ -396,76 +753,39 @@ async def chat_endpoint(request: Request):
                 }
             }
             
-        part = response.candidates[0].content.parts[0]
-        
-        if part.function_call:
-            fc = part.function_call
-            args = dict(fc.args)
-            print(f"Function Call Triggered: {fc.name} with {args}")
-
-            if fc.name == "process_transaction":
-                result_msg = execute_complex_write(
-                    cust_name=args.get("customer_name"),
-                    boy_name=args.get("delivery_boy_name"),
-                    prod_name=args.get("product_name"),
-                    sent=int(args.get("sent_units", 0)),
-                    received=int(args.get("received_units", 0)),
-                    payment=args.get("payment_amount")
-                )
-                return result_msg
-
-
-            elif fc.name == "get_customer_details":
-                result_data = customer.execute_get_customer_details(customer_name=args.get("customer_name"))
-                if 'objectArray' in result_data:
-                    return {
-                            "response": f"{len(result_data['objectArray'])} Customers found.",
-                            "objectArray": result_data['objectArray'],
-                            'action': 'click_to_redirect'
-                        }
-                else:
-                    return result_data
-
-
-            elif fc.name == "get_admin_details":
-                result_data = admin.execute_get_admin_details(admin_name=args.get("admin_name"))
-                if 'objectArray' in result_data:
-                    return {
-                            "response": f"{len(result_data['objectArray'])} Admins found.",
-                            "objectArray": result_data['objectArray'],
-                            'action': 'click_to_redirect'
-                        }
-                else:
-                    return result_data
-
-            elif fc.name == "get_delivery_person_details":
-                result_data = delivery.execute_get_delivery_boy_details(delivery_boy_name=args.get("delivery_boy_name"))
-                if 'objectArray' in result_data:
-                    return {
-                            "response": f"{len(result_data['objectArray'])} Delivery Person(s) found.",
-                            "objectArray": result_data['objectArray'],
-                            'action': 'click_to_redirect'
-                        }
-                else:
-                    return result_data
-
-            elif fc.name == "get_product_details":
-                result_data = product.execute_get_product_details(product_name=args.get("product_name"))
-                if 'objectArray' in result_data:
-                    return {
-                            "response": f"{len(result_data['objectArray'])} Product(s) found.",
-                            "objectArray": result_data['objectArray'],
-                            'action': 'click_to_redirect'
-                        }
-                else:
-                    return result_data
-
-
-            elif fc.name == "refresh_memory":
-                refresh_memory()
-                return {"response": "Memory Refreshed! Please ask me what you need again."}
-            
-        return {"response": response.text}
+        # A summary of several drops comes back as one function call per drop
+        function_calls, text = sent
+        if function_calls:
+            progress.emit("intent", functions=[name for name, _ in function_calls], source="model")
+            name = function_calls[0][0]
+            cacheable = not history and len(function_calls) == 1 and intent_cache.is_read_only(name)
+            # Read before the lookup runs, so a change during the lookup invalidates the entry
+            version = intent_cache.version_of(name) if cacheable else None
+            reply = await handle_function_calls(function_calls)
+            if cacheable:
+                intent_cache.INTENT_CACHE.put(user_message, name, version, reply)
+            if session is not None and len(function_calls) == 1:
+                session.expect_choice(*function_calls[0], reply)
+            return reply
+
+        return {"response": text}
+
+    except admission.Rejected as e:
+        # Turned away before the model was called: nothing was written, the client retries later
+        idempotency.retryable()
+        progress.emit("rejected", reason=e.reason, retryAfter=e.retry_after)
+        raise
+
+    except offload.DependencyTimeout as e:
+        # Only the model call and lookups time out (writes run to completion), so a retry is safe
+        print(f"TIMEOUT: {e}")
+        idempotency.retryable()
+        return {
+                'warning': {
+                    'text': f"SYSTEM BUSY: {str(e)}. Please try again.",
+                    'action': 'call_admin'
+                }
+            }
 
     except Exception as e:
         # HERE IS THE FIX: Return the error instead of crashing 500
@@ -0,0 +1,119 @@
+import threading
+
+import progress
+import warm_start
+
+# Deferred Vertex AI client.
+# Importing vertexai.generative_models pulls in google.cloud.aiplatform and takes seconds, so main
+# declares its tools as plain specs here and the SDK is only imported, initialized and turned into a
+# GenerativeModel on first use - or in the background right after the port is bound (LAZY_STARTUP=1).
+
+PROJECT = "ethereal-yen-478212-v9"
+LOCATION = "europe-west1"
+MODEL_NAME = "gemini-2.5-flash"    # The latest stable 2.5 Flash model
+
+TOOLS = []          # lists of function specs, one list per Tool
+
+_model = None
+_lock = threading.Lock()
+
+
+def function_declaration(name, description, parameters):
+    """Same arguments as vertexai's FunctionDeclaration; the SDK object is built with the model"""
+    return {"name": name, "description": description, "parameters": parameters}
+
+
+def set_tools(*tools):
+    """Each argument is one Tool: a list of function_declaration() specs"""
+    TOOLS[:] = [list(tool) for tool in tools]
+
+
+def _build():
+    with warm_start.phase("vertexImport"):
+        import vertexai
+        from vertexai.generative_models import FunctionDeclaration, GenerativeModel, Tool
+
+    # We wrap this to catch errors early
+    with warm_start.phase("vertexInit"):
+        try:
+            vertexai.init(project=PROJECT, location=LOCATION)
+            print("Vertex AI Initialized")
+        except Exception as e:
+            print(f"Vertex Init Error: {e}")
+
+    with warm_start.phase("modelBuild"):
+        tools = [Tool(function_declarations=[FunctionDeclaration(**spec) for spec in specs]) for specs in TOOLS]
+        return GenerativeModel(MODEL_NAME, tools=tools)
+
+
+def get_model():
+    """The GenerativeModel, built on the first call (later callers wait for that build)"""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = _build()
+    return _model
+
+
+def start_chat(history=None):
+    """A new chat; `history` is [(role, text)] of earlier turns ('user' / 'model'), see sessions"""
+    if not history:
+        return get_model().start_chat()
+    from vertexai.generative_models import Content, Part
+    return get_model().start_chat(history=[Content(role=role, parts=[Part.from_text(text)]) for role, text in history])
+
+
+def _text(part):
+    try:
+        return part.text
+    except (AttributeError, ValueError):     # a part without text
+        return ''
+
+
+def send(chat, message, stream=False):
+    """Sends one message; returns ([(function name, args)], text), or None without candidates.
+
+    With `stream`, the reply is requested as a stream and every piece of text is emitted as a
+    progress `token` event as it arrives (function calls arrive whole).
+    """
+    if not stream:
+        response = chat.send_message(message)
+        if not response.candidates:
+            return None
+        calls = [(part.function_call.name, dict(part.function_call.args))
+                 for part in response.candidates[0].content.parts if part.function_call]
+        return calls, ('' if calls else response.text)
+
+    calls = []
+    pieces = []
+    candidates = False
+    for chunk in chat.send_message(message, stream=True):
+        if not chunk.candidates:
+            continue
+        candidates = True
+        for part in chunk.candidates[0].content.parts:
+            if part.function_call:
+                calls.append((part.function_call.name, dict(part.function_call.args)))
+                continue
+            text = _text(part)
+            if text:
+                pieces.append(text)
+                progress.emit("token", text=text)
+    return (calls, ''.join(pieces)) if candidates else None
+
+
+def warm_up():
+    """Builds the model on a background thread"""
+    def build():
+        try:
+            get_model()
+        except Exception as e:
+            print(f"Model warm-up error: {e}")
+    thread = threading.Thread(target=build, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def ready():
+    return _model is not None
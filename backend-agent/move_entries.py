@@ -0,0 +1,213 @@
+import datetime
+import os
+import random
+import string
+import time
+import traceback
+
+import customer
+import progress
+import storage
+import transaction_store
+import transactions
+
+# Moves entries from one customer account to another (the move-entries page), server-side.
+# The page rewrote data.customer and others of every entry and wrote each one with its own set(),
+# then the moveEntryHistory record separately. Here only the changed fields are written, as
+# multi-path update()s on the database root of MOVE_CHUNK_ENTRIES entries each; the history
+# record goes out with the last chunk. A single chunk (the usual page selection) is atomic.
+# Moved entries are applied to the transaction store right away, so the index, ledger balances,
+# rollups and search follow without waiting for the listener.
+
+MOVE_CHUNK_ENTRIES = int(os.environ.get("MOVE_CHUNK_ENTRIES", "500"))
+HISTORY_PATH = 'moveEntryHistory'
+
+
+def new_move_id():
+    """ddMMyyyy_HHmmss_xxxxx, the format of the page's moveId"""
+    now = datetime.datetime.now()
+    suffix = ''.join(random.choices(string.ascii_letters + string.digits, k=5))
+    return f"{now.strftime('%d%m%Y')}_{now.strftime('%H%M%S')}_{suffix}"
+
+
+def customer_data(user_id):
+    """The cached customer/bucket data of one account, or None"""
+    if not customer.CUSTOMER_CACHE:
+        customer.refresh_customer_cache()
+    record = customer.CUSTOMER_CACHE.get(user_id) if user_id else None
+    return record.get('data') if isinstance(record, dict) else None
+
+
+def accounts(from_user_id, to_user_id):
+    """(source, target) customer data of a move; raises ValueError for unknown or identical accounts"""
+    if not from_user_id or not to_user_id or from_user_id == to_user_id:
+        raise ValueError("source and target must be two different customers")
+    source, target = customer_data(from_user_id), customer_data(to_user_id)
+    if source is None:
+        raise ValueError(f"unknown source customer '{from_user_id}'")
+    if target is None:
+        raise ValueError(f"unknown target customer '{to_user_id}'")
+    return source, target
+
+
+def select_entries(from_user_id, transaction_ids=None, date_from=None, date_to=None, product_id=None, tag=None):
+    """Returns (keys to move, [{transactionId, reason}] skipped).
+
+    With `transaction_ids` only those are moved (each must belong to the source account);
+    otherwise every entry of the source account matching the filters, oldest first.
+    """
+    if not transaction_store.TRANSACTION_CACHE:
+        transaction_store.refresh_transaction_cache()
+    cache = transaction_store.TRANSACTION_CACHE
+
+    if transaction_ids is None:
+        keys = transaction_store.TRANSACTION_INDEX.query(
+            {'customer': from_user_id, 'product': product_id, 'tag': tag},
+            transaction_store.parse_day(date_from), transaction_store.parse_day(date_to)
+        )
+        return keys, []
+
+    keys = []
+    skipped = []
+    for transaction_id in dict.fromkeys(transaction_ids):
+        record = cache.get(transaction_id)
+        if record is None:
+            skipped.append({"transactionId": transaction_id, "reason": "not found"})
+        elif ((record.get('data') or {}).get('customer') or {}).get('userId') != from_user_id:
+            skipped.append({"transactionId": transaction_id, "reason": "belongs to another account"})
+        else:
+            keys.append(transaction_id)
+    return keys, skipped
+
+
+def moved_entry(record, source, target, payload):
+    """The entry after the move, built the way MoveEntryService did (the cached record is left untouched)"""
+    others = record.get('others') or {}
+    return {
+        **record,
+        "data": {
+            **record['data'],
+            "customer": {
+                "fullName": target.get('fullName') or source.get('fullName'),
+                "phoneNumber": target.get('phoneNumber') or source.get('phoneNumber'),
+                "userId": target.get('userId')
+            }
+        },
+        "others": {
+            **others,
+            "movedBy": payload['movedBy'],
+            "movedTime": payload['moveTime'],
+            "moveIds": list(others.get('moveIds') or []) + [payload['moveId']]
+        }
+    }
+
+
+def entry_updates(key, entry):
+    """Multi-path update of the fields a move changes (relative to the database root)"""
+    base = f"{transactions.TRANSACTION_PATH}/{key}"
+    return {
+        f"{base}/data/customer": entry['data']['customer'],
+        f"{base}/others/movedBy": entry['others']['movedBy'],
+        f"{base}/others/movedTime": entry['others']['movedTime'],
+        f"{base}/others/moveIds": entry['others']['moveIds'],
+    }
+
+
+def move_entries(from_user_id, to_user_id, transaction_ids=None, moved_by="AI_AGENT", extra_note='',
+                 date_from=None, date_to=None, product_id=None, tag=None, move_id=None,
+                 chunk_entries=MOVE_CHUNK_ENTRIES, dry_run=False):
+    """Moves the selected entries of `from_user_id` to `to_user_id` and returns the move report.
+
+    Raises ValueError for unknown or identical accounts. If a chunk fails, the remaining chunks are
+    not written and the history record lists only the entries that were moved.
+    """
+    source, target = accounts(from_user_id, to_user_id)
+    if chunk_entries < 1:
+        raise ValueError("chunk size must be at least 1")
+
+    started = time.perf_counter()
+    keys, skipped = select_entries(from_user_id, transaction_ids, date_from, date_to, product_id, tag)
+    payload = {
+        "fromUserId": from_user_id,
+        "toUserId": to_user_id,
+        "transactionIdList": [],
+        "moveTime": int(time.time() * 1000),
+        "movedBy": moved_by,
+        "moveId": move_id or new_move_id(),
+        "extraNote": extra_note or ''
+    }
+    report = {
+        "moveId": payload['moveId'],
+        "selected": len(keys),
+        "moved": 0,
+        "skipped": skipped,
+        "chunks": 0,
+        "dryRun": dry_run
+    }
+
+    root = storage.reference('')
+    cache = transaction_store.TRANSACTION_CACHE
+    error = None
+    if not dry_run:
+        for start in range(0, len(keys), chunk_entries):
+            chunk = [cache.get(key) for key in keys[start:start + chunk_entries]]
+            entries = [moved_entry(record, source, target, payload) for record in chunk if record is not None]
+            moved_ids = payload['transactionIdList'] + [entry['data']['transactionId'] for entry in entries]
+            updates = {}
+            for entry in entries:
+                updates.update(entry_updates(entry['data']['transactionId'], entry))
+            last = start + chunk_entries >= len(keys)
+            if last:
+                updates[f"{HISTORY_PATH}/{payload['moveId']}"] = {**payload, "transactionIdList": moved_ids}
+            try:
+                root.update(updates)
+            except Exception as e:
+                print(traceback.format_exc())
+                error = e
+                break
+            payload['transactionIdList'] = moved_ids
+            report['chunks'] += 1
+            transaction_store.record_written(entries)
+            progress.emit("committed", moveId=payload['moveId'], moved=len(moved_ids), selected=len(keys))
+
+        if error is not None and payload['transactionIdList']:
+            # Earlier chunks are stored: keep the history in line with the entries' moveIds
+            try:
+                root.update({f"{HISTORY_PATH}/{payload['moveId']}": payload})
+            except Exception:
+                print(traceback.format_exc())
+
+    report['moved'] = len(payload['transactionIdList'])
+    report['transactionIdList'] = payload['transactionIdList']
+    names = f"{source.get('fullName')} to {target.get('fullName')}"
+    if dry_run:
+        report['response'] = f"{len(keys)} entries can be moved from {names}."
+    else:
+        report['response'] = f"Moved {report['moved']} of {len(keys)} entries from {names}."
+    if skipped:
+        report['response'] += f" Skipped {len(skipped)}."
+    if error is not None:
+        report['warning'] = {"text": f"DB ERROR: {str(error)}", "action": "call_admin"}
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def execute_move_entries(from_customer_name, to_customer_name, transaction_ids=None, date_from=None, date_to=None):
+    """Agent tool: moves entries between two customers named in the message"""
+    entities = transactions.EntityResolver()
+    source, error = entities.customer(from_customer_name)
+    if error: return error
+    target, error = entities.customer(to_customer_name)
+    if error: return error
+
+    try:
+        report = move_entries(source.get('userId'), target.get('userId'), transaction_ids or None,
+                              date_from=date_from, date_to=date_to)
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID MOVE: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+    return report
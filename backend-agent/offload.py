@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Runs the blocking SDK calls (Vertex AI send_message, Firebase get/set/update) on bounded
+# thread pools so one slow dependency no longer stalls every request on the uvicorn worker.
+# Each dependency gets its own pool size (= concurrency limit) and timeout.
+
+# Set OFFLOAD_BLOCKING_CALLS=0 to run the calls inline on the event loop (old behaviour)
+ENABLED = os.environ.get("OFFLOAD_BLOCKING_CALLS", "1") == "1"
+
+
+class DependencyTimeout(Exception):
+    """A blocking call did not finish within its dependency's timeout"""
+
+
+class Dependency:
+    """Bounded thread pool plus timeout and counters for one blocking backend"""
+
+    def __init__(self, name, max_concurrency, timeout):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"offload-{name}")
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Awaits fn(*args, **kwargs) on this dependency's pool, giving up after the timeout.
+
+        Only for calls that are safe to abandon: the worker thread keeps running after a timeout.
+        """
+        return await self._run(functools.partial(fn, *args, **kwargs), self.timeout)
+
+    async def run_to_completion(self, fn, *args, **kwargs):
+        """Awaits fn(*args, **kwargs) on this dependency's pool without a timeout.
+
+        Used for writes: a timed-out write could still commit after the user was told to retry,
+        and the retry would then store the same delivery twice.
+        """
+        return await self._run(functools.partial(fn, *args, **kwargs), None)
+
+    async def _run(self, call, timeout):
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            if not ENABLED:
+                return call()
+
+            loop = asyncio.get_running_loop()
+            # The request's context goes along (its idempotency claim, its progress stream)
+            future = loop.run_in_executor(self.executor, contextvars.copy_context().run, call)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DependencyTimeout(f"{self.name} call timed out after {self.timeout}s")
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "calls": self.calls,
+            "inFlight": self.in_flight,
+            "timeouts": self.timeouts,
+            "errors": self.errors
+        }
+
+
+MODEL = Dependency("model", int(os.environ.get("MODEL_CONCURRENCY", "8")), float(os.environ.get("MODEL_TIMEOUT", "60")))
+DB = Dependency("db", int(os.environ.get("DB_CONCURRENCY", "16")), float(os.environ.get("DB_TIMEOUT", "30")))
+
+
+def stats():
+    return {"model": MODEL.stats(), "db": DB.stats()}
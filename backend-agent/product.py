@@ -1,46 +1,40 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from firebase_admin import credentials, db
+import cache_sync
+import entity_index
+import refresh_coordinator
+import storage
 
 PRODUCT_CACHE = {}
+PRODUCT_INDEX = entity_index.EntityIndex('name')
 
-# Initialize FastAPI
-app = FastAPI()
-
-# Handle CORS (This allows your Angular app to talk to this server)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 1. INITIALIZE FIREBASE
-# Use the automatic credentials (no file needed)
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app'
-    }) #fuel-flow-india-default-rtdb.asia-southeast1.firebasedatabase.app
-except Exception as e:
-    print(f"Firebase Init Error in CUSTOMER: {e}")
+def set_product_cache(snapshot):
+    """Replaces the cache and rebuilds its name index"""
+    global PRODUCT_CACHE
+    PRODUCT_CACHE = snapshot
+    PRODUCT_INDEX.build(snapshot)
 
-def refresh_product_cache():
+def fetch_product_cache():
     """Fetches all product from productList and stores them in memory"""
-    global PRODUCT_CACHE
     try:
         print("Refreshing productList Cache...")
-        ref = db.reference('productList')
+        ref = storage.reference('productList')
         snapshot = ref.get()
         if snapshot:
-            PRODUCT_CACHE = snapshot
+            PRODUCT_SYNC.load(snapshot)
             print(f"Loaded {len(snapshot)} productLists.")
         else:
             print("No productLists found in productList")
     except Exception as e:
         print(f"Error fetching productLists: {e}")
 
-refresh_product_cache()
+# Keeps the cache current from /productList listener deltas once main starts the sync engine
+PRODUCT_SYNC = cache_sync.SyncedCache('productList', lambda: PRODUCT_CACHE, set_product_cache, PRODUCT_INDEX, lambda: refresh_product_cache())
+
+# All callers share one in-flight download of /productList (see refresh_coordinator)
+PRODUCT_REFRESH = refresh_coordinator.RefreshCoordinator('productList', fetch_product_cache, lambda: PRODUCT_SYNC.live)
+
+def refresh_product_cache(force=False):
+    """Refreshes the cache, joining a refresh already in flight instead of downloading again"""
+    return PRODUCT_REFRESH.refresh(force=force)
 
 def find_product_by_name(search_name):
     """Searches the in-memory cache for a product name"""
@@ -49,23 +43,24 @@ def find_product_by_name(search_name):
     # If cache is empty, try to refresh it once
     if not PRODUCT_CACHE:
         refresh_product_cache()
+    else:
+        PRODUCT_REFRESH.revalidate()
+
+    # Substring match served by the precomputed name index (same order as the bucket)
+    search_response = PRODUCT_INDEX.search(search_name)
 
-    search_lower = search_name.lower()
-    search_response = []
-    
-    # Iterate through the bucket structure
-    # Structure: { "PRODUCT_ID": { "data": { "name": "...", ... }, "others": ... } }
-    for product_id, record in PRODUCT_CACHE.items():
-        product_data = record.get('data', {})
-        name = product_data.get('name', '')
-        
-        # Check for name match
-        if name and search_lower in name.lower():
-            search_response.append(product_data)
-        
     return search_response if len(search_response) > 0 else None 
     # Returns the inner 'data' object which has userId, address, etc.
 
+def match_product_by_name(search_name, k=5, within=None):
+    """Ranks cached products (or only `within`) against a possibly misspelled name, best first with confidence scores"""
+    if not search_name: return []
+
+    if not PRODUCT_CACHE:
+        refresh_product_cache()
+
+    return PRODUCT_INDEX.top_k(search_name, k, within)
+
 def execute_get_product_details(product_name):
     """Logic to search cache and return object"""
     product = find_product_by_name(product_name)
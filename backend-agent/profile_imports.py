@@ -0,0 +1,55 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Import-time profile of `import main` (what uvicorn does before it binds the port), eager vs
+# LAZY_STARTUP=1. Each mode runs in a fresh interpreter with `python -X importtime`; the heaviest
+# top-level imports and the startup phases main prints (see warm_start.PHASES) are listed.
+#
+#   python profile_imports.py --top 10
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+PHASE_LINE = re.compile(r"Startup (\w+): (\d+) ms")
+
+
+def profile(lazy, snapshot=None):
+    env = dict(os.environ, LAZY_STARTUP="1" if lazy else "0", CACHE_SYNC="0", STORAGE_BACKEND="memory")
+    if snapshot:
+        env["STORAGE_SNAPSHOT"] = snapshot
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        raise SystemExit(result.stderr[-2000:])
+
+    # importtime indents two spaces per level: main is at 1, what main imports (directly or lazily) at 3
+    top_level = {}
+    for match in IMPORT_LINE.finditer(result.stderr):
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 3:
+            top_level[name] = top_level.get(name, 0) + int(cumulative)
+    phases = {name: int(ms) for name, ms in PHASE_LINE.findall(result.stdout)}
+    return elapsed, top_level, phases
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Import-time profile of main, eager vs lazy startup")
+    parser.add_argument("--top", type=int, default=8, help="heaviest top-level imports to list")
+    parser.add_argument("--snapshot", help="STORAGE_SNAPSHOT database export to load")
+    args = parser.parse_args()
+
+    for lazy in (False, True):
+        elapsed, top_level, phases = profile(lazy, args.snapshot)
+        print(f"\n{'LAZY_STARTUP=1' if lazy else 'eager'}: `import main` took {elapsed:.2f}s "
+              f"(imports below main {sum(top_level.values()) / 1e6:.2f}s)")
+        for name, micros in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {micros / 1000:8.0f} ms  {name}")
+        print("  phases: " + ", ".join(f"{name} {ms} ms" for name, ms in phases.items()))
+
+
+if __name__ == "__main__":
+    main_cli()
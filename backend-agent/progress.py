@@ -0,0 +1,80 @@
+import asyncio
+import contextvars
+import json
+
+# Progress events for streaming chat clients (POST /chat/stream, Server-Sent Events).
+# The write path calls emit() where something user-visible happens: the intent is known, the
+# names are resolved, the entries are committed, a piece of model text arrives. emit() does
+# nothing unless the running request opened a ProgressStream, so /chat and the tools behave
+# exactly as before. The stream travels in a ContextVar (offload copies the context into its
+# worker threads); events from those threads are handed to the event loop thread-safely.
+#
+# The last event is always `reply`, carrying the same JSON body /chat would have returned.
+
+_CURRENT = contextvars.ContextVar("progress_stream", default=None)
+
+_DONE = object()
+
+
+class ProgressStream:
+    """Queue of (event, data) for one request, read by the response as SSE frames"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.events = 0
+        self.task = None
+
+    def put(self, event, data):
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self.queue.put_nowait((event, data))
+        else:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    async def frames(self):
+        while True:
+            event, data = await self.queue.get()
+            if event is _DONE:
+                return
+            self.events += 1
+            yield frame(event, data)
+
+
+def frame(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def emit(event, **data):
+    """Sends one progress event to the request's stream, if it has one"""
+    stream = _CURRENT.get()
+    if stream is not None:
+        stream.put(event, data)
+
+
+def streaming():
+    return _CURRENT.get() is not None
+
+
+def stream(handler, on_error):
+    """Runs `await handler()` in the background and returns its SSE frames: progress events, then `reply`.
+
+    The handler runs to completion even if the client disconnects, so a write is never cut off
+    half-way. An exception becomes the reply on_error(exception) builds.
+    """
+    progress_stream = ProgressStream()
+
+    async def run():
+        _CURRENT.set(progress_stream)   # the task runs in its own copy of the context
+        try:
+            reply = await handler()
+        except Exception as e:
+            reply = on_error(e)
+        progress_stream.put("reply", reply)
+        progress_stream.put(_DONE, None)
+
+    progress_stream.task = asyncio.ensure_future(run())
+    return progress_stream.frames()
@@ -0,0 +1,264 @@
+import os
+import sys
+import weakref
+from collections.abc import MutableMapping
+
+# Compact in-memory records for the cached Firebase JSON.
+# A cached transaction is a dict of dicts that repeats the same keys, the customer's details and a
+# full productData copy on every entry. Here each record is a __slots__ object: known fields are
+# attributes, everything else is a frozen node (a shared key tuple plus a value tuple), strings are
+# interned, and embedded customers/products are pooled so identical copies share one object.
+# to_json() rebuilds the exact JSON value, so callers that want dicts still get fresh ones.
+
+# Set COMPACT_RECORDS=1 to keep /transactionList in compact form (less memory, slower reads)
+ENABLED = os.environ.get("COMPACT_RECORDS", "0") == "1"
+
+MAX_INTERNED_LENGTH = 64    # longer strings (notes, addresses) are rarely repeated
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()    # field absent from the JSON (as opposed to present with a null value)
+
+_SHAPES = {}            # key tuple -> the one shared instance
+
+
+def _intern(value):
+    if type(value) is str and len(value) <= MAX_INTERNED_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def _same(a, b):
+    """JSON equality that also tells 1, 1.0 and True apart"""
+    if type(a) is not type(b):
+        return False
+    if type(a) is tuple:
+        return len(a) == len(b) and all(map(_same, a, b))
+    return a == b
+
+
+class Node:
+    """A frozen JSON object: shared key tuple + value tuple"""
+    __slots__ = ('keys', 'values')
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+    def __eq__(self, other):
+        return type(other) is Node and self.keys is other.keys and _same(self.values, other.values)
+
+    def __hash__(self):
+        return hash((self.keys, self.values))
+
+
+def freeze(value):
+    """JSON value -> immutable compact value (Node for objects, tuple for lists)"""
+    if type(value) is dict:
+        keys = tuple(map(_intern, value))
+        keys = _SHAPES.setdefault(keys, keys)
+        return Node(keys, tuple(map(freeze, value.values())))
+    if type(value) is list:
+        return tuple(map(freeze, value))
+    return _intern(value)
+
+
+def thaw(value):
+    """Compact value -> a fresh JSON value"""
+    if isinstance(value, Record):
+        return value.to_json()
+    if type(value) is Node:
+        return dict(zip(value.keys, map(thaw, value.values)))
+    if type(value) is tuple:
+        return list(map(thaw, value))
+    return value
+
+
+class Record:
+    """Base for typed records: FIELDS maps JSON keys to slots, the remaining keys go to `rest`"""
+    __slots__ = ('rest',)
+    FIELDS = ()     # (json key, attribute, encoder or None for freeze)
+
+    @classmethod
+    def from_json(cls, value):
+        if type(value) is not dict:
+            return freeze(value)
+        record = cls.__new__(cls)
+        remaining = dict(value)
+        for key, attribute, encode in cls.FIELDS:
+            field = remaining.pop(key, MISSING)
+            if field is not MISSING:
+                field = encode(field) if encode is not None else freeze(field)
+            setattr(record, attribute, field)
+        record.rest = freeze(remaining) if remaining else None
+        return record
+
+    def to_json(self):
+        result = {}
+        for key, attribute, _ in self.FIELDS:
+            field = getattr(self, attribute)
+            if field is not MISSING:
+                result[key] = thaw(field)
+        if self.rest is not None:
+            result.update(thaw(self.rest))
+        return result
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(
+            _same_field(getattr(self, attribute), getattr(other, attribute)) for _, attribute, _ in self.FIELDS
+        ) and _same_field(self.rest, other.rest)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, attribute) for _, attribute, _ in self.FIELDS))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+
+def _same_field(a, b):
+    return a == b if isinstance(a, (Record, Node)) else _same(a, b)
+
+
+class _Pool:
+    """Hands out one shared instance per distinct embedded object (a product, a customer copy).
+
+    Held weakly: a version that no cached record uses any more (an old rate, a renamed customer,
+    the whole previous cache after a reload) is dropped with its last user.
+    """
+
+    def __init__(self, record_type):
+        self.record_type = record_type
+        self._items = weakref.WeakKeyDictionary()   # shared record -> weak reference to itself
+
+    def __call__(self, value):
+        record = self.record_type.from_json(value)
+        if not isinstance(record, Record):
+            return record   # not an object: nothing worth sharing
+        shared = self._items.get(record)
+        shared = shared() if shared is not None else None
+        if shared is None:
+            shared = record
+            self._items[record] = weakref.ref(record)
+        return shared
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
+
+
+def _list_of(encode):
+    """Encoder for a JSON list of objects; anything else is frozen as-is"""
+    def encode_list(value):
+        if type(value) is not list:
+            return freeze(value)
+        return tuple(encode(item) if type(item) is dict else freeze(item) for item in value)
+    return encode_list
+
+
+class EntityData(Record):
+    """The 'data' of a customer, delivery person or admin (also embedded in transactions)"""
+    __slots__ = ('user_id', 'full_name', 'phone_number', '__weakref__')     # pooled, see _Pool
+    FIELDS = (('userId', 'user_id', None), ('fullName', 'full_name', None),
+              ('phoneNumber', 'phone_number', None))
+
+
+class Entity(Record):
+    """A /customer/bucket, /deliveryPerson/bucket or /admin entry: { data, others }"""
+    __slots__ = ('data', 'others')
+    FIELDS = (('data', 'data', EntityData.from_json), ('others', 'others', None))
+
+
+class ProductData(Record):
+    """A product's 'data' (and the productData copy inside every transaction line)"""
+    __slots__ = ('product_id', 'name', 'rate', 'returnable', '__weakref__')
+    FIELDS = (('productId', 'product_id', None), ('name', 'name', None), ('rate', 'rate', None),
+              ('productReturnable', 'returnable', None))
+
+
+class Product(Record):
+    """A /productList entry: { data, others }"""
+    __slots__ = ('data', 'others')
+    FIELDS = (('data', 'data', ProductData.from_json), ('others', 'others', None))
+
+
+PRODUCT_POOL = _Pool(ProductData)
+CUSTOMER_POOL = _Pool(EntityData)
+
+
+class ProductLine(Record):
+    """One selectedProducts item"""
+    __slots__ = ('product', 'sent_units', 'received_units', 'payment_amt')
+    FIELDS = (('productData', 'product', PRODUCT_POOL), ('sentUnits', 'sent_units', None),
+              ('recievedUnits', 'received_units', None), ('paymentAmt', 'payment_amt', None))
+
+
+class DeliveryLine(Record):
+    """One deliveryBoyList item"""
+    __slots__ = ('user_id', 'full_name', 'delivery_done')
+    FIELDS = (('userId', 'user_id', None), ('fullName', 'full_name', None),
+              ('deliveryDone', 'delivery_done', None))
+
+
+class TransactionData(Record):
+    __slots__ = ('transaction_id', 'date', 'customer', 'delivery_boys', 'products', 'total', 'payment',
+                 'status', 'extra_details', 'import_index', 'tags', 'shipping_address')
+    FIELDS = (
+        ('transactionId', 'transaction_id', None), ('date', 'date', None),
+        ('customer', 'customer', CUSTOMER_POOL), ('deliveryBoyList', 'delivery_boys', _list_of(DeliveryLine.from_json)),
+        ('selectedProducts', 'products', _list_of(ProductLine.from_json)), ('total', 'total', None),
+        ('payment', 'payment', None), ('status', 'status', None), ('extraDetails', 'extra_details', None),
+        ('importIndex', 'import_index', None), ('tags', 'tags', None), ('shippingAddress', 'shipping_address', None),
+    )
+
+
+class Transaction(Record):
+    """A /transactionList entry: { data, others }"""
+    __slots__ = ('data', 'others')
+    FIELDS = (('data', 'data', TransactionData.from_json), ('others', 'others', None))
+
+
+class CompactCache(MutableMapping):
+    """A { key: JSON record } cache that stores compact records and hands out fresh JSON on reads"""
+
+    def __init__(self, record_type, snapshot=None):
+        self.record_type = record_type
+        self._records = {}
+        for key, value in (snapshot or {}).items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        return thaw(self._records[key])
+
+    def __setitem__(self, key, value):
+        self._records[_intern(key)] = self.record_type.from_json(value)
+
+    def __delitem__(self, key):
+        del self._records[key]
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def record(self, key):
+        """The compact record itself, for callers that read attributes instead of JSON"""
+        return self._records.get(key)
+
+
+def compact_cache(record_type, snapshot):
+    """Wraps a downloaded snapshot when COMPACT_RECORDS is on, else returns it unchanged"""
+    if not ENABLED or isinstance(snapshot, CompactCache):
+        return snapshot
+    return CompactCache(record_type, snapshot)
@@ -0,0 +1,100 @@
+import threading
+import time
+
+# Single-flight refresh for the entity caches.
+# When many /chat requests miss on a name at once, only one of them downloads the node;
+# the rest wait for that fetch instead of issuing their own. Refreshes closer together than
+# MIN_REFRESH_INTERVAL are skipped, and lookups on a stale cache are served immediately while
+# a background refresh revalidates it (stale-while-revalidate).
+
+MIN_REFRESH_INTERVAL = 5        # seconds between two real downloads of the same node
+STALE_AFTER = 10 * 60           # seconds before a lookup triggers a background revalidation
+WAIT_TIMEOUT = 30               # seconds a coalesced caller waits for the in-flight fetch
+
+COORDINATORS = {}  # name -> RefreshCoordinator
+
+
+class RefreshCoordinator:
+    """Coalesces concurrent refreshes of one cache into a single fetch"""
+
+    def __init__(self, name, fetch, is_live=lambda: False,
+                 min_interval=MIN_REFRESH_INTERVAL, stale_after=STALE_AFTER):
+        self.name = name
+        self.fetch = fetch          # the actual full download, e.g. db.reference(...).get()
+        self.is_live = is_live      # True while a listener keeps the cache current
+        self.min_interval = min_interval
+        self.stale_after = stale_after
+
+        self.issued = 0             # fetches that actually hit the database
+        self.coalesced = 0          # callers that piggybacked on an in-flight fetch
+        self.throttled = 0          # callers skipped because of min_interval
+        self.revalidations = 0      # background stale-while-revalidate fetches
+        self.skipped_live = 0       # refreshes skipped because a listener keeps the cache current
+
+        self._lock = threading.Lock()
+        self._inflight = None       # threading.Event of the running fetch
+        self._last_started = None
+        self._last_finished = None
+        COORDINATORS[name] = self
+
+    def refresh(self, force=False, wait=True):
+        """Runs (or joins) a refresh. Returns True if fresh data was fetched by this call or the one it joined.
+
+        While a listener keeps the cache live this is a no-op, even when forced: a full download
+        would only race the listener's deltas and could overwrite them with an older snapshot.
+        """
+        if self.is_live():
+            self.skipped_live += 1
+            return False
+
+        leader = False
+        with self._lock:
+            inflight = self._inflight
+            if inflight is not None:
+                self.coalesced += 1
+            elif not force and self._last_started and time.monotonic() - self._last_started < self.min_interval:
+                self.throttled += 1
+                return False
+            else:
+                inflight = self._inflight = threading.Event()
+                self._last_started = time.monotonic()
+                self.issued += 1
+                leader = True
+
+        if not leader:
+            if wait:
+                inflight.wait(WAIT_TIMEOUT)
+            return inflight.is_set()
+
+        try:
+            self.fetch()
+        finally:
+            with self._lock:
+                self._inflight = None
+                self._last_finished = time.monotonic()
+            inflight.set()
+        return True
+
+    def revalidate(self):
+        """Stale-while-revalidate: kicks off a background refresh if the data is old, never blocks"""
+        if self.is_live() or self._inflight is not None:
+            return
+        if self._last_finished and time.monotonic() - self._last_finished < self.stale_after:
+            return
+
+        self.revalidations += 1
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def stats(self):
+        return {
+            "issued": self.issued,
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+            "revalidations": self.revalidations,
+            "skippedLive": self.skipped_live,
+            "inFlight": self._inflight is not None
+        }
+
+
+def stats():
+    return {name: coordinator.stats() for name, coordinator in COORDINATORS.items()}
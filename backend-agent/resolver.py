@@ -0,0 +1,49 @@
+import entity_index
+
+# Turns a name extracted by the agent into exactly one cached record, or into the reply asking
+# the user to be more specific. Shared by every write path that has to resolve names.
+
+
+def resolve_entity(search_name, get_details, synced, match_by_name, found_text, entity_text):
+    """Resolves a name to a single cached record.
+
+    Returns (record_data, None) on success or (None, response) when the user has to be asked.
+    A confident fuzzy match is used before paying for a full cache refresh or a disambiguation turn,
+    and no refresh happens at all while the cache is kept live by its listener.
+    """
+    result = get_details(search_name)
+    if 'objectArray' not in result:
+        resolved = entity_index.confident_match(match_by_name(search_name))
+        if resolved:
+            return resolved, None
+
+        if synced.refresh_on_miss():
+            result = get_details(search_name)
+            if 'objectArray' not in result:
+                resolved = entity_index.confident_match(match_by_name(search_name))
+                if resolved:
+                    return resolved, None
+        if 'objectArray' not in result:
+            return None, {
+                'warning': {
+                    'text': f"No {entity_text} named '{search_name}' in bucket. Hence cant proceed!"
+                }
+            }
+
+    if len(result['objectArray']) > 1:
+        # Every hit already contains the name, so only an exact name that clearly leads the
+        # other hits is trusted ("Ramesh" must not silently pick "Ramesh Kumar" over "Rameshwar")
+        hits = result['objectArray']
+        resolved = entity_index.confident_match(
+            match_by_name(search_name, k=len(hits), within=hits), min_score=entity_index.EXACT_MATCH_SCORE
+        )
+        if resolved:
+            return resolved, None
+        return None, {
+            "response": f"{len(result['objectArray'])} {found_text}. Please provide full name to be specific!",
+            "objectArray": result['objectArray'],
+            'action': 'click_to_redirect',
+            'entity': entity_text       # which name a follow-up pick replaces (see sessions)
+        }
+
+    return result['objectArray'][0], None
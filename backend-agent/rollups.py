@@ -0,0 +1,235 @@
+import bisect
+import threading
+import time
+from array import array
+
+import ledger
+import transaction_store
+
+# Pre-aggregated sales rollups for the statistics page.
+# StatisticsComponent walks the whole transactionList on every open to build yearly/monthly/daily
+# sales, top customers and per-product demand. Here those sums are kept per time bucket (day, month,
+# year) and per member of a dimension (product, customer, delivery person, tag, or 'all'), stored
+# column-wise in int64 arrays. Every transaction remembers what it added, so an upsert subtracts the
+# old contribution and adds the new one; the dashboard then asks /analytics for a few kB of rows.
+
+METRICS = ('transactions', 'sent', 'received', 'billed', 'paid')
+DIMENSIONS = ('all', 'product', 'customer', 'deliveryPerson', 'tag')
+GRANULARITIES = {'day': 1, 'month': 100, 'year': 10000}     # divisor applied to a yyyymmdd key
+UNKNOWN_DAY = 19700101  # the frontend's fallback for entries without a date
+
+
+class RollupTable:
+    """Column store of (bucket, member) -> METRICS for one dimension at one granularity"""
+
+    def __init__(self):
+        self.columns = {metric: array('q') for metric in METRICS}
+        self._rows = {}         # (bucket, member) -> row number
+        self._buckets = []      # sorted distinct buckets
+        self._bucket_rows = {}  # bucket -> row numbers, in insertion order
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, bucket, member, deltas, sign):
+        row = self._rows.get((bucket, member))
+        if row is None:
+            row = len(self._rows)
+            self._rows[(bucket, member)] = row
+            for column in self.columns.values():
+                column.append(0)
+            if bucket not in self._bucket_rows:
+                bisect.insort(self._buckets, bucket)
+                self._bucket_rows[bucket] = []
+            self._bucket_rows[bucket].append(row)
+        for metric, delta in deltas.items():
+            self.columns[metric][row] += sign * delta
+
+    def rows(self, low=None, high=None):
+        """Yields (bucket, row numbers) for every bucket within [low, high]"""
+        start = bisect.bisect_left(self._buckets, low) if low is not None else 0
+        end = bisect.bisect_right(self._buckets, high) if high is not None else len(self._buckets)
+        for bucket in self._buckets[start:end]:
+            yield bucket, self._bucket_rows[bucket]
+
+    def members(self):
+        """row number -> member, for reading rows back"""
+        return {row: member for (_, member), row in self._rows.items()}
+
+
+def transaction_contribution(record):
+    """Returns (day, [(dimension, member, deltas)], {dimension: {member: name}}) for one transaction"""
+    data = record.get('data') if isinstance(record, dict) else None
+    if not isinstance(data, dict):
+        return None
+
+    day = transaction_store.day_key(data.get('date'), data.get('transactionId')) or UNKNOWN_DAY
+    customer_data = data.get('customer') or {}
+    names = {dimension: {} for dimension in DIMENSIONS}
+
+    sent = received = 0
+    entries = []
+    for selected in data.get('selectedProducts') or []:
+        product_data = (selected or {}).get('productData') or {} if isinstance(selected, dict) else {}
+        product_sent = ledger.to_int(selected.get('sentUnits')) if isinstance(selected, dict) else 0
+        product_received = ledger.to_int(selected.get('recievedUnits')) if isinstance(selected, dict) else 0
+        sent += product_sent
+        received += product_received
+        if product_data.get('productId'):
+            entries.append(('product', product_data['productId'], {
+                'transactions': 1, 'sent': product_sent, 'received': product_received,
+                'billed': product_sent * ledger.to_int(product_data.get('rate'))
+            }))
+            names['product'][product_data['productId']] = product_data.get('name')
+
+    totals = {'transactions': 1, 'sent': sent, 'received': received,
+              'billed': ledger.to_int(data.get('total')), 'paid': ledger.to_int(data.get('payment'))}
+    entries.append(('all', 'all', totals))
+    if customer_data.get('userId'):
+        entries.append(('customer', customer_data['userId'], totals))
+        names['customer'][customer_data['userId']] = customer_data.get('fullName')
+    for tag in set(data.get('tags') or []):
+        if isinstance(tag, str):
+            entries.append(('tag', tag, totals))
+
+    for delivery_person in data.get('deliveryBoyList') or []:
+        if not isinstance(delivery_person, dict) or not delivery_person.get('userId'):
+            continue
+        done = [item for item in delivery_person.get('deliveryDone') or [] if isinstance(item, dict)]
+        entries.append(('deliveryPerson', delivery_person['userId'], {
+            'transactions': 1,
+            'sent': sum(ledger.to_int(item.get('sentUnits')) for item in done),
+            'received': sum(ledger.to_int(item.get('recievedUnits')) for item in done)
+        }))
+        names['deliveryPerson'][delivery_person['userId']] = delivery_person.get('fullName')
+
+    return day, entries, names
+
+
+class Rollups:
+    """Every (dimension, granularity) table, kept current from the transaction cache's deltas"""
+
+    def __init__(self):
+        self.version = 0
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._tables = {(dimension, granularity): RollupTable()
+                        for dimension in DIMENSIONS for granularity in GRANULARITIES}
+        self._applied = {}      # transaction key -> contribution currently added
+        self._names = {dimension: {} for dimension in DIMENSIONS}
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = int(time.time() * 1000)
+
+    def _apply(self, contribution, sign):
+        day, entries, names = contribution
+        for dimension, members in names.items():
+            self._names[dimension].update((member, name) for member, name in members.items() if name)
+        for granularity, divisor in GRANULARITIES.items():
+            bucket = day // divisor
+            for dimension, member, deltas in entries:
+                self._tables[(dimension, granularity)].add(bucket, member, deltas, sign)
+
+    def _set(self, key, record):
+        contribution = transaction_contribution(record)
+        if contribution:
+            self._applied[key] = contribution
+            self._apply(contribution, 1)
+
+    def build(self, cache):
+        with self._lock:
+            self._reset()
+            for key, record in (cache or {}).items():
+                self._set(key, record)
+            self._touch()
+
+    def upsert(self, key, record):
+        with self._lock:
+            previous = self._applied.pop(key, None)
+            if previous:
+                self._apply(previous, -1)
+            self._set(key, record)
+            self._touch()
+
+    def remove(self, key):
+        with self._lock:
+            previous = self._applied.pop(key, None)
+            if previous:
+                self._apply(previous, -1)
+                self._touch()
+
+    def series(self, dimension='all', granularity='month', member=None, date_from=None, date_to=None):
+        """Non-empty rows ordered by bucket: [{bucket, member, name, METRICS...}]
+
+        date_from / date_to are yyyymmdd ints; they are truncated to the granularity.
+        """
+        table = self._table(dimension, granularity)
+        divisor = GRANULARITIES[granularity]
+        low = date_from // divisor if date_from is not None else None
+        high = date_to // divisor if date_to is not None else None
+
+        with self._lock:
+            members = table.members()
+            names = self._names[dimension]
+            result = []
+            for bucket, rows in table.rows(low, high):
+                for row in rows:
+                    if member is not None and members[row] != member:
+                        continue
+                    values = {metric: column[row] for metric, column in table.columns.items()}
+                    if not any(values.values()):
+                        continue
+                    result.append({"bucket": bucket, "member": members[row], "name": names.get(members[row]), **values})
+            return result
+
+    def top(self, dimension, metric='paid', date_from=None, date_to=None, limit=10):
+        """Members of a dimension with the largest `metric` within the date range"""
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+        # Whole-history totals come from the few yearly buckets; a date range needs daily ones
+        granularity = 'day' if date_from is not None or date_to is not None else 'year'
+        totals = {}
+        for row in self.series(dimension, granularity, date_from=date_from, date_to=date_to):
+            total = totals.setdefault(row['member'], {"member": row['member'], "name": row['name'],
+                                                      **dict.fromkeys(METRICS, 0)})
+            for field in METRICS:
+                total[field] += row[field]
+        return sorted(totals.values(), key=lambda item: -item[metric])[:limit]
+
+    def _table(self, dimension, granularity):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"unknown dimension '{dimension}', expected one of {', '.join(DIMENSIONS)}")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"unknown granularity '{granularity}', expected one of {', '.join(GRANULARITIES)}")
+        return self._tables[(dimension, granularity)]
+
+    def stats(self):
+        with self._lock:
+            return {"transactions": len(self._applied), "rows": sum(len(table) for table in self._tables.values()),
+                    "version": self.version}
+
+
+ROLLUPS = Rollups()
+transaction_store.TRANSACTION_VIEWS.add(ROLLUPS, transaction_store.TRANSACTION_CACHE)
+
+
+def analytics(dimension='all', granularity='month', member=None, date_from=None, date_to=None,
+              top=None, metric='paid'):
+    """Payload of GET /analytics: one series, or the `top` members of a dimension"""
+    if not transaction_store.TRANSACTION_CACHE:
+        transaction_store.refresh_transaction_cache()
+    else:
+        transaction_store.TRANSACTION_REFRESH.revalidate()
+
+    date_from = transaction_store.parse_day(date_from)
+    date_to = transaction_store.parse_day(date_to)
+    if top:
+        rows = ROLLUPS.top(dimension, metric, date_from, date_to, top)
+    else:
+        rows = ROLLUPS.series(dimension, granularity, member, date_from, date_to)
+    return {"dimension": dimension, "granularity": None if top else granularity, "count": len(rows),
+            "objectArray": rows, "version": ROLLUPS.version}
@@ -0,0 +1,253 @@
+import bisect
+import heapq
+import math
+import threading
+
+import entity_index
+import transaction_store
+
+# Full-text search over /transactionList.
+# An inverted index maps every word of an entry's customer name, phone and address, delivery
+# persons, product names, tags and extraDetails to the entries containing it (with a field weight),
+# so a keyword query is a few dictionary lookups instead of stringifying every row. It is a view on
+# TRANSACTION_VIEWS, so listener deltas and the agent's own writes update it entry by entry.
+#
+# Every query word must match (the last one also as a prefix, for search-as-you-type); results are
+# ranked by the summed field weight x idf of the matched words, newest entry first on ties.
+
+FIELD_WEIGHTS = {
+    'customer': 3,
+    'product': 2,
+    'deliveryPerson': 2,
+    'tag': 2,
+    'address': 2,
+    'phone': 1,
+    'extraDetails': 1,
+}
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_OFFSET = 1000           # ranked results are paged by offset; deeper pages should narrow the query
+MIN_PREFIX = 2              # shorter last words only match whole words
+MAX_EXPANSIONS = 64         # a prefix matches at most this many words (the most frequent ones)
+
+
+def tokenize(text):
+    return entity_index.TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+
+
+def _texts(value):
+    """A string, or the strings of a list (addresses and tags are stored either way)"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, str)]
+    return []
+
+
+def document_terms(record):
+    """{ word: weight } of one transactionList entry"""
+    data = record.get('data') if isinstance(record, dict) else None
+    if not isinstance(data, dict):
+        return {}
+    terms = {}
+
+    def add(field, texts):
+        weight = FIELD_WEIGHTS[field]
+        for text in texts:
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0) + weight
+
+    customer_data = data.get('customer') if isinstance(data.get('customer'), dict) else {}
+    add('customer', _texts(customer_data.get('fullName')))
+    add('phone', _texts(customer_data.get('phoneNumber')))
+    add('address', _texts(customer_data.get('address')) + _texts(data.get('shippingAddress')))
+    add('deliveryPerson', [person.get('fullName') for person in data.get('deliveryBoyList') or []
+                           if isinstance(person, dict) and isinstance(person.get('fullName'), str)])
+    add('product', [((item.get('productData') or {}).get('name')) for item in data.get('selectedProducts') or []
+                    if isinstance(item, dict) and isinstance((item.get('productData') or {}).get('name'), str)])
+    add('tag', _texts(data.get('tags')))
+    add('extraDetails', _texts(data.get('extraDetails')))
+    return terms
+
+
+class SearchIndex:
+    """Inverted index: word -> { transaction key: weight }, plus the sorted vocabulary for prefixes"""
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}     # word -> { key: weight }
+        self._documents = {}    # key -> tuple of its words (to unlink it on update)
+        self._vocabulary = []   # sorted words
+
+    def __len__(self):
+        return len(self._documents)
+
+    def build(self, cache):
+        with self._lock:
+            self._reset()
+            postings = self._postings
+            for key, record in (cache or {}).items():
+                terms = document_terms(record)
+                self._documents[key] = tuple(terms)
+                for term, weight in terms.items():
+                    posting = postings.get(term)
+                    if posting is None:
+                        posting = postings[term] = {}
+                    posting[key] = weight
+            self._vocabulary = sorted(postings)
+            self.version += 1
+
+    def upsert(self, key, record):
+        with self._lock:
+            self._unlink(key)
+            terms = document_terms(record)
+            self._documents[key] = tuple(terms)
+            for term, weight in terms.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = {}
+                    bisect.insort(self._vocabulary, term)
+                posting[key] = weight
+            self.version += 1
+
+    def remove(self, key):
+        with self._lock:
+            if self._unlink(key):
+                self.version += 1
+
+    def _unlink(self, key):
+        terms = self._documents.pop(key, None)
+        if terms is None:
+            return False
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[term]
+                position = bisect.bisect_left(self._vocabulary, term)
+                if position < len(self._vocabulary) and self._vocabulary[position] == term:
+                    del self._vocabulary[position]
+        return True
+
+    def _expand(self, prefix):
+        """The MAX_EXPANSIONS most frequent indexed words starting with `prefix`"""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff', start)
+        words = self._vocabulary[start:end]
+        if len(words) > MAX_EXPANSIONS:
+            words = heapq.nlargest(MAX_EXPANSIONS, words, key=lambda word: len(self._postings[word]))
+        return words
+
+    def search(self, query, limit=SEARCH_LIMIT, offset=0):
+        """Returns (total matches, [(key, score)]) for the `limit` best matches after `offset`"""
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+        prefix_last = isinstance(query, str) and not query[-1:].isspace() and len(tokens[-1]) >= MIN_PREFIX
+
+        with self._lock:
+            total = max(len(self._documents), 1)
+            groups = []     # per query word: [(idf, posting)] of the words it matches
+            unique = list(dict.fromkeys(tokens))
+            for position, token in enumerate(unique):
+                last = position == len(unique) - 1
+                words = self._expand(token) if last and prefix_last else [token] if token in self._postings else []
+                if not words:
+                    return 0, []
+                groups.append([(math.log(1 + total / len(self._postings[word])), self._postings[word])
+                               for word in words])
+
+            groups.sort(key=lambda group: sum(len(posting) for _, posting in group))
+            if len(groups) == 1 and len(groups[0]) == 1:
+                # One word: its posting already holds every score (weight x the same idf)
+                idf, posting = groups[0][0]
+                best = heapq.nlargest(offset + limit, posting.items(), key=lambda item: (item[1], item[0]))
+                return len(posting), [(key, round(idf * weight, 3)) for key, weight in best[offset:]]
+
+            # Intersect the key sets first (set operations, smallest first), then score only the matches
+            matches = None
+            for group in groups:
+                keys = group[0][1].keys() if len(group) == 1 else set().union(*(posting for _, posting in group))
+                matches = set(keys) if matches is None else matches.intersection(keys)
+                if not matches:
+                    return 0, []
+            scores = dict.fromkeys(matches, 0.0)
+            for group in groups:
+                for idf, posting in group:
+                    if len(posting) < len(scores):
+                        for key, weight in posting.items():
+                            if key in scores:
+                                scores[key] += idf * weight
+                    else:
+                        for key in scores:
+                            weight = posting.get(key)
+                            if weight:
+                                scores[key] += idf * weight
+
+        best = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return len(scores), [(key, round(score, 3)) for key, score in best[offset:]]
+
+    def stats(self):
+        return {"transactions": len(self._documents), "words": len(self._postings), "version": self.version}
+
+
+SEARCH = SearchIndex()
+transaction_store.TRANSACTION_VIEWS.add(SEARCH, transaction_store.TRANSACTION_CACHE)
+
+
+def search_transactions(query, limit=SEARCH_LIMIT, offset=0, projection='compact'):
+    """Payload of GET /search: ranked entries matching every word of `query`"""
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("query is required")
+    limit = int(limit or SEARCH_LIMIT)
+    offset = int(offset or 0)
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    if not 0 <= offset <= MAX_OFFSET:
+        raise ValueError(f"offset must be between 0 and {MAX_OFFSET}")
+    if projection not in ('compact', 'full'):
+        raise ValueError("projection must be 'compact' or 'full'")
+
+    if not transaction_store.TRANSACTION_CACHE:
+        transaction_store.refresh_transaction_cache()
+
+    count, hits = SEARCH.search(query, limit, offset)
+    cache = transaction_store.TRANSACTION_CACHE
+    rows = []
+    for key, score in hits:
+        record = cache.get(key)
+        if record is None:
+            continue
+        row = transaction_store.project(record) if projection == 'compact' else record
+        rows.append({**row, "score": score} if projection == 'compact' else {"score": score, **record})
+    next_offset = offset + limit if offset + limit < count and offset + limit <= MAX_OFFSET else None
+    return {"query": query, "count": count, "objectArray": rows, "nextOffset": next_offset, "version": SEARCH.version}
+
+
+def execute_search_transactions(query, limit=5):
+    """Agent tool: keyword search over entries (names, addresses, products, tags, notes)"""
+    try:
+        result = search_transactions(query, limit=min(int(limit or 5), MAX_SEARCH_LIMIT))
+    except ValueError as e:
+        return {
+                'warning': {
+                    'text': f"INVALID QUERY: {str(e)}",
+                    'action': 'call_admin'
+                }
+            }
+    rows = result['objectArray']
+    if not rows:
+        return {"response": f"No entries match '{query}'.", "objectArray": rows}
+    listed = "; ".join(
+        f"{row['date']} {row['customer'].get('fullName') or ''}: "
+        + ", ".join(f"{product['name']} x{product['sentUnits'] or 0}" for product in row['products'])
+        for row in rows
+    )
+    return {"response": f"{result['count']} entries match '{query}'. Top {len(rows)}: {listed}.", "objectArray": rows}
@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Server-side chat state per session id.
+# Every /chat message used to start a fresh model chat: after "3 Customers found. Please provide
+# full name!" the user had to resend the whole sentence and the model extracted everything again.
+# A session keeps its last MAX_TURNS exchanges as short text (replayed to the model as chat
+# history) and the disambiguation it is waiting on, so a follow-up like "the second one" or
+# "gupta" re-runs the interrupted call with that pick, without a model call.
+#
+# Sessions are evicted least-recently-used beyond MAX_SESSIONS or MAX_BYTES (estimated from the
+# text and options they hold) and expire SESSION_TTL seconds after their last message.
+
+MAX_SESSIONS = int(os.environ.get("CHAT_MAX_SESSIONS", "1000"))
+MAX_BYTES = int(os.environ.get("CHAT_SESSION_MEMORY", str(16 * 1024 * 1024)))
+SESSION_TTL = float(os.environ.get("CHAT_SESSION_TTL", str(30 * 60)))    # seconds
+MAX_TURNS = int(os.environ.get("CHAT_MAX_TURNS", "6"))
+MAX_TURN_CHARS = 500        # each remembered message and reply is cut to this length
+MAX_ID_LENGTH = 100
+MAX_FOLLOW_UP_WORDS = 6     # longer messages are new requests, not a pick
+
+HEADER = "x-session-id"
+BODY_FIELD = "sessionId"
+
+# Function -> { entity the resolver asked about: argument holding its name }. Lookups are not
+# listed: picking one of their hits is the answer itself.
+FOLLOW_UP_ARGS = {
+    "process_transaction": {"customer": "customer_name", "delivery person": "delivery_boy_name", "product": "product_name"},
+}
+# Lookup -> what its options are, in the words the widget routes "Show me!" on
+LOOKUPS = {"get_customer_details": "customer", "get_admin_details": "admin",
+           "get_delivery_person_details": "delivery person", "get_product_details": "product"}
+
+ORDINALS = {
+    "first": 1, "1st": 1, "second": 2, "2nd": 2, "two": 2, "third": 3, "3rd": 3, "three": 3,
+    "fourth": 4, "4th": 4, "four": 4, "fifth": 5, "5th": 5, "five": 5, "last": -1,
+}
+FILLER = {"the", "one", "a", "that", "this", "it", "is", "i", "mean", "option", "number", "no", "please", "pls", "yes", "take", "pick"}
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def label(option):
+    """The name an option (customer, admin, delivery person or product data) is shown with"""
+    return (option.get('fullName') or option.get('name') or '') if isinstance(option, dict) else ''
+
+
+def _position(word):
+    if word in ORDINALS:
+        return ORDINALS[word]
+    return int(word) if word.isdigit() and len(word) <= 2 else None
+
+
+def choose(message, options):
+    """The option a short follow-up picks ("the second one", "2", "last", "gupta"), or None.
+
+    Every other word of the message must be part of the picked option's name, so a new request
+    like "2 cylinders to ramesh" is never taken for a pick.
+    """
+    words = WORD.findall(str(message or '').lower())
+    if not words or len(words) > MAX_FOLLOW_UP_WORDS or not options:
+        return None
+    positions = {_position(word) for word in words} - {None}
+    names = [word for word in words if word not in FILLER and _position(word) is None]
+
+    if positions:
+        if len(positions) > 1:
+            return None
+        position = positions.pop()
+        if position == -1:
+            option = options[-1]
+        elif 1 <= position <= len(options):
+            option = options[position - 1]
+        else:
+            return None
+        return option if set(names) <= set(WORD.findall(label(option).lower())) else None
+
+    if not names:
+        return None
+    exact = [option for option in options if WORD.findall(label(option).lower()) == names]
+    if len(exact) == 1:
+        return exact[0]
+    matching = [option for option in options if set(names) <= set(WORD.findall(label(option).lower()))]
+    return matching[0] if len(matching) == 1 else None
+
+
+def reply_text(reply):
+    """What the model is told the agent answered (the widget renders the rest from objectArray)"""
+    if not isinstance(reply, dict):
+        return str(reply)
+    text = reply.get('response') or (reply.get('warning') or {}).get('text') or ''
+    options = reply.get('objectArray')
+    if isinstance(options, list) and options:
+        text = (text + " " if text else "") + "Listed: " + ", ".join(label(option) for option in options[:10])
+    return text
+
+
+class Pending:
+    """A call interrupted by a disambiguation and the options offered to the user"""
+
+    def __init__(self, name, args, field, options):
+        self.name = name
+        self.args = args
+        self.field = field      # argument to fill with the picked name; None for a lookup
+        self.options = options
+
+
+class ChatSession:
+    def __init__(self, session_id, max_turns=MAX_TURNS):
+        self.session_id = session_id
+        self.turns = deque(maxlen=max_turns)    # (user message, reply text)
+        self.pending = None
+        self.last_used = 0.0
+        self.size = 0
+
+    def history(self):
+        """[(role, text)] of the remembered turns, oldest first, for model_client.start_chat"""
+        return [(role, text) for message, reply in self.turns for role, text in (("user", message), ("model", reply))]
+
+    def expect_choice(self, name, args, reply):
+        """Remembers a disambiguation reply, so the next message can pick one of its options"""
+        self.pending = None
+        options = reply.get('objectArray') if isinstance(reply, dict) else None
+        if not isinstance(options, list) or len(options) < 2 or reply.get('action') != 'click_to_redirect':
+            return
+        if name in FOLLOW_UP_ARGS:
+            field = FOLLOW_UP_ARGS[name].get(reply.get('entity'))
+            if field:
+                self.pending = Pending(name, dict(args or {}), field, options)
+        elif name is None or name in LOOKUPS:
+            self.pending = Pending(name, dict(args or {}), None, options)
+
+    def _measure(self):
+        size = sum(len(message) + len(reply) for message, reply in self.turns)
+        if self.pending is not None:
+            size += sum(len(str(option)) for option in self.pending.options)
+        return size
+
+
+class SessionStore:
+    """LRU + TTL map of session id -> ChatSession, bounded by count and estimated bytes"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, max_bytes=MAX_BYTES, ttl=SESSION_TTL, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = OrderedDict()  # session id -> ChatSession, least recently used first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.follow_ups = 0
+
+    def get(self, session_id):
+        """The session for `session_id` (a new one if unknown or expired), or None without an id"""
+        if not session_id:
+            return None
+        now = self.clock()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.last_used >= self.ttl:
+                self._drop(session_id)
+                self.expired += 1
+                session = None
+            if session is None:
+                session = self._sessions[session_id] = ChatSession(session_id)
+                self.created += 1
+            self._sessions.move_to_end(session_id)
+            session.last_used = now
+            self._evict()
+            return session
+
+    def remember(self, session, message, reply):
+        """Adds one exchange to the session and re-checks the memory cap"""
+        session.turns.append((str(message or '')[:MAX_TURN_CHARS], reply_text(reply)[:MAX_TURN_CHARS]))
+        with self._lock:
+            size = session._measure()
+            if self._sessions.get(session.session_id) is session:
+                self.bytes += size - session.size
+            session.size = size
+            self._evict()
+
+    def follow_up(self, session, message):
+        """(pending call, picked option) when `message` answers the session's disambiguation, else None.
+
+        The pending call is dropped either way: a message that picks nothing is a new request.
+        """
+        pending, session.pending = session.pending, None
+        if pending is None:
+            return None
+        choice = choose(message, pending.options)
+        if choice is None:
+            return None
+        with self._lock:
+            self.follow_ups += 1
+        return pending, choice
+
+    def _drop(self, session_id):
+        session = self._sessions.pop(session_id)
+        self.bytes -= session.size
+
+    def _evict(self):
+        # The most recent session always stays, even if it alone is over the cap
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self.bytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        return {"sessions": len(self._sessions), "maxSessions": self.max_sessions, "bytes": self.bytes,
+                "maxBytes": self.max_bytes, "ttl": self.ttl, "created": self.created, "expired": self.expired,
+                "evicted": self.evicted, "followUps": self.follow_ups}
+
+
+SESSIONS = SessionStore()
+
+
+def session_id_of(headers, body=None):
+    """The request's chat session id (header first, then the JSON body), or None"""
+    session_id = (headers or {}).get(HEADER)
+    if not session_id and isinstance(body, dict):
+        session_id = body.get(BODY_FIELD)
+    if not session_id:
+        return None
+    return str(session_id)[:MAX_ID_LENGTH]
@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+import time
+
+import cache_sync
+
+# Storage backends for the agent.
+# Every module reads and writes through storage.reference(path), which mirrors the part of
+# firebase_admin.db.Reference the service uses: get(), set(), update(), child() and listen().
+#
+#   STORAGE_BACKEND=firebase (default)  -> the live Realtime Database, initialized once here
+#   STORAGE_BACKEND=memory              -> an in-process tree, optionally loaded from
+#                                          STORAGE_SNAPSHOT (a full database JSON export, the
+#                                          same file the frontend reads in getDataFromLocalJson)
+
+DATABASE_URL = 'https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app'  # fuel-flow-india-default-rtdb.asia-southeast1.firebasedatabase.app
+CREDENTIALS_FILE = "serviceAccountKey.json"
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def clone(value):
+    """Copies a value the way it travels to and from Firebase (JSON), rejecting what Firebase would reject"""
+    return json.loads(json.dumps(value)) if isinstance(value, (dict, list)) else value
+
+
+def split_path(path):
+    return [segment for segment in (path or '').split('/') if segment]
+
+
+def join_path(*paths):
+    return '/'.join(segment for path in paths for segment in split_path(path))
+
+
+class FirebaseStorage:
+    """The live Realtime Database. Firebase is initialized once, here, instead of in every module"""
+
+    def __init__(self, database_url=DATABASE_URL, credentials_file=CREDENTIALS_FILE):
+        import firebase_admin
+        from firebase_admin import credentials, db
+
+        self._db = db
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            try:
+                cred = credentials.Certificate(credentials_file)
+                firebase_admin.initialize_app(cred, {'databaseURL': database_url})
+            except Exception as e:
+                print(f"Firebase Init Error: {e}")
+
+    def reference(self, path=''):
+        return self._db.reference(path or '/')
+
+
+class MemoryStorage:
+    """In-process database tree with Firebase-like get/set/update/listen semantics.
+
+    `latency` adds a blocking delay to every read and write so benchmarks can emulate
+    network round-trips without a live project.
+    """
+
+    def __init__(self, data=None, latency=0.0):
+        self.data = data if data is not None else {}
+        self.latency = latency
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.RLock()
+        self._listeners = []    # (path segments, callback)
+
+    @classmethod
+    def from_json(cls, snapshot_path, **kwargs):
+        """Loads a full database export (Firebase console 'Export JSON')"""
+        with open(snapshot_path, encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    def save_json(self, snapshot_path):
+        with self._lock:
+            with open(snapshot_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f)
+
+    def reference(self, path=''):
+        return MemoryReference(self, join_path(path))
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get(self, path):
+        self._wait()
+        with self._lock:
+            self.reads += 1
+            node = self.data
+            for segment in split_path(path):
+                if not isinstance(node, dict) or segment not in node:
+                    return None
+                node = node[segment]
+            return clone(node)
+
+    def set(self, path, value):
+        self._wait()
+        with self._lock:
+            self.writes += 1
+            self._put(split_path(path), clone(value))
+            # Delivered under the lock so listeners see writes in commit order
+            self._notify(self._events_for_put(split_path(path)))
+
+    def update(self, path, values):
+        """Multi-path update: every key (which may itself be a path) is written atomically"""
+        self._wait()
+        base = split_path(path)
+        with self._lock:
+            self.writes += 1
+            for child, value in values.items():
+                self._put(base + split_path(child), clone(value))
+            self._notify(self._events_for_update(base, values))
+
+    def listen(self, path, callback):
+        segments = split_path(path)
+        with self._lock:
+            self._listeners.append((segments, callback))
+            initial = self._value_at(segments)
+        callback(cache_sync.SyncEvent('put', '/', initial))
+        return MemoryRegistration(self, callback)
+
+    def _put(self, segments, value):
+        if not segments:
+            self.data = value if isinstance(value, dict) else {}
+            return
+
+        node = self.data
+        for segment in segments[:-1]:
+            if not isinstance(node.get(segment), dict):
+                if value is None:
+                    return
+                node[segment] = {}
+            node = node[segment]
+        if value is None:
+            node.pop(segments[-1], None)
+        else:
+            node[segments[-1]] = value
+
+    def _value_at(self, segments):
+        node = self.data
+        for segment in segments:
+            if not isinstance(node, dict) or segment not in node:
+                return None
+            node = node[segment]
+        return clone(node)
+
+    def _events_for_put(self, written):
+        events = []
+        for listened, callback in self._listeners:
+            if written[:len(listened)] == listened:
+                relative = '/' + '/'.join(written[len(listened):])
+                events.append((callback, cache_sync.SyncEvent('put', relative, self._value_at(written))))
+            elif listened[:len(written)] == written:
+                # An ancestor of the listened node was replaced
+                events.append((callback, cache_sync.SyncEvent('put', '/', self._value_at(listened))))
+        return events
+
+    def _events_for_update(self, base, values):
+        events = []
+        for listened, callback in self._listeners:
+            if base[:len(listened)] == listened:
+                relative = '/' + '/'.join(base[len(listened):])
+                patch = {child: self._value_at(base + split_path(child)) for child in values}
+                events.append((callback, cache_sync.SyncEvent('patch', relative, patch)))
+            else:
+                for child in values:
+                    events.extend(
+                        (listener, event) for listener, event in self._events_for_put(base + split_path(child))
+                        if listener is callback
+                    )
+        return events
+
+    def _notify(self, events):
+        for callback, event in events:
+            callback(event)
+
+
+class MemoryReference:
+    """The subset of firebase_admin.db.Reference used by the service"""
+
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+
+    def child(self, path):
+        return MemoryReference(self._store, join_path(self.path, path))
+
+    def get(self):
+        return self._store.get(self.path)
+
+    def set(self, value):
+        self._store.set(self.path, value)
+
+    def update(self, values):
+        self._store.update(self.path, values)
+
+    def delete(self):
+        self._store.set(self.path, None)
+
+    def listen(self, callback):
+        return self._store.listen(self.path, callback)
+
+
+class MemoryRegistration:
+    def __init__(self, store, callback):
+        self._store = store
+        self._callback = callback
+
+    def close(self):
+        with self._store._lock:
+            self._store._listeners = [
+                (segments, callback) for segments, callback in self._store._listeners if callback is not self._callback
+            ]
+
+
+def backend_from_env():
+    if os.environ.get("STORAGE_BACKEND", "firebase") == "memory":
+        snapshot = os.environ.get("STORAGE_SNAPSHOT")
+        if snapshot:
+            print(f"Using in-memory storage loaded from {snapshot}")
+            return MemoryStorage.from_json(snapshot)
+        print("Using empty in-memory storage")
+        return MemoryStorage()
+    return FirebaseStorage()
+
+
+def use(backend):
+    """Installs a backend explicitly (tests, benchmarks); must run before the first reference()"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = backend_from_env()
+        return _backend
+
+
+def reference(path=''):
+    """Drop-in replacement for firebase_admin.db.reference(path)"""
+    return get_backend().reference(path)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+# The backend modules are flat files next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches are loaded explicitly by the tests; main must not attach listeners on import
+os.environ["CACHE_SYNC"] = "0"
+
+import storage  # noqa: E402
+
+# Tests never reach Firebase: every module reads and writes an in-process tree
+storage.use(storage.MemoryStorage())
+
+import pytest  # noqa: E402
+
+CUSTOMERS = ["Rakesh Gupta", "Ramesh Kumar", "Sweta Sharma", "Harsh Gupta"]
+DELIVERY_PERSONS = ["Sweta Singh", "Animesh Yadav"]
+PRODUCTS = [("LPG 14KG", 900), ("LPG 19KG", 1500), ("Oxygen", 400)]
+
+
+@pytest.fixture
+def store():
+    """Fresh in-memory database with the entity caches seeded from it"""
+    import customer
+    import delivery
+    import deposit
+    import product
+    import transaction_store
+
+    data = {
+        "customer": {"bucket": {
+            f"C{i}": {"data": {"fullName": name, "userId": f"C{i}", "phoneNumber": "", "shippingAddress": ["Main Road"]}}
+            for i, name in enumerate(CUSTOMERS)
+        }},
+        "deliveryPerson": {"bucket": {
+            f"D{i}": {"data": {"fullName": name, "userId": f"D{i}"}} for i, name in enumerate(DELIVERY_PERSONS)
+        }},
+        "productList": {
+            f"P{i}": {"data": {"name": name, "productId": f"P{i}", "rate": rate, "productReturnable": True}}
+            for i, (name, rate) in enumerate(PRODUCTS)
+        }
+    }
+    previous = storage.get_backend()
+    memory = storage.use(storage.MemoryStorage(data))
+    customer.set_customer_cache(memory.reference('customer/bucket').get())
+    delivery.set_delivery_boy_cache(memory.reference('deliveryPerson/bucket').get())
+    product.set_product_cache(memory.reference('productList').get())
+    transaction_store.set_transaction_cache({})
+    deposit.set_deposit_cache({})
+    yield memory
+
+    storage.use(previous)
+    customer.set_customer_cache({})
+    delivery.set_delivery_boy_cache({})
+    product.set_product_cache({})
+    transaction_store.set_transaction_cache({})
+    deposit.set_deposit_cache({})
+
+
+@pytest.fixture(autouse=True)
+def scheduler(monkeypatch):
+    """Fresh admission control per test, so token buckets do not carry over between tests"""
+    import admission
+
+    monkeypatch.setattr(admission, 'SCHEDULER', admission.Scheduler())
+    return admission.SCHEDULER
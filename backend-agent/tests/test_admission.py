@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import admission
+import idempotency
+import intent_cache
+
+
+def stub_model(monkeypatch, latency):
+    """A model that takes `latency` seconds per message and records the order it was asked in"""
+    import model_client
+
+    asked = []
+
+    def send_message(message, stream=False):
+        asked.append(message)
+        time.sleep(latency)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[]))], text=f"ok: {message}")
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=lambda: SimpleNamespace(send_message=send_message)))
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+    monkeypatch.setattr(intent_cache, 'INTENT_CACHE', intent_cache.IntentCache())
+    return asked
+
+
+def request(message, user="U1"):
+    async def body():
+        return {"message": message}
+    return SimpleNamespace(json=body, headers={"x-user-id": user})
+
+
+def test_messages_are_classified_write_or_lookup():
+    assert admission.priority_of("note that rakesh got a couple of big ones") == admission.WRITE
+    assert admission.priority_of("sweta delivered 2 cylinders to harsh") == admission.WRITE
+    assert admission.priority_of("what is ramesh's phone number?") == admission.LOOKUP
+    assert admission.tenant_of({}, {"userId": "U7"}) == "U7"
+    assert admission.tenant_of({}, {}, "10.0.0.1") == "10.0.0.1"
+
+
+def test_writes_jump_queued_lookups_and_a_full_queue_is_rejected_with_retry_after(store, monkeypatch):
+    import main
+
+    asked = stub_model(monkeypatch, latency=0.1)
+    monkeypatch.setattr(admission, 'SCHEDULER', admission.Scheduler(max_concurrency=1, max_queue=2, rate=0, enabled=True))
+
+    async def run():
+        tasks = []
+        for message in ["what is ramesh's phone number?", "which customers live on main road?",
+                        "note that rakesh got a couple of big ones", "who delivers to harsh?"]:
+            tasks.append(asyncio.create_task(main.chat_endpoint(request(message))))
+            await asyncio.sleep(0.01)
+        return await asyncio.gather(*tasks)
+
+    first, second, write, overflow = asyncio.run(run())
+    assert asked == ["what is ramesh's phone number?", "note that rakesh got a couple of big ones",
+                     "which customers live on main road?"]
+    assert [first["response"], write["response"]] == ["ok: what is ramesh's phone number?",
+                                                      "ok: note that rakesh got a couple of big ones"]
+    assert second["response"].startswith("ok:")
+
+    assert overflow.status_code == 429
+    assert int(overflow.headers["Retry-After"]) >= 1
+
+    stats = admission.SCHEDULER.stats()
+    assert stats["admitted"] == {"write": 1, "lookup": 2}
+    assert stats["rejected"]["queueFull"] == 1
+    assert stats["peakQueueDepth"] == 2
+    assert stats["active"] == 0 and stats["queueDepth"] == 0
+    assert stats["waitSeconds"]["max"] > 0
+
+
+def test_each_user_has_a_token_bucket():
+    now = [100.0]
+    scheduler = admission.Scheduler(max_concurrency=4, rate=1, burst=2, enabled=True, clock=lambda: now[0])
+
+    async def ask(tenant):
+        async with scheduler.slot(admission.LOOKUP, tenant):
+            pass
+
+    asyncio.run(ask("U1"))
+    asyncio.run(ask("U1"))
+    with pytest.raises(admission.Rejected) as rejected:
+        asyncio.run(ask("U1"))
+    assert (rejected.value.reason, rejected.value.retry_after) == ("rateLimited", 1)
+
+    asyncio.run(ask("U2"))      # another user is not affected
+    now[0] += 1
+    asyncio.run(ask("U1"))      # refilled
+    assert scheduler.stats()["rejected"]["rateLimited"] == 1
+    assert scheduler.stats()["tenants"] == 2
+
+
+def test_a_request_waiting_too_long_is_rejected_and_leaves_the_queue():
+    scheduler = admission.Scheduler(max_concurrency=1, max_wait=0.05, rate=0, enabled=True)
+
+    async def run():
+        await scheduler.acquire()
+        with pytest.raises(admission.Rejected) as rejected:
+            await scheduler.acquire(admission.WRITE)
+        assert rejected.value.reason == "timedOut"
+        assert scheduler.stats()["queueDepth"] == 0
+        scheduler.release(0.01)
+
+    asyncio.run(run())
+    assert scheduler.stats()["active"] == 0
+    assert scheduler.stats()["rejected"]["timedOut"] == 1
+
+
+def test_a_rejected_stream_says_so_before_its_reply(store, monkeypatch):
+    import main
+
+    stub_model(monkeypatch, latency=0)
+    monkeypatch.setattr(admission, 'SCHEDULER', admission.Scheduler(rate=1, burst=1, enabled=True))
+
+    async def stream(message):
+        response = await main.chat_stream_endpoint(request(message))
+        return [frame async for frame in response.body_iterator]
+
+    def events(message):
+        return [(event.removeprefix("event: "), json.loads(data.removeprefix("data: ")))
+                for event, data in (frame.strip().split("\n") for frame in asyncio.run(stream(message)))]
+
+    assert [event for event, _ in events("what is ramesh's phone number?")] == ["reply"]
+    (rejected, data), (reply, body) = events("what is harsh's phone number?")
+    assert (rejected, data) == ("rejected", {"reason": "rateLimited", "retryAfter": 1})
+    assert reply == "reply" and body["retryAfter"] == 1 and body["warning"]["action"] == "retry"
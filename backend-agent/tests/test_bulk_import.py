@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import bulk_import
+
+
+async def stream(data, size=7):
+    """Delivers the body in small chunks so lines and UTF-8 characters are split across chunks"""
+    body = data.encode('utf-8')
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def run_import(data, data_format="csv", chunk_rows=2, dry_run=False):
+    return asyncio.run(bulk_import.import_stream(stream(data), data_format, chunk_rows=chunk_rows, dry_run=dry_run))
+
+
+CSV = (
+    "Date,Customer,Delivery Person,Product,Sent,Receieved,Paid Amount,Extra Note\n"
+    "5 Jan 2025,Rakesh Gupta,Sweta Singh,LPG 14KG,2,1,1800,\n"
+    "2025-01-06,Harsh Gupta,Animesh,Oxygen,3,0,,\"late, paid – cash\"\n"
+    "06/01/2025,Nobody,Sweta Singh,LPG 14KG,1,0,,\n"
+    "07/01/2025,Ramesh Kumar,Sweta Singh,LPG 19KG,two,0,,\n"
+    "\n"
+    "08/01/2025,Sweta Sharma,Sweta Singh,LPG 19KG,1,1,0,\"multi\nline\"\n"
+)
+
+
+def test_csv_rows_are_written_in_chunks_with_per_row_errors(store):
+    writes = store.writes
+    report = run_import(CSV)
+
+    assert (report['rows'], report['written'], report['failed']) == (5, 3, 2)
+    assert [error['row'] for error in report['errors']] == [3, 4]
+    assert "Nobody" in report['errors'][0]['error']
+    assert "sent_units" in report['errors'][1]['error']
+    assert store.writes - writes == 3   # one multi-path update per chunk that had valid rows
+
+    stored = {entry['data']['customer']['fullName']: entry['data'] for entry in store.reference('transactionList').get().values()}
+    assert stored['Rakesh Gupta']['date'] == "05/01/2025"
+    assert stored['Harsh Gupta']['extraDetails'] == "late, paid – cash"
+    assert stored['Harsh Gupta']['deliveryBoyList'][0]['fullName'] == "Animesh Yadav"
+    assert stored['Harsh Gupta']['total'] == 1200
+    assert stored['Sweta Sharma']['extraDetails'] == "multi\nline"
+
+
+def test_ndjson_and_dry_run(store):
+    rows = [
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 1},
+        {"customer_name": "Rakesh Gupta", "product_name": "Oxygen"},
+    ]
+    data = "\n".join(json.dumps(row) for row in rows) + "\n{not json\n"
+
+    report = run_import(data, "ndjson", dry_run=True)
+    assert (report['rows'], report['written'], report['failed']) == (3, 0, 2)
+    assert report['errors'][0] == {"row": 2, "error": "missing 'delivery_boy_name'"}
+    assert report['errors'][1]['error'].startswith("invalid JSON")
+    assert store.reference('transactionList').get() is None
+
+    assert run_import(data, "ndjson")['written'] == 1
+
+
+def test_format_detection():
+    assert bulk_import.detect_format(None, "application/x-ndjson") == "ndjson"
+    assert bulk_import.detect_format("jsonl", "text/csv") == "ndjson"
+    assert bulk_import.detect_format(None, None) == "csv"
+
+
+def test_ndjson_lines_are_never_joined_on_escaped_quotes(store):
+    rows = [
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 1,
+         "extra_details": 'said "call first'},
+        {"customer_name": "Harsh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 2},
+        {"customer_name": "Sweta Sharma", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 3},
+    ]
+    report = run_import("\n".join(json.dumps(row) for row in rows) + "\n", "ndjson", dry_run=True)
+    assert (report['rows'], report['written'], report['failed']) == (3, 0, 0)
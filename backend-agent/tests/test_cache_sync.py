@@ -0,0 +1,180 @@
+import threading
+
+import pytest
+
+import cache_sync
+import entity_index
+
+
+@pytest.fixture(autouse=True)
+def forget_test_caches():
+    yield
+    for path in [path for path in cache_sync.SYNCED_CACHES if path.startswith('test/')]:
+        del cache_sync.SYNCED_CACHES[path]
+
+
+class Bucket:
+    """Stands in for a cache module (customer.py etc.): a replaceable cache plus its index"""
+
+    def __init__(self, path):
+        self.cache = {}
+        self.index = entity_index.EntityIndex('fullName')
+        self.refreshes = 0
+        self.synced = cache_sync.SyncedCache(path, lambda: self.cache, self.set_cache, self.index, self.refresh)
+
+    def set_cache(self, snapshot):
+        self.cache = snapshot
+        self.index.build(snapshot)
+
+    def refresh(self):
+        self.refreshes += 1
+
+
+def record(name, user_id):
+    return {'data': {'fullName': name, 'userId': user_id}}
+
+
+class DelayedSource(cache_sync.LocalEventSource):
+    """Like firebase_admin: listen() returns at once, the snapshot follows on another thread"""
+
+    def __init__(self, data=None, delay=0.1):
+        super().__init__(data)
+        self.delay = delay
+
+    def listen(self, callback):
+        self._callbacks.append(callback)
+        threading.Timer(self.delay, callback, [cache_sync.SyncEvent('put', '/', self.data)]).start()
+        return cache_sync._LocalRegistration(self, callback)
+
+
+def started(path, data):
+    bucket = Bucket(path)
+    source = cache_sync.LocalEventSource(data)
+    bucket.synced.start(source)
+    return bucket, source
+
+
+def names(bucket, query):
+    return [hit['fullName'] for hit in bucket.index.search(query)]
+
+
+def test_initial_put_loads_snapshot():
+    bucket, _ = started('test/initial', {'a': record('Rakesh Gupta', 'a')})
+
+    assert bucket.synced.live
+    assert bucket.cache == {'a': record('Rakesh Gupta', 'a')}
+    assert names(bucket, 'rakesh') == ['Rakesh Gupta']
+    assert bucket.synced.status()['events'] == 1
+
+
+def test_put_adds_and_updates_records():
+    bucket, source = started('test/put', {'a': record('Rakesh Gupta', 'a')})
+
+    source.emit('put', '/b', record('Ramesh Kumar', 'b'))
+    source.emit('put', '/a/data/fullName', 'Rakesh Sharma')
+
+    assert bucket.cache['b'] == record('Ramesh Kumar', 'b')
+    assert bucket.cache['a']['data'] == {'fullName': 'Rakesh Sharma', 'userId': 'a'}
+    assert names(bucket, 'ra') == ['Rakesh Sharma', 'Ramesh Kumar']
+    assert names(bucket, 'gupta') == []
+    assert names(bucket, 'sharma') == ['Rakesh Sharma']
+
+
+def test_patch_merges_children():
+    bucket, source = started('test/patch', {'a': record('Rakesh Gupta', 'a')})
+
+    source.emit('patch', '/', {'b': record('Sweta Sharma', 'b'), 'c': record('Harsh Gupta', 'c')})
+
+    assert list(bucket.cache) == ['a', 'b', 'c']
+    assert names(bucket, 'gupta') == ['Rakesh Gupta', 'Harsh Gupta']
+
+
+def test_multi_path_patch_updates_nested_fields():
+    bucket, source = started('test/multipath', {
+        'a': record('Rakesh Gupta', 'a'),
+        'b': record('Sweta Sharma', 'b'),
+    })
+
+    source.emit('patch', '/', {'a/data/fullName': 'Rakesh Verma', 'b/data/phoneNumber': '12345'})
+
+    assert bucket.cache['a']['data']['fullName'] == 'Rakesh Verma'
+    assert bucket.cache['b']['data'] == {'fullName': 'Sweta Sharma', 'userId': 'b', 'phoneNumber': '12345'}
+    assert names(bucket, 'verma') == ['Rakesh Verma']
+    assert names(bucket, 'gupta') == []
+
+
+def test_delete_removes_record_from_cache_and_index():
+    bucket, source = started('test/delete', {'a': record('Rakesh Gupta', 'a'), 'b': record('Ramesh Kumar', 'b')})
+
+    source.emit('put', '/a', None)
+    source.emit('patch', '/', {'b': None})
+
+    assert bucket.cache == {}
+    assert names(bucket, 'r') == []
+    assert bucket.index.top_k('Rakesh') == []
+    assert len(bucket.index) == 0
+
+
+def test_whole_node_overwrite_replaces_everything():
+    bucket, source = started('test/overwrite', {'a': record('Rakesh Gupta', 'a')})
+    version = bucket.synced.status()['version']
+
+    source.emit('put', '/', {'z': record('Zubin Das', 'z')})
+
+    assert bucket.cache == {'z': record('Zubin Das', 'z')}
+    assert names(bucket, 'rakesh') == []
+    assert names(bucket, 'zubin') == ['Zubin Das']
+    assert bucket.synced.status()['version'] > version
+
+    source.emit('put', '/', None)
+    assert bucket.cache == {}
+    assert names(bucket, 'zubin') == []
+
+
+def test_live_cache_skips_refresh_on_miss():
+    bucket, source = started('test/live', {})
+
+    assert bucket.synced.refresh_on_miss() is False
+    assert bucket.refreshes == 0
+
+    bucket.synced.stop()
+    assert bucket.synced.refresh_on_miss() is True
+    assert bucket.refreshes == 1
+
+
+def test_start_survives_a_failing_source():
+    bucket = Bucket('test/failing')
+
+    def broken_reference(path):
+        raise ValueError("The default Firebase app does not exist.")
+
+    cache_sync.start(broken_reference)
+    assert bucket.synced.live is False
+
+
+def test_full_download_never_overwrites_a_live_cache():
+    bucket, source = started('test/load', {'a': record('Rakesh Gupta', 'a')})
+    source.emit('put', '/b', record('Ramesh Kumar', 'b'))
+
+    assert bucket.synced.load({'a': record('Rakesh Gupta', 'a')}) is False
+    assert names(bucket, 'ramesh') == ['Ramesh Kumar']
+
+    bucket.synced.stop()
+    assert bucket.synced.load({'c': record('Zubin Das', 'c')}) is True
+    assert names(bucket, 'zubin') == ['Zubin Das']
+
+
+def test_cache_is_live_only_once_the_snapshot_arrives():
+    bucket = Bucket('test/delayed')
+    bucket.synced.start(DelayedSource({'a': record('Rakesh Gupta', 'a')}))
+
+    # Listening, but still empty: misses must keep refreshing until the snapshot lands
+    assert bucket.synced.live is False
+    assert bucket.synced.refresh_on_miss() is True
+    assert bucket.synced.wait_live(timeout=0.01) is False
+
+    assert bucket.synced.wait_live(timeout=5) is True
+    assert bucket.synced.live
+    assert names(bucket, 'rakesh') == ['Rakesh Gupta']
+    assert bucket.synced.refresh_on_miss() is False
+    bucket.synced.stop()
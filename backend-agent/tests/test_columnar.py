@@ -0,0 +1,118 @@
+import random
+
+import columnar
+import ledger
+import transaction_store
+import transactions
+
+PRODUCTS = [("P0", "LPG 14KG", 900), ("P1", "LPG 19KG", 1500), ("P2", "Oxygen", 400)]
+
+
+def transaction(rng, key):
+    lines = [{"productData": {"productId": product_id, "name": name, "rate": rate},
+              "sentUnits": rng.randint(0, 5), "recievedUnits": rng.randint(0, 3)}
+             for product_id, name, rate in rng.sample(PRODUCTS, rng.randint(1, 2))]
+    boy = f"D{rng.randrange(3)}"
+    return {"data": {
+        "transactionId": key,
+        "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+        "customer": {"userId": f"C{rng.randrange(10)}", "fullName": "Someone"},
+        "deliveryBoyList": [{"userId": boy, "fullName": boy, "deliveryDone": [
+            {"productId": line['productData']['productId']} for line in lines]}],
+        "selectedProducts": lines,
+        "total": sum(line['sentUnits'] * line['productData']['rate'] for line in lines),
+        "payment": rng.choice([0, 500, "1200"])
+    }}
+
+
+def loop(cache, metric, group_by, filters, date_from, date_to):
+    """The per-object approach the snapshot replaces"""
+    totals = {}
+    for record in cache.values():
+        data = record['data']
+        day = transaction_store.day_key(data['date'])
+        if date_from and day < date_from or date_to and day > date_to:
+            continue
+        if filters.get('customer') not in (None, data['customer']['userId']):
+            continue
+        boy = data['deliveryBoyList'][0]['userId']
+        if filters.get('deliveryPerson') not in (None, boy):
+            continue
+        keys = {'customer': data['customer']['userId'], 'deliveryPerson': boy, 'month': day // 100, None: None}
+        if metric in columnar.LINE_METRICS:
+            for line in data['selectedProducts']:
+                product_id = line['productData']['productId']
+                if filters.get('product') not in (None, product_id):
+                    continue
+                sent, received = line['sentUnits'], line['recievedUnits']
+                value = {'sent': sent, 'received': received, 'pending': sent - received,
+                         'billed': sent * line['productData']['rate']}[metric]
+                key = product_id if group_by == 'product' else keys[group_by]
+                totals[key] = totals.get(key, 0) + value
+        else:
+            total, payment = data['total'], ledger.to_int(data['payment'])
+            value = {'transactions': 1, 'total': total, 'payment': payment, 'due': total - payment}[metric]
+            totals[keys[group_by]] = totals.get(keys[group_by], 0) + value
+    return totals
+
+
+def test_vectorized_aggregations_match_a_loop(store):
+    rng = random.Random(4)
+    cache = {f"T{i}": transaction(rng, f"T{i}") for i in range(400)}
+    transaction_store.set_transaction_cache(cache)
+    for _ in range(200):
+        key = f"T{rng.randrange(500)}"
+        if rng.random() < 0.3 and key in cache:
+            del cache[key]
+            transaction_store.TRANSACTION_VIEWS.remove(key)
+        else:
+            cache[key] = transaction(rng, key)
+            transaction_store.TRANSACTION_VIEWS.upsert(key, cache[key])
+
+    for _ in range(60):
+        metric = rng.choice(columnar.METRICS)
+        group_by = rng.choice([None, 'customer', 'deliveryPerson', 'month'] +
+                              (['product'] if metric in columnar.LINE_METRICS else []))
+        filters = {'customer': rng.choice([None, "C3"]), 'deliveryPerson': rng.choice([None, "D1"])}
+        if metric in columnar.LINE_METRICS:
+            filters['product'] = rng.choice([None, "P0"])
+        date_from, date_to = rng.choice([(None, None), (20250701, 20250930)])
+
+        rows = columnar.SNAPSHOT.aggregate(metric, group_by, filters, date_from, date_to)
+        expected = loop(cache, metric, group_by, filters, date_from, date_to)
+        if group_by is None:
+            assert rows[0]['value'] == expected.get(None, 0)
+        else:
+            assert {row['key']: row['value'] for row in rows} == expected
+
+
+def test_filters_and_thresholds(store):
+    rng = random.Random(2)
+    transaction_store.set_transaction_cache({f"T{i}": transaction(rng, f"T{i}") for i in range(100)})
+
+    due = columnar.SNAPSHOT.aggregate('due', 'customer', min_value=5000)
+    assert due and all(row['value'] > 5000 for row in due)
+    assert [row['value'] for row in due] == sorted((row['value'] for row in due), reverse=True)
+    assert columnar.SNAPSHOT.aggregate('sent', filters={'customer': "nobody"}) == []
+    for bad in ({'metric': 'nope'}, {'metric': 'due', 'group_by': 'product'}, {'metric': 'sent', 'group_by': 'week'}):
+        try:
+            columnar.SNAPSHOT.aggregate(**bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_tool_resolves_names(store):
+    transactions.execute_batch_write([
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG", "sent_units": 4},
+        {"customer_name": "Harsh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG", "sent_units": 2},
+        {"customer_name": "Harsh Gupta", "delivery_boy_name": "Animesh Yadav", "product_name": "LPG 14KG", "sent_units": 7},
+    ])
+
+    reply = columnar.execute_query_sales("sent", product_name="LPG 14KG", delivery_boy_name="Sweta Singh")
+    assert reply['objectArray'][0]['value'] == 6
+    assert "LPG 14KG, Sweta Singh" in reply['response']
+
+    reply = columnar.execute_query_sales("sent", group_by="customer")
+    assert [(row['name'], row['value']) for row in reply['objectArray']] == [("Harsh Gupta", 9), ("Rakesh Gupta", 4)]
+    assert 'warning' in columnar.execute_query_sales("due", group_by="product")
@@ -0,0 +1,73 @@
+import random
+import string
+
+from entity_index import EntityIndex
+
+
+def linear_scan(cache, field, search_name):
+    """The find_*_by_name loop the index replaced"""
+    search_lower = search_name.lower()
+    search_response = []
+    for record in cache.values():
+        record_data = record.get('data', {})
+        name = record_data.get(field, '')
+        if name and search_lower in name.lower():
+            search_response.append(record_data)
+    return search_response
+
+
+def make_cache(size, seed=7):
+    rng = random.Random(seed)
+    first = ['Ramesh', 'Rameshwar', 'Rakesh', 'Sweta', 'Harsh', 'Animesh', 'Priya', 'Amit']
+    last = ['Kumar', 'Gupta', 'Sharma', 'Verma', 'Singh']
+    cache = {}
+    for i in range(size):
+        name = f"{rng.choice(first)} {rng.choice(last)} {''.join(rng.choices(string.ascii_letters, k=3))}"
+        cache[f"U{i}"] = {'data': {'fullName': name, 'userId': f"U{i}"}}
+    cache['NO_NAME'] = {'data': {'userId': 'NO_NAME'}}
+    cache['NO_DATA'] = {'others': {}}
+    return cache
+
+
+def test_search_matches_linear_scan():
+    cache = make_cache(2000)
+    index = EntityIndex('fullName')
+    index.build(cache)
+
+    queries = ['r', 'R', 'sh', 'Ra', 'ram', 'RAMESH', 'Rakesh Gupta', 'esh K', 'zzzz', 'q', ' ', 'a s']
+    queries += [cache[f"U{i}"]['data']['fullName'] for i in range(0, 2000, 97)]
+    for query in queries:
+        assert index.search(query) == linear_scan(cache, 'fullName', query), query
+
+
+def test_search_matches_linear_scan_after_incremental_updates():
+    cache = make_cache(300)
+    index = EntityIndex('fullName')
+    index.build(cache)
+
+    rng = random.Random(3)
+    for i in range(200):
+        key = f"U{rng.randrange(400)}"
+        if rng.random() < 0.3:
+            cache.pop(key, None)
+            index.remove(key)
+        else:
+            cache[key] = {'data': {'fullName': rng.choice(['Oxygen', 'LPG 14KG', 'Rakesh', 'Ra']) + str(i)}}
+            index.upsert(key, cache[key])
+
+    for query in ['r', 'ra', 'rak', 'rakesh', 'lpg 14', '1', 'oxygen1', 'x']:
+        assert index.search(query) == linear_scan(cache, 'fullName', query), query
+
+
+def test_prefix_returns_names_starting_with_query_in_cache_order():
+    cache = {
+        'a': {'data': {'name': 'LPG 19KG'}},
+        'b': {'data': {'name': 'Oxygen'}},
+        'c': {'data': {'name': 'lpg 14KG'}},
+    }
+    index = EntityIndex('name')
+    index.build(cache)
+
+    assert index.prefix('LPG') == [cache['a']['data'], cache['c']['data']]
+    assert index.prefix('lpg 1') == [cache['a']['data'], cache['c']['data']]
+    assert index.prefix('xyz') == []
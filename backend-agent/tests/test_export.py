@@ -0,0 +1,93 @@
+import asyncio
+import csv
+import io
+import re
+import zipfile
+
+import export
+import transaction_store
+import transactions
+
+
+def entry(key, date, customer_id, address, lines, payment, tags=()):
+    return {"data": {
+        "transactionId": key, "date": date, "customer": {"userId": customer_id, "fullName": f"Name {customer_id}"},
+        "shippingAddress": address, "deliveryBoyList": [{"userId": "D0", "fullName": "Sweta Singh"}],
+        "selectedProducts": [{"productData": {"productId": product_id, "name": product_id, "rate": 100,
+                                              "productReturnable": returnable},
+                              "sentUnits": sent, "recievedUnits": received} for product_id, sent, received, returnable in lines],
+        "total": sum(100 * sent for _, sent, _, _ in lines), "payment": payment, "status": "Pending",
+        "extraDetails": "", "tags": list(tags)
+    }}
+
+
+def seed():
+    transaction_store.set_transaction_cache({
+        "a": entry("a", "02/01/2025", "X1", "Main Road", [("LPG", 3, 1, True), ("Oxygen", 2, 0, False)], 300, ["T1"]),
+        "b": entry("b", "01/01/2025", "X2", "Lake View", [("LPG", 5, 2, True)], 500),
+        "c": entry("c", "10/02/2025", "X1", "Lake View", [], 200, ["T1"]),
+    })
+
+
+def read_csv(body):
+    return list(csv.reader(io.StringIO(b''.join(body).decode('utf-8-sig'))))
+
+
+def sheet_rows(workbook, number):
+    xml = workbook.read(f'xl/worksheets/sheet{number}.xml').decode('utf-8')
+    return [re.findall(r'<(?:v|t xml:space="preserve")>([^<]*)<', row) for row in re.findall(r'<row>(.*?)</row>', xml)]
+
+
+def test_csv_matches_the_frontend_layout(store):
+    seed()
+    _, name, body = export.export_stream('csv')
+    rows = read_csv(body)
+
+    assert name.endswith('.csv') and rows[0] == export.FULL_COLUMNS
+    assert rows[1][:5] == ["01 January 2025", "Name X2", "Lake View", "Sweta Singh", "LPG"]
+    # second product of an entry: no date/customer, no money columns
+    assert rows[3][0] == "" and rows[3][4:10] == ["Oxygen", "2", "0", "0", "100", ""]
+    assert rows[-2] == [] and rows[-1][4:12] == ["Total", "8", "3", "5", "", "1000", "1000", "0"]
+
+
+def test_filters_use_the_index(store):
+    seed()
+    rows = read_csv(export.export_stream('csv', tag="T1", date_from="2025-02-01")[2])
+    assert [row[0] for row in rows[1:-2]] == ["10 February 2025"]
+    rows = read_csv(export.export_stream('csv', customer_id="X2")[2])
+    assert len(rows) == 4
+
+
+def test_xlsx_has_a_sheet_per_customer(store):
+    seed()
+    _, name, body = export.export_stream('xlsx', per_sheet='customer')
+    workbook = zipfile.ZipFile(io.BytesIO(b''.join(body)))
+
+    assert workbook.testzip() is None
+    assert re.findall(r'<sheet name="([^"]+)"', workbook.read('xl/workbook.xml').decode()) == ["Full Data", "Name X1", "Name X2"]
+    assert [row[4] for row in sheet_rows(workbook, 2)[1:3]] == ["LPG", "Oxygen"]
+    assert sheet_rows(workbook, 3)[-1][4:6] == ["Total", "5"]
+
+
+def test_pending_sheet_comes_from_the_ledger(store):
+    transactions.execute_batch_write([
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG", "sent_units": 5, "received_units": 1},
+        {"customer_name": "Harsh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 2},
+    ])
+    rows = read_csv(export.export_stream('csv', layout='pending')[2])
+    assert rows == [["Customer Name", "Total Pending", "LPG 14KG", "Oxygen"],
+                    ["Rakesh Gupta", "4", "4", ""], ["Harsh Gupta", "2", "", "2"], [], ["Total", "6", "4", "2"]]
+
+
+def test_bad_parameters_are_reported(store):
+    import main
+
+    seed()
+    reply = asyncio.run(main.export_endpoint(format="csv", perSheet="customer"))
+    assert "INVALID EXPORT" in reply['warning']['text']
+    for bad in ({'layout': 'nope'}, {'data_format': 'pdf'}, {'per_sheet': 'week'}):
+        try:
+            export.export_stream(**bad)
+            assert False, bad
+        except ValueError:
+            pass
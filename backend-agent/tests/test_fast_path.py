@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import fast_path
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    fast_path.reset_stats()
+    yield
+    fast_path.reset_stats()
+
+
+def test_routine_message_becomes_process_transaction_args(store):
+    calls = fast_path.parse("Sweta delivered 5 LPG 14KG to Rakesh, got 3 back, paid 2000")
+
+    assert calls == [("process_transaction", {
+        "customer_name": "Rakesh Gupta",
+        "delivery_boy_name": "Sweta Singh",
+        "product_name": "LPG 14KG",
+        "sent_units": 5,
+        "received_units": 3,
+        "payment_amount": 2000
+    })]
+
+
+def test_variants_and_multi_line_summaries(store):
+    calls = fast_path.parse(
+        "delivered 2 cylinders of oxygen to Harsh Gupta by Animesh\n"
+        "Sweta Singh gave 1 LPG 19KG to Sweta Sharma and collected rs 1500"
+    )
+
+    assert [args["customer_name"] for _, args in calls] == ["Harsh Gupta", "Sweta Sharma"]
+    assert calls[0][1]["product_name"] == "Oxygen" and calls[0][1]["delivery_boy_name"] == "Animesh Yadav"
+    assert calls[1][1]["payment_amount"] == 1500 and calls[1][1]["received_units"] == 0
+
+
+@pytest.mark.parametrize("message", [
+    "Sweta delivered 5 LPG to Rakesh",                      # 'LPG' matches two products
+    "Sweta delivered 5 LPG 14KG to Ra",                     # 'Ra' matches several customers
+    "Sweta delivered 5 LPG 14KG to Rakesh, call me later",  # a clause we do not understand
+    "Sweta delivered 5 LPG 14KG to Nobody",
+    "show me customer Rakesh",
+    "Sweta delivered 5 LPG 14KG to Rakesh\nwhat is the stock?",
+    "Sweta delivered 5 LPG 14KG to Rakesh, received 3",     # 3 empties or ₹3?
+    "Sweta delivered 5 LPG 14KG to Rakesh, collected 2",
+])
+def test_unsure_messages_fall_back_to_the_model(store, message):
+    assert fast_path.parse(message) is None
+
+
+def test_stats_track_hit_rate_and_latency_saved(store):
+    fast_path.record_model_latency(2.0)
+    fast_path.parse("Sweta delivered 5 LPG 14KG to Rakesh")
+    fast_path.parse("Sweta delivered 5 LPG to Rakesh")
+    fast_path.parse("hello")
+
+    stats = fast_path.stats()
+    assert (stats["attempts"], stats["hits"], stats["rejected"], stats["misses"]) == (3, 1, 1, 1)
+    assert stats["hitRate"] == 0.333
+    assert stats["latencySavedMs"] == 2000
+
+
+def test_chat_skips_the_model_on_a_fast_path_hit(store, monkeypatch):
+    import main
+    import model_client
+
+    def no_model():
+        raise AssertionError("model must not be called")
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=no_model))
+
+    async def message():
+        return {"message": "Sweta delivered 2 Oxygen to Rakesh Gupta, paid 800"}
+
+    reply = asyncio.run(main.chat_endpoint(SimpleNamespace(json=message, headers={})))
+
+    assert reply['entry_status'] == "SUCCESS"
+    assert reply['context']['data']['payment'] == 800
+    assert len(store.reference('transactionList').get()) == 1
+
+
+@pytest.mark.parametrize("clause, payment", [
+    ("paid 2000", 2000), ("payment of rs 900", 900), ("received rs. 1500", 1500), ("collected ₹800", 800),
+    ("received 1200 rupees", 1200), ("collected 450/-", 450),
+])
+def test_collected_or_received_is_a_payment_only_with_a_currency(store, clause, payment):
+    calls = fast_path.parse(f"Sweta delivered 5 LPG 14KG to Rakesh, {clause}")
+    assert calls[0][1]["payment_amount"] == payment and calls[0][1]["received_units"] == 0
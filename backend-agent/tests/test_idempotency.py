@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import idempotency
+import offload
+
+
+def test_duplicates_get_the_first_reply_without_running_again():
+    cache = idempotency.IdempotencyCache()
+    runs = []
+
+    async def handler():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "Logged"}
+
+    async def submit_three():
+        # Two arrive while the first is still running, one after it finished
+        replies = await asyncio.gather(*(idempotency.run_once("k1", handler, cache) for _ in range(2)))
+        return replies + [await idempotency.run_once("k1", handler, cache)]
+
+    replies = asyncio.run(submit_three())
+
+    assert len(runs) == 1
+    assert replies[0] == {"response": "Logged"}
+    assert replies[1] == replies[2] == {"response": "Logged", "replayed": True}
+    assert cache.stats()['duplicates'] == 2
+
+
+def test_a_failure_before_writing_releases_the_key():
+    cache = idempotency.IdempotencyCache()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            idempotency.retryable()
+            return {"warning": {"text": "SYSTEM BUSY"}}
+        idempotency.writing()
+        return {"response": "Logged"}
+
+    assert asyncio.run(idempotency.run_once("k", flaky, cache))['warning']
+    assert asyncio.run(idempotency.run_once("k", flaky, cache)) == {"response": "Logged"}
+    assert asyncio.run(idempotency.run_once("k", flaky, cache))['replayed'] is True
+    assert len(attempts) == 2
+
+
+def test_a_failure_after_writing_is_never_run_again():
+    cache = idempotency.IdempotencyCache()
+
+    async def write_then_fail():
+        idempotency.writing()
+        raise RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(idempotency.run_once("k", write_then_fail, cache))
+    assert "failed part-way" in asyncio.run(idempotency.run_once("k", write_then_fail, cache))['warning']['text']
+
+
+def test_keys_are_bounded_and_expire():
+    now = [0.0]
+    cache = idempotency.IdempotencyCache(max_keys=2, ttl=10, clock=lambda: now[0])
+
+    async def handler():
+        return {"response": "ok"}
+
+    for key in ("a", "b", "c"):
+        asyncio.run(idempotency.run_once(key, handler, cache))
+    assert len(cache) == 2 and cache.stats()['evicted'] == 1
+
+    now[0] = 11
+    assert asyncio.run(idempotency.run_once("b", handler, cache)) == {"response": "ok"}
+    assert len(cache) == 1
+
+
+def test_key_comes_from_the_header_or_the_body():
+    assert idempotency.key_of({"idempotency-key": "h"}, {"idempotencyKey": "b"}) == "h"
+    assert idempotency.key_of({}, {"idempotencyKey": "b"}) == "b"
+    assert idempotency.key_of({}, {"message": "hi"}) is None
+    assert len(idempotency.key_of({"idempotency-key": "x" * 500})) == idempotency.MAX_KEY_LENGTH
+
+
+def test_retried_chat_message_is_written_once(store, monkeypatch):
+    import main
+    import model_client
+
+    call = SimpleNamespace(function_call=SimpleNamespace(name="process_transaction", args={
+        "customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG",
+        "sent_units": 2
+    }))
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[call]))], text="")
+    sent = []
+
+    def send_message(message):
+        sent.append(message)
+        if len(sent) == 1:
+            raise offload.DependencyTimeout("model call timed out after 60s")
+        return response
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=lambda: SimpleNamespace(send_message=send_message)))
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+
+    async def message():
+        return {"message": "gave 2 big ones to rakesh, sweta went", "idempotencyKey": "retry-1"}
+
+    def chat():
+        return asyncio.run(main.chat_endpoint(SimpleNamespace(json=message, headers={})))
+
+    assert "SYSTEM BUSY" in chat()['warning']['text']     # timed out before writing: the retry runs
+    first = chat()
+    assert first['entry_status'] == "SUCCESS"
+    again = chat()
+    assert again['replayed'] is True and again['context'] == first['context']
+
+    assert len(sent) == 2
+    assert len(store.reference('transactionList').get()) == 1
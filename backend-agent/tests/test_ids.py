@@ -0,0 +1,69 @@
+import datetime
+import threading
+
+import ids
+import transaction_store
+import transactions
+
+
+class Clock:
+    def __init__(self, *times):
+        self.times = list(times)
+
+    def __call__(self):
+        return self.times.pop(0) if len(self.times) > 1 else self.times[0]
+
+
+NOON = datetime.datetime(2025, 7, 1, 12, 0, 0, 500000)
+
+
+def test_ids_keep_the_frontend_format_and_sort_in_creation_order():
+    generator = ids.IdGenerator(node=37, clock=Clock(NOON))
+    issued = [generator.next() for _ in range(100)]
+
+    assert issued[0] == "20250701_120000_11000"
+    assert issued[99] == "20250701_120000_1102R"
+    assert all(len(part) == length for part, length in zip(issued[0].split('_'), (8, 6, 5)))
+    assert sorted(issued) == issued
+    assert len(set(issued)) == 100
+
+
+def test_clock_going_back_never_reuses_or_reorders_ids():
+    later = NOON + datetime.timedelta(seconds=5)
+    generator = ids.IdGenerator(node=0, clock=Clock(later, NOON, NOON, later + datetime.timedelta(seconds=1)))
+    issued = [generator.next() for _ in range(4)]
+
+    assert issued[:3] == ["20250701_120005_00000", "20250701_120005_00001", "20250701_120005_00002"]
+    assert issued[3] == "20250701_120006_00000"
+    assert generator.stats()['borrowed'] == 2
+
+
+def test_a_full_second_spills_into_the_next_one():
+    generator = ids.IdGenerator(node=0, clock=Clock(NOON))
+    issued = [generator.next() for _ in range(ids.MAX_SEQUENCE + 1)]
+
+    assert issued[-2] == "20250701_120000_00ZZZ"
+    assert issued[-1] == "20250701_120001_00000"
+    assert sorted(issued) == issued
+
+
+def test_concurrent_callers_get_unique_ids():
+    generator = ids.IdGenerator(node=5)
+    issued = []
+    threads = [threading.Thread(target=lambda: issued.extend(generator.next() for _ in range(2000))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(issued)) == len(issued) == 16000
+
+
+def test_new_transaction_id_skips_ids_already_stored(store, monkeypatch):
+    generator = ids.IdGenerator(node=0, clock=Clock(NOON))
+    monkeypatch.setattr(ids, "TRANSACTION_IDS", generator)
+    transaction_store.set_transaction_cache({"20250701_120000_00000": {"data": {"transactionId": "20250701_120000_00000"}}})
+    used = {"20250701_120000_00001"}
+
+    assert transactions.new_transaction_id(used) == "20250701_120000_00002"
+    assert "20250701_120000_00002" in used
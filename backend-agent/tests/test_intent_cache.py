@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+import customer
+import intent_cache
+
+
+def reply(name):
+    return {"response": f"1 Customers found: {name}"}
+
+
+def test_hit_after_normalization(store):
+    cache = intent_cache.IntentCache(max_size=10, ttl=60)
+    version = intent_cache.version_of("get_customer_details")
+    cache.put("Show me customer Rakesh?", "get_customer_details", version, reply("Rakesh"))
+
+    assert cache.get("  show me  CUSTOMER rakesh ") == reply("Rakesh")
+    assert cache.get("show me customer Ramesh") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entry_is_dropped_when_its_index_changes(store):
+    cache = intent_cache.IntentCache(max_size=10, ttl=60)
+    cache.put("details of LPG 14KG", "get_product_details", intent_cache.version_of("get_product_details"), reply("x"))
+    cache.put("show customer Rakesh", "get_customer_details", intent_cache.version_of("get_customer_details"), reply("y"))
+
+    customer.CUSTOMER_INDEX.upsert("C9", {"data": {"fullName": "Rakesh Verma", "userId": "C9"}})
+
+    assert cache.get("show customer Rakesh") is None
+    assert cache.get("details of LPG 14KG") == reply("x")   # product index did not change
+    assert cache.invalidated == 1
+
+
+def test_ttl_and_lru(store, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(intent_cache.time, 'monotonic', lambda: now[0])
+    cache = intent_cache.IntentCache(max_size=2, ttl=10)
+    version = intent_cache.version_of("get_customer_details")
+
+    cache.put("a", "get_customer_details", version, reply("a"))
+    cache.put("b", "get_customer_details", version, reply("b"))
+    cache.get("a")                                      # 'b' is now least recently used
+    cache.put("c", "get_customer_details", version, reply("c"))
+    assert cache.get("b") is None and cache.evicted == 1
+
+    now[0] += 11
+    assert cache.get("a") is None and cache.expired == 1
+
+
+def test_writes_are_never_cached(store):
+    cache = intent_cache.IntentCache()
+    cache.put("Sweta delivered 2 LPG", "process_transaction", 0, reply("no"))
+    assert cache.get("Sweta delivered 2 LPG") is None
+
+
+def test_repeated_lookup_skips_the_model(store, monkeypatch):
+    import main
+    import model_client
+
+    calls = []
+    part = SimpleNamespace(function_call=SimpleNamespace(name="get_customer_details", args={"customer_name": "Rakesh"}))
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))], text="")
+
+    def send_message(message):
+        calls.append(message)
+        return response
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=lambda: SimpleNamespace(send_message=send_message)))
+    monkeypatch.setattr(intent_cache, 'INTENT_CACHE', intent_cache.IntentCache())
+
+    def chat(text):
+        async def message():
+            return {"message": text}
+        return asyncio.run(main.chat_endpoint(SimpleNamespace(json=message, headers={})))
+
+    first = chat("Show me customer Rakesh")
+    second = chat("show me customer rakesh")
+
+    assert first == second and first['objectArray'][0]['fullName'] == "Rakesh Gupta"
+    assert len(calls) == 1
@@ -0,0 +1,122 @@
+import asyncio
+import random
+
+import cache_sync
+import deposit
+import ledger
+import transaction_store
+import transactions
+
+PRODUCTS = {"P0": ("LPG 14KG", 900, True), "P1": ("LPG 19KG", 1500, True), "P2": ("Oxygen", 400, False)}
+
+
+def product_line(rng, product_id):
+    name, rate, returnable = PRODUCTS[product_id]
+    sent = rng.randint(0, 6)
+    return {"productData": {"productId": product_id, "name": name, "rate": rate, "productReturnable": returnable},
+            "sentUnits": sent, "recievedUnits": rng.randint(0, 4), "paymentAmt": rng.choice([0, 500, "700"])}
+
+
+def transaction(rng, key):
+    lines = [product_line(rng, product_id) for product_id in rng.sample(sorted(PRODUCTS), rng.randint(1, 2))]
+    return {"data": {
+        "transactionId": key,
+        "date": "05/01/2024",
+        "customer": {"userId": f"C{rng.randrange(8)}", "fullName": "Someone"},
+        "selectedProducts": lines,
+        "total": sum(line['sentUnits'] * line['productData']['rate'] for line in lines),
+        "payment": rng.choice([0, 1000, "2500", None])
+    }}
+
+
+def deposits(rng, customer_id, count):
+    return {f"{customer_id}_{i}": {"data": {
+        "transactionId": f"{customer_id}_{i}",
+        "customer": {"userId": customer_id},
+        "paymentAmt": rng.choice([0, 2000]),
+        "returnAmt": rng.choice([0, 0, 1000]),
+        "selectedProducts": [product_line(rng, "P0")]
+    }} for i in range(count)}
+
+
+def test_incremental_updates_match_a_scan(store):
+    rng = random.Random(5)
+    transaction_store.set_transaction_cache({f"T{i}": transaction(rng, f"T{i}") for i in range(300)})
+    cache = transaction_store.TRANSACTION_CACHE
+    deposit.set_deposit_cache({f"C{i}": deposits(rng, f"C{i}", rng.randint(1, 3)) for i in range(5)})
+    assert ledger.verify()["ok"]
+
+    views = transaction_store.TRANSACTION_VIEWS
+    for step in range(400):
+        key = f"T{rng.randrange(400)}"
+        if rng.random() < 0.3 and key in cache:
+            del cache[key]
+            views.remove(key)
+        else:
+            cache[key] = transaction(rng, key)
+            views.upsert(key, cache[key])
+        if step % 50 == 0:
+            customer_id = f"C{rng.randrange(8)}"
+            deposit.DEPOSIT_CACHE[customer_id] = deposits(rng, customer_id, rng.randint(0, 2))
+            deposit.DEPOSIT_VIEWS.upsert(customer_id, deposit.DEPOSIT_CACHE[customer_id])
+
+    result = ledger.verify()
+    assert result["ok"], result["mismatches"]
+    assert ledger.LEDGER.snapshot() == ledger.scan(cache, deposit.DEPOSIT_CACHE)
+
+    before = ledger.LEDGER.snapshot()
+    ledger.rebuild()
+    assert ledger.LEDGER.snapshot() == before
+
+
+def test_chat_writes_update_balances(store):
+    transactions.execute_batch_write([
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG",
+         "sent_units": 5, "received_units": 2, "payment_amount": 1000},
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen",
+         "sent_units": 1, "received_units": 0, "payment_amount": 0},
+    ])
+
+    balance = ledger.LEDGER.balance("C0")
+    assert (balance['transactions'], balance['billed'], balance['paid'], balance['due']) == (2, 4900, 1000, 3900)
+    assert {item['name']: item['pending'] for item in balance['products']} == {"LPG 14KG": 3, "Oxygen": 1}
+    assert balance['cylindersHeld'] == 4     # every seeded product is returnable
+
+    reply = ledger.execute_get_customer_balance("rakesh")
+    assert "holds 4 cylinder(s)" in reply['response'] and "Payment due: 3900" in reply['response']
+    assert ledger.verify()["ok"]
+
+
+def test_listener_deltas_reach_the_ledger(store):
+    rng = random.Random(3)
+    record = transaction(rng, "T1")
+    customer_id = record['data']['customer']['userId']
+    synced = transaction_store.TRANSACTION_SYNC
+    source = cache_sync.LocalEventSource({"T1": record})
+    synced.start(source)
+    try:
+        source.emit('put', '/T1/data/selectedProducts/0/recievedUnits', 99)
+        assert ledger.verify()["ok"]
+        source.emit('put', '/T1', None)
+        assert ledger.LEDGER.balance(customer_id) is None
+    finally:
+        synced.stop()
+
+
+def test_unknown_customer_is_reported(store):
+    assert 'warning' in ledger.execute_get_customer_balance("Nobody Known")
+    assert ledger.execute_get_customer_balance("Sweta Sharma")['balance'] is None
+
+
+def test_ledger_endpoint_reads_balances_on_the_db_pool(store):
+    import main
+    import offload
+
+    transactions.execute_complex_write("Rakesh Gupta", "Sweta Singh", "Oxygen", 2, 0, 300)
+    calls = offload.DB.calls
+
+    everyone = asyncio.run(main.ledger_endpoint())
+    one = asyncio.run(main.ledger_endpoint(customerId="C0"))
+    assert offload.DB.calls - calls == 2
+    assert everyone['objectArray'][0]['customerId'] == "C0" and one['due'] == 500
+    assert 'warning' in asyncio.run(main.ledger_endpoint(customerId="nobody"))
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import model_client
+import warm_start
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lazy_startup_imports_main_without_the_vertex_sdk():
+    env = dict(os.environ, LAZY_STARTUP="1", CACHE_SYNC="0", STORAGE_BACKEND="memory")
+    code = ("import sys, main; "
+            "print(sorted(m for m in ('vertexai', 'firebase_admin') if m in sys.modules)); "
+            "print(main.model_client.ready(), main.warm_start.READY.is_set())")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-2:] == ["[]", "False False"]
+
+
+def test_model_is_built_once_on_first_use(monkeypatch):
+    builds = []
+
+    def slow_build():
+        time.sleep(0.1)
+        builds.append(1)
+        return object()
+
+    monkeypatch.setattr(model_client, "_model", None)
+    monkeypatch.setattr(model_client, "_build", slow_build)
+    assert not model_client.ready()
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(model_client.get_model())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(model) for model in models}) == 1
+    assert model_client.ready()
+
+
+def test_ready_answers_503_until_caches_and_model_are_loaded(monkeypatch):
+    import main
+
+    def ready():
+        response = asyncio.run(main.ready_endpoint())
+        return response.status_code, json.loads(response.body)
+
+    monkeypatch.setattr(warm_start, "READY", threading.Event())
+    monkeypatch.setattr(model_client, "_model", None)
+    status, body = ready()
+    assert status == 503 and body["caches"] is False and body["model"] is False
+    assert asyncio.run(main.health_endpoint())["status"] == "OK"
+
+    warm_start.READY.set()
+    monkeypatch.setattr(model_client, "_model", object())
+    status, body = ready()
+    assert status == 200 and body["ready"] is True
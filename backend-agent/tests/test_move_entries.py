@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+
+import idempotency
+import ledger
+import move_entries
+import transaction_store
+import transactions
+
+
+def log_entries(count, customer_name="Rakesh Gupta"):
+    results = transactions.execute_batch_write([
+        {"customer_name": customer_name, "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG",
+         "sent_units": 2, "payment_amount": 0}
+        for _ in range(count)
+    ])
+    return [result['context']['data']['transactionId'] for result in results]
+
+
+def test_selected_entries_move_in_one_update_with_their_history(store):
+    rakesh = log_entries(3)
+    ramesh = log_entries(1, "Ramesh Kumar")
+    writes = store.writes
+
+    report = move_entries.move_entries("C0", "C3", rakesh[:2] + ramesh + ["missing"], moved_by="A1", move_id="M1")
+
+    assert report['moved'] == 2 and report['chunks'] == 1
+    assert [item['reason'] for item in report['skipped']] == ["belongs to another account", "not found"]
+    assert store.writes == writes + 1
+
+    stored = store.reference('transactionList').get()
+    moved = stored[rakesh[0]]
+    assert moved['data']['customer'] == {"fullName": "Harsh Gupta", "phoneNumber": "", "userId": "C3"}
+    assert moved['others']['movedBy'] == "A1" and moved['others']['moveIds'] == ["M1"]
+    assert moved['others']['createdBy'] == "AI_AGENT"
+    assert moved['data']['selectedProducts'][0]['sentUnits'] == 2
+    assert stored[rakesh[2]]['data']['customer']['userId'] == "C0"
+
+    history = store.reference('moveEntryHistory/M1').get()
+    assert history['fromUserId'] == "C0" and history['toUserId'] == "C3"
+    assert history['transactionIdList'] == rakesh[:2]
+
+    # Indexes and balances follow without a refresh
+    assert {entry['data']['transactionId'] for entry in transaction_store.find_transactions(customer_id="C3")} == set(rakesh[:2])
+    assert ledger.LEDGER.balance("C3")['products'][0]['pending'] == 4
+    assert ledger.LEDGER.balance("C0")['products'][0]['pending'] == 2
+    assert ledger.verify()['ok']
+
+
+def test_a_filtered_move_is_written_in_chunks(store):
+    rakesh = log_entries(5)
+    writes = store.writes
+
+    report = move_entries.move_entries("C0", "C1", chunk_entries=2, move_id="M2")
+
+    assert report['moved'] == 5 and report['chunks'] == 3
+    assert store.writes == writes + 3
+    assert sorted(store.reference('moveEntryHistory/M2').get()['transactionIdList']) == sorted(rakesh)
+    assert transaction_store.find_transactions(customer_id="C0") == []
+
+    preview = move_entries.move_entries("C1", "C0", dry_run=True)
+    assert preview['selected'] == 5 and preview['moved'] == 0
+    assert len(transaction_store.find_transactions(customer_id="C1")) == 5
+
+
+def test_a_failed_chunk_stops_the_move_and_keeps_the_history_accurate(store, monkeypatch):
+    rakesh = log_entries(4)
+    update = store.update
+    calls = []
+
+    def failing_update(path, values):
+        calls.append(path)
+        if len(calls) == 2:
+            raise ConnectionError("network down")
+        return update(path, values)
+
+    monkeypatch.setattr(store, "update", failing_update)
+    report = move_entries.move_entries("C0", "C3", chunk_entries=2, move_id="M3")
+
+    assert report['moved'] == 2 and "network down" in report['warning']['text']
+    history = store.reference('moveEntryHistory/M3').get()
+    assert sorted(history['transactionIdList']) == sorted(rakesh)[:2]
+    assert len(transaction_store.find_transactions(customer_id="C0")) == 2
+
+
+def test_endpoint_moves_once_per_move_id(store, monkeypatch):
+    import main
+
+    rakesh = log_entries(2)
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+
+    def post(body):
+        async def json():
+            return body
+        return asyncio.run(main.move_transactions_endpoint(SimpleNamespace(json=json, headers={})))
+
+    body = {"fromUserId": "C0", "toUserId": "C3", "transactionIdList": rakesh, "movedBy": "A1", "moveId": "M4"}
+    first = post(body)
+    assert first['moved'] == 2
+    writes = store.writes
+    assert post(body)['replayed'] is True
+    assert store.writes == writes
+
+    assert "unknown target" in post({**body, "toUserId": "C9", "moveId": "M5"})['warning']['text']
+    assert post({**body, "toUserId": "C1", "moveId": "M5", "transactionIdList": None, "fromUserId": "C3"})['moved'] == 2
+
+
+def test_agent_tool_resolves_both_names(store):
+    log_entries(2, "Ramesh Kumar")
+
+    reply = move_entries.execute_move_entries("ramesh kumar", "Sweta Sharma")
+    assert reply['response'] == "Moved 2 of 2 entries from Ramesh Kumar to Sweta Sharma."
+    assert "INVALID MOVE" in move_entries.execute_move_entries("Sweta Sharma", "Sweta Sharma")['warning']['text']
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import idempotency
+import intent_cache
+import progress
+
+
+def part(text=None, call=None):
+    return SimpleNamespace(text=text, function_call=call)
+
+
+def chunk(*parts):
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=list(parts)))])
+
+
+def stub_model(monkeypatch, chunks):
+    """A model whose chat streams `chunks` (stream=True) or returns them merged into one response"""
+    import model_client
+
+    def send_message(message, stream=False):
+        if stream:
+            return iter(chunks)
+        parts = [item for piece in chunks for item in piece.candidates[0].content.parts]
+        return SimpleNamespace(candidates=chunk(*parts).candidates,
+                               text=''.join(item.text or '' for item in parts if not item.function_call))
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=lambda: SimpleNamespace(send_message=send_message)))
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+    monkeypatch.setattr(intent_cache, 'INTENT_CACHE', intent_cache.IntentCache())
+
+
+def request(message):
+    async def body():
+        return {"message": message}
+    return SimpleNamespace(json=body, headers={})
+
+
+def stream_chat(message):
+    """(event, data) of every SSE frame /chat/stream sends"""
+    import main
+
+    async def collect():
+        response = await main.chat_stream_endpoint(request(message))
+        assert response.media_type == "text/event-stream"
+        return [frame async for frame in response.body_iterator]
+
+    events = []
+    for frame in asyncio.run(collect()):
+        event, data = frame.strip().split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_model_text_streams_as_tokens_then_the_reply(store, monkeypatch):
+    import main
+
+    stub_model(monkeypatch, [chunk(part("You have ")), chunk(part("4 customers")), chunk(part("."))])
+
+    events = stream_chat("how many customers do I have?")
+    assert [event for event, _ in events] == ["token", "token", "token", "reply"]
+    assert "".join(data['text'] for event, data in events if event == "token") == "You have 4 customers."
+    assert events[-1][1] == asyncio.run(main.chat_endpoint(request("how many customers do I have?")))
+
+
+def test_a_write_reports_intent_entities_and_commit_before_the_reply(store, monkeypatch):
+    call = SimpleNamespace(name="process_transaction", args={
+        "customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG", "sent_units": 2
+    })
+    stub_model(monkeypatch, [chunk(part(call=call))])
+
+    events = stream_chat("note that rakesh got a couple of big ones from sweta")
+    assert [event for event, _ in events] == ["intent", "entities", "committed", "reply"]
+    assert events[0][1] == {"functions": ["process_transaction"], "source": "model"}
+    assert events[1][1] == {"customer": "Rakesh Gupta", "deliveryPerson": "Sweta Singh", "product": "LPG 14KG"}
+
+    reply = events[-1][1]
+    assert reply['entry_status'] == "SUCCESS"
+    assert events[2][1]['transactionIds'] == [reply['context']['data']['transactionId']]
+    assert len(store.reference('transactionList').get()) == 1
+
+
+def test_errors_end_the_stream_with_a_warning_reply():
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def collect():
+        return [frame async for frame in progress.stream(failing, lambda e: {"warning": {"text": str(e)}})]
+
+    assert asyncio.run(collect()) == [progress.frame("reply", {"warning": {"text": "boom"}})]
+    progress.emit("token", text="ignored")      # no stream open: nothing happens
@@ -0,0 +1,133 @@
+import json
+import random
+
+import cache_sync
+import records
+
+
+def product_data(product_id, rate=900):
+    return {"productId": product_id, "name": f"LPG {product_id}", "rate": rate, "productReturnable": True}
+
+
+def transaction(key, customer_id="C1", product_id="P0"):
+    return {
+        "data": {
+            "transactionId": key, "date": "05/01/2025",
+            "customer": {"userId": customer_id, "fullName": "Rakesh Gupta", "phoneNumber": "", "address": ["Main Road"]},
+            "deliveryBoyList": [{"userId": "D0", "fullName": "Sweta Singh",
+                                 "deliveryDone": [{"productId": product_id, "sentUnits": 2, "recievedUnits": 1}]}],
+            "selectedProducts": [{"productData": product_data(product_id), "sentUnits": 2, "recievedUnits": 1, "paymentAmt": 0}],
+            "payment": 1800, "total": 1800, "status": "Paid", "importIndex": 0, "extraDetails": "Logged via AI Agent",
+            "tags": ["T1"]
+        },
+        "others": {"createdBy": "AI_AGENT", "createdTime": 1736000000000, "editedBy": "AI_AGENT", "editedTime": 1736000000000}
+    }
+
+
+def random_json(rng, depth=0):
+    choice = rng.randrange(9 if depth < 3 else 6)
+    if choice == 0:
+        return None
+    if choice == 1:
+        return rng.choice([True, False])
+    if choice == 2:
+        return rng.randint(-5, 5)
+    if choice == 3:
+        return rng.choice([0.5, 1.0, -2.25])
+    if choice in (4, 5):
+        return rng.choice(["", "a", "LPG 14KG", "x" * 100])
+    if choice in (6, 7):
+        return {rng.choice(["data", "customer", "selectedProducts", "productData", "k", "rate"]): random_json(rng, depth + 1)
+                for _ in range(rng.randint(0, 4))}
+    return [random_json(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+
+
+def exact(value):
+    """JSON text with key order normalized: equal only if every value and type matches"""
+    return json.dumps(value, sort_keys=True)
+
+
+def test_round_trip_is_lossless():
+    assert records.Transaction.from_json(transaction("T1")).to_json() == transaction("T1")
+
+    rng = random.Random(1)
+    for _ in range(2000):
+        value = {"data": random_json(rng), "others": random_json(rng), "extra": random_json(rng)}
+        if rng.random() < 0.5:
+            value["data"] = {"customer": random_json(rng), "selectedProducts": [random_json(rng), {"productData": random_json(rng)}],
+                             "deliveryBoyList": random_json(rng), "total": random_json(rng)}
+        for record_type in (records.Transaction, records.Entity, records.Product):
+            assert exact(records.thaw(record_type.from_json(value))) == exact(value)
+
+
+def test_missing_null_and_bool_are_kept_apart():
+    for data in ({"payment": None}, {}, {"rate": 1}, {"rate": True}, {"rate": 1.0}):
+        line = {"productData": {"productId": "P0", **data}}
+        assert exact(records.ProductLine.from_json(line).to_json()) == exact(line)
+    assert records.PRODUCT_POOL({"productId": "P9", "rate": 1}) is not records.PRODUCT_POOL({"productId": "P9", "rate": True})
+
+
+def test_embedded_copies_are_shared():
+    first = records.Transaction.from_json(transaction("T1"))
+    second = records.Transaction.from_json(transaction("T2"))
+    assert first.data.customer is second.data.customer
+    assert first.data.products[0].product is second.data.products[0].product
+    assert first.data.products[0].product.rate == 900
+    assert records.Transaction.from_json(transaction("T3", customer_id="C2")).data.customer is not first.data.customer
+
+
+def test_pools_forget_versions_no_record_uses():
+    pooled = len(records.PRODUCT_POOL), len(records.CUSTOMER_POOL)
+    cache = records.CompactCache(records.Transaction, {f"T{i}": transaction(f"T{i}", customer_id=f"X{i}") for i in range(50)})
+    assert len(records.CUSTOMER_POOL) == pooled[1] + 50
+
+    cache["T0"] = transaction("T0", customer_id="X1")     # X0's only user now shares X1
+    assert len(records.CUSTOMER_POOL) == pooled[1] + 49
+    del cache
+    assert (len(records.PRODUCT_POOL), len(records.CUSTOMER_POOL)) == pooled
+
+
+def test_compact_cache_hands_out_fresh_json():
+    cache = records.CompactCache(records.Transaction, {"T1": transaction("T1")})
+    entry = cache["T1"]
+    entry["data"]["customer"]["fullName"] = "Changed"
+    assert cache["T1"] == transaction("T1")
+    assert cache.record("T1").data.transaction_id == "T1"
+    assert list(cache) == ["T1"] and len(cache) == 1 and "T1" in cache
+
+
+def test_listener_deltas_reach_a_compact_cache():
+    class View:
+        version = 0
+        updated_at = None
+
+        def build(self, cache):
+            self.seen = dict(cache)
+
+        def upsert(self, key, record):
+            self.seen[key] = record
+
+        def remove(self, key):
+            self.seen.pop(key, None)
+
+    holder = {}
+    view = View()
+
+    def set_cache(snapshot):
+        holder['cache'] = records.CompactCache(records.Transaction, snapshot)
+        view.build(holder['cache'])
+
+    synced = cache_sync.SyncedCache('test/compact', lambda: holder['cache'], set_cache, view, lambda: None)
+    source = cache_sync.LocalEventSource({"T1": transaction("T1")})
+    synced.start(source)
+    try:
+        source.emit('put', '/T1/data/selectedProducts/0/recievedUnits', 2)
+        source.emit('patch', '/T1/data', {"status": "Pending"})
+        stored = holder['cache']["T1"]["data"]
+        assert (stored["selectedProducts"][0]["recievedUnits"], stored["status"]) == (2, "Pending")
+        assert view.seen["T1"]["data"]["status"] == "Pending"
+        source.emit('put', '/T1', None)
+        assert "T1" not in holder['cache'] and "T1" not in view.seen
+    finally:
+        synced.stop()
+        del cache_sync.SYNCED_CACHES['test/compact']
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+import refresh_coordinator
+
+
+@pytest.fixture(autouse=True)
+def forget_test_coordinators():
+    yield
+    for name in [name for name in refresh_coordinator.COORDINATORS if name.startswith('test/')]:
+        del refresh_coordinator.COORDINATORS[name]
+
+
+class SlowFetch:
+    def __init__(self, seconds=0.0):
+        self.seconds = seconds
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self):
+        time.sleep(self.seconds)
+        self.calls += 1
+        self.done.set()
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    fetch = SlowFetch(0.2)
+    coordinator = refresh_coordinator.RefreshCoordinator('test/coalesce', fetch)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(coordinator.refresh())) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetch.calls == 1
+    assert results == [True] * 20
+    assert coordinator.stats()['issued'] == 1
+    assert coordinator.stats()['coalesced'] == 19
+
+
+def test_refreshes_within_min_interval_are_throttled_unless_forced():
+    fetch = SlowFetch()
+    coordinator = refresh_coordinator.RefreshCoordinator('test/throttle', fetch, min_interval=60)
+
+    assert coordinator.refresh() is True
+    assert coordinator.refresh() is False
+    assert fetch.calls == 1
+    assert coordinator.stats()['throttled'] == 1
+
+    assert coordinator.refresh(force=True) is True
+    assert fetch.calls == 2
+
+
+def test_refresh_is_a_no_op_while_live():
+    fetch = SlowFetch()
+    coordinator = refresh_coordinator.RefreshCoordinator('test/live', fetch, is_live=lambda: True)
+
+    assert coordinator.refresh(force=True) is False
+    assert fetch.calls == 0
+    assert coordinator.stats()['skippedLive'] == 1
+
+
+def test_stale_cache_is_revalidated_in_the_background():
+    fetch = SlowFetch()
+    coordinator = refresh_coordinator.RefreshCoordinator('test/stale', fetch, min_interval=0, stale_after=0)
+    coordinator.refresh()
+    fetch.done.clear()
+
+    coordinator.revalidate()
+
+    assert fetch.done.wait(2)
+    assert fetch.calls == 2
+    assert coordinator.stats()['revalidations'] == 1
+
+
+def test_fresh_or_live_cache_is_not_revalidated():
+    fetch = SlowFetch()
+    fresh = refresh_coordinator.RefreshCoordinator('test/fresh', fetch, stale_after=600)
+    fresh.refresh()
+    fresh.revalidate()
+
+    live = refresh_coordinator.RefreshCoordinator('test/live-stale', fetch, is_live=lambda: True, stale_after=0)
+    live.revalidate()
+
+    time.sleep(0.05)
+    assert fetch.calls == 1
+    assert fresh.stats()['revalidations'] == 0
+    assert live.stats()['revalidations'] == 0
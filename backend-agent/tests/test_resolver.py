@@ -0,0 +1,63 @@
+import entity_index
+import resolver
+
+
+class FakeSynced:
+    def __init__(self):
+        self.refreshes = 0
+
+    def refresh_on_miss(self):
+        self.refreshes += 1
+        return True
+
+
+def resolve(names, search_name):
+    index = entity_index.EntityIndex('fullName')
+    index.build({f"U{i}": {'data': {'fullName': name, 'userId': f"U{i}"}} for i, name in enumerate(names)})
+
+    def get_details(name):
+        hits = index.search(name)
+        return {'objectArray': hits, 'action': 'click_to_redirect'} if hits else {'warning': {'text': 'missing'}}
+
+    synced = FakeSynced()
+    data, error = resolver.resolve_entity(search_name, get_details, synced, index.top_k, "Customers found", "customer")
+    return data, error, synced
+
+
+def test_prefix_of_several_names_asks_the_user():
+    data, error, _ = resolve(['Rameshwar', 'Ramesh Kumar', 'Rakesh'], 'Ramesh')
+
+    assert data is None
+    assert error['action'] == 'click_to_redirect'
+    assert [hit['fullName'] for hit in error['objectArray']] == ['Rameshwar', 'Ramesh Kumar']
+
+
+def test_exact_name_among_several_hits_is_resolved():
+    data, error, _ = resolve(['Rameshwar', 'Ramesh', 'Rakesh'], 'Ramesh')
+
+    assert error is None
+    assert data['fullName'] == 'Ramesh'
+
+
+def test_single_hit_is_resolved_without_refresh():
+    data, error, synced = resolve(['Rameshwar', 'Sweta Sharma'], 'sweta')
+
+    assert error is None
+    assert data['fullName'] == 'Sweta Sharma'
+    assert synced.refreshes == 0
+
+
+def test_confident_typo_skips_the_refresh():
+    data, error, synced = resolve(['Rakesh Gupta', 'Sweta Sharma', 'Harsh Gupta'], 'Raakesh')
+
+    assert error is None
+    assert data['fullName'] == 'Rakesh Gupta'
+    assert synced.refreshes == 0
+
+
+def test_unknown_name_refreshes_then_warns():
+    data, error, synced = resolve(['Rakesh Gupta'], 'Zubin')
+
+    assert data is None
+    assert 'warning' in error
+    assert synced.refreshes == 1
@@ -0,0 +1,92 @@
+import random
+
+import rollups
+import transaction_store
+import transactions
+
+PRODUCTS = [("P0", "LPG 14KG", 900), ("P1", "Oxygen", 400)]
+
+
+def transaction(rng, key):
+    lines = [{"productData": {"productId": product_id, "name": name, "rate": rate},
+              "sentUnits": rng.randint(0, 5), "recievedUnits": rng.randint(0, 3)}
+             for product_id, name, rate in rng.sample(PRODUCTS, rng.randint(1, 2))]
+    return {"data": {
+        "transactionId": key,
+        "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.choice([2024, 2025])}",
+        "customer": {"userId": f"C{rng.randrange(6)}", "fullName": "Someone"},
+        "deliveryBoyList": [{"userId": "D0", "deliveryDone": [
+            {"productId": line['productData']['productId'], "sentUnits": line['sentUnits'],
+             "recievedUnits": line['recievedUnits']} for line in lines]}],
+        "selectedProducts": lines,
+        "total": sum(line['sentUnits'] * line['productData']['rate'] for line in lines),
+        "payment": rng.choice([0, 500, "1200"]),
+        "tags": rng.sample(["T0", "T1"], rng.randint(0, 2))
+    }}
+
+
+def scan(cache, dimension, granularity):
+    """The statistics page's approach: one loop over every transaction"""
+    divisor = rollups.GRANULARITIES[granularity]
+    totals = {}
+    for record in cache.values():
+        day, entries, _ = rollups.transaction_contribution(record)
+        for entry_dimension, member, deltas in entries:
+            if entry_dimension != dimension:
+                continue
+            row = totals.setdefault((day // divisor, member), dict.fromkeys(rollups.METRICS, 0))
+            for metric, delta in deltas.items():
+                row[metric] += delta
+    return {key: row for key, row in totals.items() if any(row.values())}
+
+
+def as_dict(rows):
+    return {(row['bucket'], row['member']): {metric: row[metric] for metric in rollups.METRICS} for row in rows}
+
+
+def test_incremental_rollups_match_a_scan(store):
+    rng = random.Random(9)
+    cache = {f"T{i}": transaction(rng, f"T{i}") for i in range(300)}
+    transaction_store.set_transaction_cache(cache)
+
+    views = transaction_store.TRANSACTION_VIEWS
+    for _ in range(300):
+        key = f"T{rng.randrange(400)}"
+        if rng.random() < 0.3 and key in cache:
+            del cache[key]
+            views.remove(key)
+        else:
+            cache[key] = transaction(rng, key)
+            views.upsert(key, cache[key])
+
+    for dimension in rollups.DIMENSIONS:
+        for granularity in rollups.GRANULARITIES:
+            assert as_dict(rollups.ROLLUPS.series(dimension, granularity)) == scan(cache, dimension, granularity)
+
+    monthly = sum(row['sent'] for row in rollups.ROLLUPS.series('all', 'month'))
+    yearly = sum(row['sent'] for row in rollups.ROLLUPS.series('all', 'year'))
+    assert monthly == yearly == sum(row['sent'] for row in rollups.ROLLUPS.series('product', 'day'))
+
+
+def test_date_range_and_top(store):
+    transaction_store.set_transaction_cache({
+        "a": {"data": {"transactionId": "a", "date": "03/01/2025", "customer": {"userId": "C1", "fullName": "A"},
+                       "selectedProducts": [], "total": 100, "payment": 100}},
+        "b": {"data": {"transactionId": "b", "date": "20/02/2025", "customer": {"userId": "C2", "fullName": "B"},
+                       "selectedProducts": [], "total": 300, "payment": 250}},
+        "c": {"data": {"transactionId": "c", "date": "21/02/2025", "customer": {"userId": "C1", "fullName": "A"},
+                       "selectedProducts": [], "total": 200, "payment": 200}},
+    })
+
+    february = rollups.analytics('customer', 'day', date_from="2025-02-01", date_to="28/02/2025")
+    assert [(row['bucket'], row['member']) for row in february['objectArray']] == [(20250220, "C2"), (20250221, "C1")]
+    assert [(row['member'], row['paid']) for row in rollups.analytics('customer', top=5)['objectArray']] == [("C1", 300), ("C2", 250)]
+    assert [row['bucket'] for row in rollups.analytics('all', 'month')['objectArray']] == [202501, 202502]
+
+
+def test_chat_writes_are_rolled_up(store):
+    transactions.execute_batch_write([
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 3},
+    ])
+    (row,) = rollups.ROLLUPS.series('product', 'year')
+    assert (row['member'], row['name'], row['sent'], row['billed']) == ("P2", "Oxygen", 3, 1200)
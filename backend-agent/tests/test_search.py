@@ -0,0 +1,101 @@
+import random
+
+import cache_sync
+import search
+import transaction_store
+import transactions
+
+NAMES = ["Rakesh Gupta", "Ramesh Kumar", "Sweta Sharma", "Harsh Gupta", "Kavita Jain"]
+STREETS = ["Main Road", "Station Road", "Gandhi Nagar", "Civil Lines"]
+NOTES = ["", "gate pass needed", "call before delivery", "Logged via AI Agent", "cash at gate"]
+PRODUCTS = ["LPG 14KG", "LPG 19KG", "Oxygen"]
+
+
+def entry(key, customer_name, street, products, note="", tags=None, delivery_name="Sweta Singh"):
+    return {"data": {
+        "transactionId": key,
+        "date": "01/07/2025",
+        "customer": {"userId": customer_name, "fullName": customer_name, "phoneNumber": "9876543210"},
+        "shippingAddress": street,
+        "deliveryBoyList": [{"userId": delivery_name, "fullName": delivery_name}],
+        "selectedProducts": [{"productData": {"productId": name, "name": name}, "sentUnits": 1, "recievedUnits": 0}
+                             for name in products],
+        "extraDetails": note,
+        "tags": tags or []
+    }}
+
+
+def random_cache(rng, size):
+    return {f"20250701_{i:06d}": entry(f"20250701_{i:06d}", rng.choice(NAMES), rng.choice(STREETS),
+                                       rng.sample(PRODUCTS, rng.randint(1, 2)), rng.choice(NOTES),
+                                       rng.sample(["urgent", "monthly"], rng.randint(0, 1)))
+            for i in range(size)}
+
+
+def scan(cache, query):
+    """The inventory page's approach: stringify every row and match each word"""
+    words = search.tokenize(query)
+    matches = set()
+    for key, record in cache.items():
+        text = set(search.document_terms(record))
+        if all(word in text for word in words[:-1]) and any(term.startswith(words[-1]) for term in text):
+            matches.add(key)
+    return matches
+
+
+def test_search_matches_a_scan_of_every_entry(store):
+    rng = random.Random(7)
+    cache = random_cache(rng, 400)
+    transaction_store.set_transaction_cache(cache)
+
+    for query in ["rakesh", "gupta main", "lpg 19", "gate", "urgent oxygen", "sta", "ram", "sweta sin", "nobody"]:
+        count, hits = search.SEARCH.search(query, limit=search.MAX_SEARCH_LIMIT)
+        expected = scan(cache, query)
+        assert count == len(expected), query
+        assert {key for key, _ in hits} <= expected
+
+
+def test_results_are_ranked_and_paginated(store):
+    transaction_store.set_transaction_cache({
+        "K1": entry("K1", "Main Road Traders", "Station Road", ["Oxygen"]),
+        "K2": entry("K2", "Rakesh Gupta", "Main Road", ["Oxygen"]),
+        "K3": entry("K3", "Rakesh Gupta", "Main Road", ["Oxygen"]),
+        "K4": entry("K4", "Rakesh Gupta", "Civil Lines", ["Oxygen"], note="main gate"),
+    })
+
+    # A customer-name hit outranks an address hit, which outranks a note; newest first on ties
+    count, hits = search.SEARCH.search("main", limit=2)
+    assert count == 4
+    assert [key for key, _ in hits] == ["K1", "K3"]
+    assert [key for key, _ in search.SEARCH.search("main", limit=2, offset=2)[1]] == ["K2", "K4"]
+
+    page = search.search_transactions("main", limit=3)
+    assert page['count'] == 4 and page['nextOffset'] == 3
+    assert page['objectArray'][0]['customer']['fullName'] == "Main Road Traders"
+    assert search.search_transactions("main", limit=3, offset=3)['nextOffset'] is None
+
+
+def test_index_follows_writes_and_deletes(store):
+    transaction_store.set_transaction_cache({"K1": entry("K1", "Rakesh Gupta", "Main Road", ["Oxygen"])})
+    synced = cache_sync.SYNCED_CACHES['transactionList']
+
+    synced.apply_local("K2", entry("K2", "Kavita Jain", "Gandhi Nagar", ["LPG 14KG"], note="gate pass"))
+    assert search.SEARCH.search("kavita gate")[0] == 1
+
+    synced.apply_local("K2", entry("K2", "Kavita Jain", "Gandhi Nagar", ["LPG 14KG"]))
+    assert search.SEARCH.search("kavita gate")[0] == 0
+    assert "gate" not in search.SEARCH._vocabulary
+
+    synced.handle(cache_sync.SyncEvent('put', '/K1', None))
+    assert search.SEARCH.search("rakesh")[0] == 0
+    assert len(search.SEARCH) == 1
+
+
+def test_agent_tool_lists_matches(store):
+    written = transactions.execute_complex_write("Rakesh Gupta", "Sweta Singh", "LPG 14KG", 2, 0, 0)
+    assert written['entry_status'] == "SUCCESS"
+
+    reply = search.execute_search_transactions("rakesh lpg")
+    assert reply['response'].startswith("1 entries match 'rakesh lpg'")
+    assert "LPG 14KG x2" in reply['response']
+    assert search.execute_search_transactions("   ")['warning']['text'].startswith("INVALID QUERY")
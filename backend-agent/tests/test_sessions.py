@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+import idempotency
+import intent_cache
+import sessions
+
+OPTIONS = [{"fullName": "Rakesh Gupta", "userId": "C0"}, {"fullName": "Rakesh Kumar", "userId": "C1"},
+           {"fullName": "Rakesh Sharma", "userId": "C2"}]
+
+
+def test_follow_ups_pick_by_position_or_name():
+    def picked(message):
+        option = sessions.choose(message, OPTIONS)
+        return option and option['userId']
+
+    assert picked("the second one") == "C1"
+    assert picked("2") == "C1"
+    assert picked("2nd please") == "C1"
+    assert picked("last") == "C2"
+    assert picked("the first rakesh gupta") == "C0"
+    assert picked("kumar") == "C1"
+    assert picked("Rakesh Sharma") == "C2"
+
+    assert picked("rakesh") is None                     # still ambiguous
+    assert picked("the second gupta") is None           # position and name disagree
+    assert picked("7") is None
+    assert picked("2 cylinders to ramesh") is None      # a new request, not a pick
+    assert picked("first and second") is None
+
+
+def test_sessions_are_bounded_by_count_memory_and_age():
+    now = [0.0]
+    store = sessions.SessionStore(max_sessions=2, max_bytes=1000, ttl=60, clock=lambda: now[0])
+
+    first = store.get("a")
+    for turn in range(sessions.MAX_TURNS + 3):
+        store.remember(first, f"message {turn}", {"response": "ok"})
+    assert len(first.turns) == sessions.MAX_TURNS
+    assert first.history()[-2:] == [("user", f"message {sessions.MAX_TURNS + 2}"), ("model", "ok")]
+
+    store.get("b")
+    store.get("a")
+    store.get("c")                                      # "b" is least recently used
+    assert store.get("a") is first and len(store) == 2 and store.stats()['evicted'] == 1
+
+    store.remember(store.get("c"), "x" * 600, {"response": "y" * 600})
+    assert store.bytes <= 1000 and store.stats()['evicted'] == 2
+
+    now[0] = 61
+    assert store.get("c") is not None and store.stats()['expired'] == 1
+    assert store.get(None) is None
+
+
+def test_session_id_comes_from_the_header_or_the_body():
+    assert sessions.session_id_of({"x-session-id": "h"}, {"sessionId": "b"}) == "h"
+    assert sessions.session_id_of({}, {"sessionId": "b"}) == "b"
+    assert sessions.session_id_of({}, {"message": "hi"}) is None
+
+
+def test_a_pick_completes_the_interrupted_entry_without_the_model(store, monkeypatch):
+    import main
+    import model_client
+
+    call = SimpleNamespace(function_call=SimpleNamespace(name="process_transaction", args={
+        "customer_name": "Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "LPG 14KG", "sent_units": 3
+    }))
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[call]))], text="")
+    sent = []
+    histories = []
+
+    def start_chat(history=None):
+        histories.append(history)
+        return SimpleNamespace(send_message=lambda message: sent.append(message) or response)
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=start_chat))
+    monkeypatch.setattr(sessions, 'SESSIONS', sessions.SessionStore())
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+    monkeypatch.setattr(intent_cache, 'INTENT_CACHE', intent_cache.IntentCache())
+
+    def chat(message):
+        async def body():
+            return {"message": message, "sessionId": "s1"}
+        return asyncio.run(main.chat_endpoint(SimpleNamespace(json=body, headers={})))
+
+    asked = chat("note down three big ones for gupta, sweta delivered")
+    assert asked['entity'] == "customer" and len(asked['objectArray']) == 2
+    second = asked['objectArray'][1]['fullName']
+
+    logged = chat("the second one")
+    assert logged['entry_status'] == "SUCCESS"
+    assert logged['context']['data']['customer']['fullName'] == second
+    assert logged['context']['data']['selectedProducts'][0]['sentUnits'] == 3
+    assert len(sent) == 1 and sessions.SESSIONS.stats()['followUps'] == 1
+
+    # Anything else is a new message, sent with the earlier turns as history
+    chat("what did I just log?")
+    assert len(sent) == 2 and len(histories[-1]) == 4
+    assert histories[-1][2].role == "user" and histories[-1][2].parts[0].text == "the second one"
+
+
+def test_replies_that_depend_on_earlier_turns_are_not_shared_between_sessions(store, monkeypatch):
+    import main
+    import model_client
+
+    def start_chat(history=None):
+        # "his" is whoever the session asked about first
+        def send_message(message):
+            asked = history[0].parts[0].text if history else message
+            name = asked.removeprefix("show me ")
+            part = SimpleNamespace(function_call=SimpleNamespace(name="get_customer_details", args={"customer_name": name}))
+            return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))], text="")
+        return SimpleNamespace(send_message=send_message)
+
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=start_chat))
+    monkeypatch.setattr(sessions, 'SESSIONS', sessions.SessionStore())
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+    monkeypatch.setattr(intent_cache, 'INTENT_CACHE', intent_cache.IntentCache())
+
+    def chat(session_id, message):
+        async def body():
+            return {"message": message, "sessionId": session_id}
+        return asyncio.run(main.chat_endpoint(SimpleNamespace(json=body, headers={})))
+
+    chat("s1", "show me rakesh gupta")
+    chat("s2", "show me harsh gupta")
+    first = chat("s1", "what about his details?")
+    second = chat("s2", "what about his details?")
+
+    assert first['objectArray'][0]['fullName'] == "Rakesh Gupta"
+    assert second['objectArray'][0]['fullName'] == "Harsh Gupta"
+    assert intent_cache.INTENT_CACHE.stats()["size"] == 2      # only the two context-free first turns
+
+
+def test_picking_a_lookup_option_replies_with_text(store, monkeypatch):
+    import main
+    import model_client
+
+    part = SimpleNamespace(function_call=SimpleNamespace(name="get_customer_details", args={"customer_name": "Gupta"}))
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))], text="")
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=lambda: SimpleNamespace(send_message=lambda message: response)))
+    monkeypatch.setattr(sessions, 'SESSIONS', sessions.SessionStore())
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY', idempotency.IdempotencyCache())
+    monkeypatch.setattr(intent_cache, 'INTENT_CACHE', intent_cache.IntentCache())
+
+    def chat(session_id, message):
+        async def body():
+            return {"message": message, "sessionId": session_id}
+        return asyncio.run(main.chat_endpoint(SimpleNamespace(json=body, headers={})))
+
+    # s2's question is answered from the intent cache, which still knows it was a customer lookup
+    for session_id in ("s1", "s2"):
+        asked = chat(session_id, "show me gupta")
+        second = asked['objectArray'][1]['fullName']
+        picked = chat(session_id, "the second one")
+        assert picked['response'] == f"Showing customer {second}."
+        assert picked['objectArray'][0]['fullName'] == second and picked['action'] == "click_to_redirect"
+    assert intent_cache.INTENT_CACHE.stats()['hits'] == 1
@@ -0,0 +1,83 @@
+import json
+
+import cache_sync
+import entity_index
+import storage
+
+
+def record(name, user_id):
+    return {'data': {'fullName': name, 'userId': user_id}}
+
+
+def test_get_set_update_and_delete():
+    store = storage.MemoryStorage()
+    root = store.reference('transactionList')
+
+    root.child('t1').set({'data': {'total': 100}})
+    root.update({'t2/data/total': 50, 't1/data/total': 120})
+    assert store.reference('transactionList/t1/data/total').get() == 120
+    assert sorted(root.get()) == ['t1', 't2']
+
+    root.child('t2').delete()
+    assert sorted(root.get()) == ['t1']
+    assert store.reference('missing/node').get() is None
+
+
+def test_reads_are_copies():
+    store = storage.MemoryStorage({'productList': {'p1': {'data': {'rate': 900}}}})
+    snapshot = store.reference('productList').get()
+    snapshot['p1']['data']['rate'] = 0
+    assert store.reference('productList/p1/data/rate').get() == 900
+
+
+def test_listener_receives_firebase_shaped_events():
+    store = storage.MemoryStorage({'customer': {'bucket': {'a': record('Rakesh Gupta', 'a')}}})
+    events = []
+    registration = store.reference('customer/bucket').listen(
+        lambda event: events.append((event.event_type, event.path, event.data))
+    )
+
+    store.reference('customer/bucket/b').set(record('Ramesh Kumar', 'b'))
+    store.reference('customer/bucket').update({'a/data/fullName': 'Rakesh Sharma'})
+    store.reference('productList/p1').set({'data': {'name': 'LPG'}})  # elsewhere, not delivered
+    registration.close()
+    store.reference('customer/bucket/c').set(record('Sweta', 'c'))
+
+    assert events == [
+        ('put', '/', {'a': record('Rakesh Gupta', 'a')}),
+        ('put', '/b', record('Ramesh Kumar', 'b')),
+        ('patch', '/', {'a/data/fullName': 'Rakesh Sharma'}),
+    ]
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshot = tmp_path / 'export.json'
+    snapshot.write_text(json.dumps({'admin': {'x': record('Harsh', 'x')}}))
+
+    store = storage.MemoryStorage.from_json(str(snapshot))
+    store.reference('admin/y').set(record('Priya', 'y'))
+    store.save_json(str(snapshot))
+
+    assert sorted(storage.MemoryStorage.from_json(str(snapshot)).reference('admin').get()) == ['x', 'y']
+
+
+def test_synced_cache_follows_memory_storage():
+    store = storage.MemoryStorage({'test': {'storage': {'a': record('Rakesh Gupta', 'a')}}})
+    holder = {'cache': {}}
+    index = entity_index.EntityIndex('fullName')
+
+    def set_cache(snapshot):
+        holder['cache'] = snapshot
+        index.build(snapshot)
+
+    synced = cache_sync.SyncedCache('test/storage', lambda: holder['cache'], set_cache, index, lambda: None)
+    try:
+        synced.start(store.reference('test/storage'))
+        store.reference('test/storage/b').set(record('Ramesh Kumar', 'b'))
+        store.reference('test/storage').update({'a': None})
+
+        assert sorted(holder['cache']) == ['b']
+        assert [hit['fullName'] for hit in index.search('ram')] == ['Ramesh Kumar']
+    finally:
+        synced.stop()
+        del cache_sync.SYNCED_CACHES['test/storage']
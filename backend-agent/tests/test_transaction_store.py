@@ -0,0 +1,167 @@
+import random
+
+import cache_sync
+import transaction_store
+import transactions
+
+
+def entry(key, day, customer_id, delivery_ids, product_ids, tags=None):
+    return {"data": {
+        "transactionId": key,
+        "date": f"{day % 100:02d}/{day // 100 % 100:02d}/{day // 10000}",
+        "customer": {"userId": customer_id, "fullName": customer_id},
+        "deliveryBoyList": [
+            {"userId": delivery_id, "deliveryDone": [{"productId": product_id, "sentUnits": 1, "recievedUnits": 0}
+                                                     for product_id in product_ids]}
+            for delivery_id in delivery_ids
+        ],
+        "selectedProducts": [{"productData": {"productId": product_id}, "sentUnits": 1, "recievedUnits": 0}
+                             for product_id in product_ids],
+        "tags": tags or []
+    }}
+
+
+def random_cache(rng, size):
+    cache = {}
+    for i in range(size):
+        day = 20240000 + rng.randint(1, 12) * 100 + rng.randint(1, 28)
+        key = f"{day}_{i:05d}"
+        cache[key] = entry(key, day, f"C{rng.randrange(20)}", rng.sample(["D0", "D1", "D2", "D3"], rng.randint(0, 2)),
+                           rng.sample(["P0", "P1", "P2"], rng.randint(1, 2)), rng.sample(["T0", "T1"], rng.randint(0, 1)))
+    return cache
+
+
+def scan(cache, filters, date_from, date_to):
+    """The frontend's approach: filter every entry, then sort"""
+    matches = []
+    for key, record in cache.items():
+        day, fields = transaction_store.transaction_fields(record)
+        if date_from is not None and day < date_from or date_to is not None and day > date_to:
+            continue
+        if all(value is None or value in fields[field] for field, value in filters.items()):
+            matches.append((day, key))
+    return [key for _, key in sorted(matches)]
+
+
+def random_queries(rng, count):
+    for _ in range(count):
+        filters = {
+            'customer': rng.choice([None, f"C{rng.randrange(22)}"]),
+            'deliveryPerson': rng.choice([None, None, "D1", "D3"]),
+            'product': rng.choice([None, "P0", "P2"]),
+            'tag': rng.choice([None, None, "T1"]),
+        }
+        low = rng.choice([None, 20240301, 20240615])
+        high = rng.choice([None, 20240615, 20241231])
+        yield filters, low, high
+
+
+def test_queries_match_a_full_scan():
+    rng = random.Random(7)
+    cache = random_cache(rng, 1000)
+    index = transaction_store.TransactionIndex()
+    index.build(cache)
+
+    for filters, low, high in random_queries(rng, 150):
+        assert index.query(filters, low, high) == scan(cache, filters, low, high)
+
+
+def test_incremental_updates_match_a_rebuild():
+    rng = random.Random(11)
+    cache = random_cache(rng, 500)
+    index = transaction_store.TransactionIndex()
+    index.build(cache)
+
+    for key in rng.sample(sorted(cache), 100):
+        del cache[key]
+        index.remove(key)
+    extra = random_cache(random.Random(12), 300)
+    for key, record in extra.items():
+        key = 'x' + key
+        record['data']['transactionId'] = key
+        cache[key] = record
+        index.upsert(key, record)
+
+    rebuilt = transaction_store.TransactionIndex()
+    rebuilt.build(cache)
+    for filters, low, high in random_queries(rng, 200):
+        assert index.query(filters, low, high) == rebuilt.query(filters, low, high) == scan(cache, filters, low, high)
+
+
+def test_limit_and_descending():
+    cache = {key: entry(key, day, "C1", ["D1"], ["P1"]) for key, day in
+             [("a", 20240105), ("b", 20240103), ("c", 20240110), ("d", 20240103)]}
+    index = transaction_store.TransactionIndex()
+    index.build(cache)
+
+    assert index.query({'customer': "C1"}) == ["b", "d", "a", "c"]
+    assert index.query({'customer': "C1"}, descending=True, limit=2) == ["c", "a"]
+    assert index.query({'customer': "C1"}, 20240104, 20240110) == ["a", "c"]
+    assert index.query({'customer': "C2"}) == []
+
+
+def test_listener_deltas_inside_arrays_update_the_indexes(store):
+    key = "20240105_ABCDE"
+    synced = transaction_store.TRANSACTION_SYNC
+    source = cache_sync.LocalEventSource({key: entry(key, 20240105, "C1", ["D1"], ["P1"])})
+    synced.start(source)
+    try:
+        source.emit('put', f'/{key}/data/tags/0', "T9")
+        source.emit('patch', f'/{key}/data/deliveryBoyList/0', {"userId": "D7"})
+
+        assert [e['data']['transactionId'] for e in transaction_store.find_transactions(tag="T9")] == [key]
+        assert transaction_store.find_transactions(delivery_person_id="D7")
+        assert not transaction_store.find_transactions(delivery_person_id="D1")
+    finally:
+        synced.stop()
+
+
+def test_chat_writes_are_indexed_immediately(store):
+    transactions.execute_batch_write([
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 1},
+        {"customer_name": "Harsh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 2},
+    ])
+
+    assert [e['data']['customer']['fullName'] for e in transaction_store.find_transactions(customer_id="C0")] == ["Rakesh Gupta"]
+    assert len(transaction_store.find_transactions(delivery_person_id="D0", product_id="P2", date_from="2000-01-01")) == 2
+
+
+def test_pages_follow_transaction_ids(store):
+    rng = random.Random(3)
+    cache = random_cache(rng, 400)
+    for i, key in enumerate(sorted(cache)):
+        cache[key]['data']['status'] = "Paid" if i % 3 else "Pending"
+    transaction_store.set_transaction_cache(cache)
+
+    for descending in (True, False):
+        for filters in ({}, {'customer_id': "C4"}, {'status': "Pending", 'product_id': "P2"}, {'tag': "T1"}):
+            expected = sorted(
+                (key for key, record in cache.items()
+                 if filters.get('customer_id') in (None, record['data']['customer']['userId'])
+                 and filters.get('status') in (None, record['data']['status'])
+                 and (filters.get('product_id') is None
+                      or filters['product_id'] in transaction_store.transaction_fields(record)[1]['product'])
+                 and (filters.get('tag') is None or filters['tag'] in record['data']['tags'])),
+                reverse=descending
+            )
+            seen, cursor = [], None
+            while True:
+                page = transaction_store.page_transactions(cursor=cursor, limit=37, descending=descending, **filters)
+                seen += [row['transactionId'] for row in page['objectArray']]
+                assert page['count'] <= 37
+                if not page['hasMore']:
+                    break
+                cursor = page['nextCursor']
+            assert seen == expected
+
+
+def test_page_projection(store):
+    transactions.execute_batch_write([
+        {"customer_name": "Rakesh Gupta", "delivery_boy_name": "Sweta Singh", "product_name": "Oxygen", "sent_units": 2},
+    ])
+    (row,) = transaction_store.page_transactions(status="Paid")['objectArray']
+    assert row['customer'] == {"userId": "C0", "fullName": "Rakesh Gupta"}
+    assert row['products'] == [{"productId": "P2", "name": "Oxygen", "sentUnits": 2, "recievedUnits": 0}]
+    assert 'others' not in row
+    assert 'others' in transaction_store.page_transactions(projection='full')['objectArray'][0]
+    assert transaction_store.page_transactions(status="Pending")['objectArray'] == []
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+import resolver
+import transactions
+
+
+def drop(customer_name, product_name="LPG 14KG", sent=2, received=1, payment=None, boy="Sweta Singh"):
+    return {"customer_name": customer_name, "delivery_boy_name": boy, "product_name": product_name,
+            "sent_units": sent, "received_units": received, "payment_amount": payment}
+
+
+def test_batch_is_written_with_one_multi_path_update(store):
+    writes = store.writes
+    results = transactions.execute_batch_write([
+        drop("Rakesh Gupta"), drop("Harsh", "Oxygen", sent=3, payment=0), drop("Nobody Known")
+    ])
+
+    assert [result['entry_status'] for result in results] == ["SUCCESS", "SUCCESS", "FAILED"]
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert "Nobody Known" in results[2]['warning']['text']
+    assert store.writes == writes + 1
+
+    stored = store.reference('transactionList').get()
+    assert sorted(stored) == sorted(result['context']['data']['transactionId'] for result in results[:2])
+    harsh = results[1]['context']['data']
+    assert (harsh['customer']['userId'], harsh['total'], harsh['status']) == ("C3", 1200, "Pending")
+
+
+def test_repeated_names_are_resolved_once(store, monkeypatch):
+    calls = []
+    original = resolver.resolve_entity
+
+    def counting(search_name, *args):
+        calls.append(search_name)
+        return original(search_name, *args)
+
+    monkeypatch.setattr(resolver, 'resolve_entity', counting)
+    results = transactions.execute_batch_write([drop("Rakesh Gupta"), drop("rakesh gupta "), drop("Sweta Sharma")])
+
+    assert all(result['entry_status'] == "SUCCESS" for result in results)
+    assert sorted(calls) == sorted(["Rakesh Gupta", "Sweta Singh", "LPG 14KG", "Sweta Sharma"])
+    assert len({result['context']['data']['transactionId'] for result in results}) == 3
+
+
+def test_failed_update_fails_every_entry(store, monkeypatch):
+    def broken(self, path, values):
+        raise RuntimeError("offline")
+
+    monkeypatch.setattr(type(store), 'update', broken)
+    results = transactions.execute_batch_write([drop("Rakesh Gupta"), drop("Sweta Sharma")])
+
+    assert [result['entry_status'] for result in results] == ["FAILED", "FAILED"]
+    assert results[0]['warning']['text'] == "DB ERROR: offline"
+
+
+def test_summary_reports_each_entry(store):
+    summary = transactions.summarize_batch(transactions.execute_batch_write([drop("Rakesh Gupta"), drop("Nobody")]))
+
+    assert summary['batch_status'] == "PARTIAL"
+    assert summary['response'].startswith("Logged 1 of 2 entries. Not logged: #2 ")
+    assert len(summary['results']) == 2
+
+
+def test_chat_handles_every_function_call_part(store, monkeypatch):
+    import main
+    import model_client
+
+    def function_call(name, args):
+        return SimpleNamespace(function_call=SimpleNamespace(name=name, args=args))
+
+    parts = [function_call("process_transaction", drop(name)) for name in ("Rakesh Gupta", "Ramesh Kumar", "Sweta Sharma")]
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))], text="")
+    chat = SimpleNamespace(send_message=lambda message: response)
+    monkeypatch.setattr(model_client, '_model', SimpleNamespace(start_chat=lambda: chat))
+
+    async def message():
+        return {"message": "summary of today"}
+
+    reply = asyncio.run(main.chat_endpoint(SimpleNamespace(json=message, headers={})))
+
+    assert reply['batch_status'] == "SUCCESS"
+    assert [result['context']['data']['customer']['fullName'] for result in reply['results']] == [
+        "Rakesh Gupta", "Ramesh Kumar", "Sweta Sharma"
+    ]
+    assert len(store.reference('transactionList').get()) == 3
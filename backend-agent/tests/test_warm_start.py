@@ -0,0 +1,139 @@
+import importlib
+import marshal
+import threading
+import time
+
+import cache_sync
+import customer
+import product
+import refresh_coordinator
+import transaction_store
+import warm_start
+
+for module in ("admin", "delivery", "deposit"):
+    importlib.import_module(module)     # registers every cache with the sync engine
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_fetch_all_downloads_each_node_once_in_parallel(store):
+    customer.set_customer_cache({})
+    store.latency = 0.2
+    reads = store.reads
+    started = time.perf_counter()
+    warm_start.fetch_all()
+    elapsed = time.perf_counter() - started
+
+    assert store.reads - reads == len(refresh_coordinator.COORDINATORS)
+    assert len(customer.CUSTOMER_CACHE) == 4
+    # Six nodes at 200 ms each: sequential would take 1.2 s
+    assert elapsed < 0.2 * len(refresh_coordinator.COORDINATORS) / 2
+
+
+def test_snapshot_round_trip_restores_every_cache(store, tmp_path):
+    snapshot_file = str(tmp_path / "warm.snapshot")
+    store.reference('transactionList/T1').set({"data": {"transactionId": "T1", "total": 100}})
+    transaction_store.refresh_transaction_cache(force=True)
+    assert warm_start.save(snapshot_file) > 0
+
+    customer.set_customer_cache({})
+    product.set_product_cache({})
+    transaction_store.set_transaction_cache({})
+    assert warm_start.load(snapshot_file) is True
+
+    assert len(customer.CUSTOMER_CACHE) == 4
+    assert [match["fullName"] for match in customer.find_customer_by_name("Sweta Sharma")] == ["Sweta Sharma"]
+    assert len(product.PRODUCT_CACHE) == 3
+    assert transaction_store.TRANSACTION_CACHE["T1"]["data"]["total"] == 100
+
+
+def test_missing_stale_or_foreign_snapshots_are_ignored(store, tmp_path, monkeypatch):
+    assert warm_start.load(str(tmp_path / "missing.snapshot")) is False
+
+    snapshot_file = str(tmp_path / "warm.snapshot")
+    warm_start.save(snapshot_file)
+    monkeypatch.setattr(warm_start, "MAX_SNAPSHOT_AGE", -1)
+    assert warm_start.load(snapshot_file) is False
+    monkeypatch.undo()
+
+    header = marshal.dumps({"format": warm_start.FORMAT, "python": (2, 7), "savedAt": int(time.time() * 1000)})
+    with open(snapshot_file, 'wb') as f:
+        f.write(len(header).to_bytes(4, 'little') + header + marshal.dumps({}))
+    assert warm_start.load(snapshot_file) is False
+
+    with open(snapshot_file, 'wb') as f:
+        f.write(b"")
+    assert warm_start.load(snapshot_file) is False
+
+
+def test_start_serves_the_snapshot_then_catches_up(store, tmp_path, monkeypatch):
+    snapshot_file = str(tmp_path / "warm.snapshot")
+    warm_start.save(snapshot_file)
+    customer.set_customer_cache({})
+    store.reference('customer/bucket/C9').set({"data": {"fullName": "Kavita Jain", "userId": "C9"}})
+    store.latency = 0.1
+
+    monkeypatch.setattr(warm_start, "SNAPSHOT_FILE", snapshot_file)
+    monkeypatch.setattr(warm_start, "PHASES", {})
+    assert not cache_sync.ENABLED
+    warm_start.start(store.reference)
+
+    # Served from the snapshot right away, without waiting for the database
+    assert warm_start.status()["source"] == "snapshot"
+    assert len(customer.CUSTOMER_CACHE) == 4
+    assert warm_start.PHASES["ready"] < 0.1
+
+    assert wait_for(lambda: "catchUp" in warm_start.PHASES)
+    assert customer.CUSTOMER_CACHE["C9"]["data"]["fullName"] == "Kavita Jain"
+
+
+def test_start_waits_for_the_listeners_first_snapshots(store, monkeypatch):
+    class DelayedSource(cache_sync.LocalEventSource):
+        def listen(self, callback):
+            self._callbacks.append(callback)
+            threading.Timer(0.1, callback, [cache_sync.SyncEvent('put', '/', self.data)]).start()
+            return cache_sync._LocalRegistration(self, callback)
+
+    customer.set_customer_cache({})
+    monkeypatch.setattr(cache_sync, "ENABLED", True)
+    monkeypatch.setattr(warm_start, "READY", threading.Event())
+    monkeypatch.setattr(warm_start, "PHASES", {})
+    try:
+        warm_start.start(lambda path: DelayedSource(store.reference(path).get()))
+
+        assert warm_start.READY.is_set()
+        assert warm_start.PHASES["firstSnapshot"] >= 0.09
+        assert "fetch" not in warm_start.PHASES
+        assert len(customer.CUSTOMER_CACHE) == 4
+        assert all(synced.live for synced in cache_sync.SYNCED_CACHES.values())
+    finally:
+        cache_sync.stop()
+
+
+def test_listeners_start_in_parallel(monkeypatch):
+    opened = []
+
+    class SlowSource(cache_sync.LocalEventSource):
+        def listen(self, callback):
+            time.sleep(0.1)
+            opened.append(callback)
+            return super().listen(callback)
+
+    stopped = []
+    for synced in cache_sync.SYNCED_CACHES.values():
+        monkeypatch.setattr(synced, "set_cache", lambda snapshot: None)
+        monkeypatch.setattr(synced, "start", lambda source, synced=synced: stopped.append(source.listen(synced.handle)))
+
+    started = time.perf_counter()
+    cache_sync.start(lambda path: SlowSource({}), workers=8)
+    elapsed = time.perf_counter() - started
+
+    assert len(opened) == len(cache_sync.SYNCED_CACHES)
+    assert elapsed < 0.1 * len(opened) / 2
+    for registration in stopped:
+        registration.close()
@@ -0,0 +1,350 @@
+import bisect
+import datetime
+import threading
+import time
+
+import cache_sync
+import records
+import refresh_coordinator
+import storage
+
+# Server-side copy of /transactionList with secondary indexes.
+# Each index maps a value (customer userId, delivery person userId, productId, tag, status) to the
+# entries carrying it, sorted by date, so "entries for X between two dates" is a binary search plus the
+# matching slice instead of a scan of the whole list. The same postings are also kept in transactionId
+# order for keyset pagination (the YYYYMMDD_HHmmSS_xxxxx ids sort by creation time).
+
+TRANSACTION_CACHE = {}
+
+PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+FIELDS = ('customer', 'deliveryPerson', 'product', 'tag', 'status')
+
+
+def day_key(date_text, transaction_id=''):
+    """Turns 'dd/mm/yyyy' (or 'yyyy-mm-dd') into a sortable yyyymmdd int; falls back to the ID's date prefix"""
+    if isinstance(date_text, str):
+        parts = date_text.strip().replace('-', '/').split('/')
+        if len(parts) == 3 and all(part.isdigit() for part in parts):
+            day, month, year = (parts[2], parts[1], parts[0]) if len(parts[0]) == 4 else parts
+            return int(year) * 10000 + int(month) * 100 + int(day)
+    prefix = str(transaction_id or '')[:8]
+    return int(prefix) if prefix.isdigit() else 0
+
+
+def parse_day(value):
+    """Query bound ('dd/mm/yyyy', 'yyyy-mm-dd', yyyymmdd or a date) -> yyyymmdd int, None when empty"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.year * 10000 + value.month * 100 + value.day
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    key = day_key(str(value))
+    if not key:
+        raise ValueError(f"unrecognized date '{value}'")
+    return key
+
+
+def transaction_fields(record):
+    """Returns (day, {field: set of values}) for a { data, others } transaction entry"""
+    data = record.get('data') if isinstance(record, dict) else None
+    if not isinstance(data, dict):
+        return 0, {field: set() for field in FIELDS}
+
+    customer_id = (data.get('customer') or {}).get('userId')
+    delivery_ids = set()
+    product_ids = set()
+    for delivery_person in data.get('deliveryBoyList') or []:
+        if not isinstance(delivery_person, dict):
+            continue
+        if delivery_person.get('userId'):
+            delivery_ids.add(delivery_person['userId'])
+        for delivery_done in delivery_person.get('deliveryDone') or []:
+            if isinstance(delivery_done, dict) and delivery_done.get('productId'):
+                product_ids.add(delivery_done['productId'])
+    for selected in data.get('selectedProducts') or []:
+        product_id = ((selected or {}).get('productData') or {}).get('productId') if isinstance(selected, dict) else None
+        if product_id:
+            product_ids.add(product_id)
+
+    return day_key(data.get('date'), data.get('transactionId')), {
+        'customer': {customer_id} if customer_id else set(),
+        'deliveryPerson': delivery_ids,
+        'product': product_ids,
+        'tag': {tag for tag in data.get('tags') or [] if isinstance(tag, str)},
+        'status': {data['status']} if isinstance(data.get('status'), str) and data['status'] else set(),
+    }
+
+
+def _discard_sorted(items, value):
+    position = bisect.bisect_left(items, value)
+    if position < len(items) and items[position] == value:
+        del items[position]
+
+
+class TransactionIndex:
+    """Date-sorted postings per customer, delivery person, product and tag"""
+
+    def __init__(self):
+        self.version = 0        # bumped on every build/upsert/remove
+        self.updated_at = None  # epoch ms of the last change
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._records = {}      # key -> (day, {field: set of values})
+        self._by_date = []      # ascending (day, key) of every entry
+        self._postings = {field: {} for field in FIELDS}   # field -> value -> ascending (day, key)
+        self._by_key = []       # ascending keys of every entry
+        self._key_postings = {field: {} for field in FIELDS}   # field -> value -> ascending keys
+
+    def __len__(self):
+        return len(self._records)
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = int(time.time() * 1000)
+
+    def build(self, cache):
+        """Rebuilds every index from a { transactionId: entry } snapshot"""
+        with self._lock:
+            self._reset()
+            for key, record in (cache or {}).items():
+                day, fields = transaction_fields(record)
+                self._records[key] = (day, fields)
+                self._by_date.append((day, key))
+                self._by_key.append(key)
+                for field, values in fields.items():
+                    for value in values:
+                        self._postings[field].setdefault(value, []).append((day, key))
+                        self._key_postings[field].setdefault(value, []).append(key)
+            self._by_date.sort()
+            self._by_key.sort()
+            for field in FIELDS:
+                for entries in self._postings[field].values():
+                    entries.sort()
+                for keys in self._key_postings[field].values():
+                    keys.sort()
+            self._touch()
+
+    def upsert(self, key, record):
+        with self._lock:
+            self._unlink(key)
+            day, fields = transaction_fields(record)
+            self._records[key] = (day, fields)
+            bisect.insort(self._by_date, (day, key))
+            bisect.insort(self._by_key, key)
+            for field, values in fields.items():
+                for value in values:
+                    bisect.insort(self._postings[field].setdefault(value, []), (day, key))
+                    bisect.insort(self._key_postings[field].setdefault(value, []), key)
+            self._touch()
+
+    def remove(self, key):
+        with self._lock:
+            if self._unlink(key):
+                self._touch()
+
+    def _unlink(self, key):
+        previous = self._records.pop(key, None)
+        if previous is None:
+            return False
+        day, fields = previous
+        _discard_sorted(self._by_date, (day, key))
+        _discard_sorted(self._by_key, key)
+        for field, values in fields.items():
+            for value in values:
+                entries = self._postings[field].get(value)
+                if entries is not None:
+                    _discard_sorted(entries, (day, key))
+                    if not entries:
+                        del self._postings[field][value]
+                keys = self._key_postings[field].get(value)
+                if keys is not None:
+                    _discard_sorted(keys, key)
+                    if not keys:
+                        del self._key_postings[field][value]
+        return True
+
+    def values(self, field):
+        """Every value with at least one entry for `field` (e.g. the customers that have transactions)"""
+        with self._lock:
+            return list(self._postings[field])
+
+    def query(self, filters=None, date_from=None, date_to=None, limit=None, descending=False):
+        """Returns the keys matching every { field: value } filter within [date_from, date_to], by date.
+
+        Walks only the date range of the smallest matching posting list, so the cost follows the
+        result size rather than the number of stored entries.
+        """
+        filters = {field: value for field, value in (filters or {}).items() if value not in (None, '')}
+        low = (date_from, '') if date_from is not None else None
+        high = (date_to, '\uffff') if date_to is not None else None
+
+        with self._lock:
+            candidates = []
+            for field, value in filters.items():
+                entries = self._postings[field].get(value)
+                if not entries:
+                    return []
+                candidates.append(entries)
+            if not candidates:
+                candidates.append(self._by_date)
+
+            ranges = []
+            for entries in candidates:
+                start = bisect.bisect_left(entries, low) if low else 0
+                end = bisect.bisect_right(entries, high) if high else len(entries)
+                ranges.append((end - start, start, end, entries))
+            _, start, end, entries = min(ranges, key=lambda item: item[0])
+
+            positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+            keys = []
+            for position in positions:
+                key = entries[position][1]
+                fields = self._records[key][1]
+                if all(value in fields[field] for field, value in filters.items()):
+                    keys.append(key)
+                    if limit is not None and len(keys) >= limit:
+                        break
+            return keys
+
+    def page(self, filters=None, after=None, limit=50, descending=True):
+        """Keyset pagination in transactionId order: up to `limit` keys past the `after` cursor.
+
+        Returns (keys, has_more). Walks the smallest matching posting list from the cursor, so a
+        page costs the same on the first and the thousandth page.
+        """
+        filters = {field: value for field, value in (filters or {}).items() if value not in (None, '')}
+        with self._lock:
+            candidates = []
+            for field, value in filters.items():
+                keys = self._key_postings[field].get(value)
+                if not keys:
+                    return [], False
+                candidates.append(keys)
+            keys = min(candidates, key=len) if candidates else self._by_key
+
+            if descending:
+                start = bisect.bisect_left(keys, after) - 1 if after is not None else len(keys) - 1
+                positions = range(start, -1, -1)
+            else:
+                start = bisect.bisect_right(keys, after) if after is not None else 0
+                positions = range(start, len(keys))
+
+            page = []
+            for position in positions:
+                key = keys[position]
+                fields = self._records[key][1]
+                if all(value in fields[field] for field, value in filters.items()):
+                    if len(page) == limit:
+                        return page, True
+                    page.append(key)
+            return page, False
+
+
+TRANSACTION_INDEX = TransactionIndex()
+
+# Every view derived from the cache (this index, the ledger, ...) follows the same deltas
+TRANSACTION_VIEWS = cache_sync.ViewSet(TRANSACTION_INDEX)
+
+
+def set_transaction_cache(snapshot):
+    """Replaces the cache and rebuilds its indexes and views"""
+    global TRANSACTION_CACHE
+    TRANSACTION_CACHE = records.compact_cache(records.Transaction, snapshot)
+    TRANSACTION_VIEWS.build(TRANSACTION_CACHE)
+
+def fetch_transaction_cache():
+    """Fetches all transactions from /transactionList and stores them in memory"""
+    try:
+        print("Refreshing Transaction Cache...")
+        ref = storage.reference('transactionList')
+        snapshot = ref.get()
+        if snapshot:
+            TRANSACTION_SYNC.load(snapshot)
+            print(f"Loaded {len(snapshot)} transactions.")
+        else:
+            print("No transactions found in /transactionList")
+    except Exception as e:
+        print(f"Error fetching transactions: {e}")
+
+# Keeps the cache current from /transactionList listener deltas once main starts the sync engine
+TRANSACTION_SYNC = cache_sync.SyncedCache('transactionList', lambda: TRANSACTION_CACHE, set_transaction_cache, TRANSACTION_VIEWS, lambda: refresh_transaction_cache())
+
+# All callers share one in-flight download of /transactionList (see refresh_coordinator)
+TRANSACTION_REFRESH = refresh_coordinator.RefreshCoordinator('transactionList', fetch_transaction_cache, lambda: TRANSACTION_SYNC.live)
+
+def refresh_transaction_cache(force=False):
+    """Refreshes the cache, joining a refresh already in flight instead of downloading again"""
+    return TRANSACTION_REFRESH.refresh(force=force)
+
+def record_written(entries):
+    """Applies entries this service just wrote, without waiting for the listener to echo them"""
+    for entry in entries:
+        TRANSACTION_SYNC.apply_local(entry['data']['transactionId'], entry)
+
+def find_transactions(customer_id=None, delivery_person_id=None, product_id=None, tag=None,
+                      date_from=None, date_to=None, limit=None, descending=False):
+    """Returns the cached entries matching every given filter, ordered by date"""
+    if not TRANSACTION_CACHE:
+        refresh_transaction_cache()
+    else:
+        TRANSACTION_REFRESH.revalidate()
+
+    keys = TRANSACTION_INDEX.query(
+        {'customer': customer_id, 'deliveryPerson': delivery_person_id, 'product': product_id, 'tag': tag},
+        parse_day(date_from), parse_day(date_to), limit, descending
+    )
+    cache = TRANSACTION_CACHE
+    return [cache[key] for key in keys if key in cache]
+
+def project(record):
+    """Compact row for list views: what the inventory table shows, without audit or product master data"""
+    data = record.get('data') or {}
+    return {
+        "transactionId": data.get('transactionId'),
+        "date": data.get('date'),
+        "customer": {key: (data.get('customer') or {}).get(key) for key in ('userId', 'fullName')},
+        "deliveryBoyList": [{key: (person or {}).get(key) for key in ('userId', 'fullName')}
+                            for person in data.get('deliveryBoyList') or [] if isinstance(person, dict)],
+        "products": [{
+            "productId": ((item or {}).get('productData') or {}).get('productId'),
+            "name": ((item or {}).get('productData') or {}).get('name'),
+            "sentUnits": item.get('sentUnits'),
+            "recievedUnits": item.get('recievedUnits')
+        } for item in data.get('selectedProducts') or [] if isinstance(item, dict)],
+        "total": data.get('total'),
+        "payment": data.get('payment'),
+        "status": data.get('status'),
+        "tags": data.get('tags') or [],
+        "shippingAddress": data.get('shippingAddress'),
+        "extraDetails": data.get('extraDetails')
+    }
+
+def page_transactions(customer_id=None, delivery_person_id=None, product_id=None, status=None, tag=None,
+                      cursor=None, limit=50, descending=True, projection='compact'):
+    """One page of entries in transactionId order; pass the returned nextCursor to get the next one"""
+    if projection not in ('compact', 'full'):
+        raise ValueError(f"unknown projection '{projection}', expected compact or full")
+    limit = max(1, min(int(limit or PAGE_LIMIT), MAX_PAGE_LIMIT))
+    if not TRANSACTION_CACHE:
+        refresh_transaction_cache()
+    else:
+        TRANSACTION_REFRESH.revalidate()
+
+    keys, has_more = TRANSACTION_INDEX.page(
+        {'customer': customer_id, 'deliveryPerson': delivery_person_id, 'product': product_id,
+         'status': status, 'tag': tag},
+        cursor or None, limit, descending
+    )
+    cache = TRANSACTION_CACHE
+    records = [cache[key] for key in keys if key in cache]
+    return {
+        "count": len(records),
+        "objectArray": [project(record) for record in records] if projection == 'compact' else records,
+        "nextCursor": keys[-1] if has_more and keys else None,
+        "hasMore": has_more
+    }
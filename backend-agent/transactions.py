@@ -0,0 +1,260 @@
+import datetime
+import time
+import traceback
+
+import customer
+import delivery
+import ids
+import product
+import progress
+import resolver
+import storage
+import transaction_store
+
+# Builds and writes transactionList entries.
+# A whole batch (e.g. an end-of-day summary with 20-50 drops) resolves every name once and is
+# committed with a single multi-path update() on /transactionList, so either every resolved
+# entry of the batch is stored or none is.
+
+TRANSACTION_PATH = 'transactionList'
+
+
+def new_transaction_id(used_ids=None):
+    """Transaction ID in the format YYYYMMDD_HHmmSS_xxxxx (same as the frontend), see ids.py.
+
+    IDs are unique within this process by construction; one already stored (another instance on
+    the same node id) or in `used_ids` is skipped. With `used_ids`, the ID is also added to it.
+    """
+    while True:
+        transaction_id = ids.TRANSACTION_IDS.next()
+        if transaction_id in transaction_store.TRANSACTION_CACHE or (used_ids is not None and transaction_id in used_ids):
+            continue
+        if used_ids is not None:
+            used_ids.add(transaction_id)
+        return transaction_id
+
+
+def build_transaction(transaction_id, customer_data, delivery_data, product_data, sent, received, payment,
+                      created_by="AI_AGENT", extra_details="Logged via AI Agent", date=None, import_index=0):
+    """Returns the { data, others } entry the frontend stores under /transactionList/{transactionId}"""
+    rate = int(product_data.get('rate', 0))
+    total_amt = (sent * rate)
+    if payment is None: payment = total_amt
+    now_ms = int(time.time() * 1000)
+
+    return {
+        "data": {
+            "customer": {
+                "fullName": customer_data.get('fullName'),
+                "phoneNumber": customer_data.get('phoneNumber', ""),
+                "userId": customer_data.get('userId'),
+                "address": (customer_data.get('shippingAddress') or [customer_data.get('address')])[0]
+            },
+            "date": date or datetime.datetime.now().strftime("%d/%m/%Y"),
+            "transactionId": transaction_id,
+            "deliveryBoyList": [
+                {
+                    "fullName": delivery_data.get('fullName'),
+                    "userId": delivery_data.get('userId'),
+                    "deliveryDone": [
+                        {
+                            "productId": product_data.get('productId'),
+                            "sentUnits": sent,
+                            "recievedUnits": received
+                        }
+                    ]
+                }
+            ],
+            "selectedProducts": [
+                {
+                    "productData": product_data,
+                    "sentUnits": sent,
+                    "recievedUnits": received,
+                    "paymentAmt": 0
+                }
+            ],
+            "payment": payment,
+            "total": total_amt,
+            "status": "Paid" if payment >= total_amt else "Pending",
+            "importIndex": import_index,
+            "extraDetails": extra_details
+        },
+        "others": {
+            "createdBy": created_by,
+            "createdTime": now_ms,
+            "editedBy": created_by,
+            "editedTime": now_ms
+        }
+    }
+
+
+class EntityResolver:
+    """Resolves customer, delivery person and product names, each distinct name only once per batch"""
+
+    def __init__(self):
+        self._resolved = {}  # (kind, normalized name) -> (record_data, error)
+
+    def _resolve(self, kind, search_name, *resolve_args):
+        key = (kind, (search_name or '').strip().lower())
+        if key not in self._resolved:
+            self._resolved[key] = resolver.resolve_entity(search_name, *resolve_args)
+        return self._resolved[key]
+
+    def customer(self, search_name):
+        return self._resolve(
+            'customer', search_name, customer.execute_get_customer_details, customer.CUSTOMER_SYNC,
+            customer.match_customer_by_name, "Customers found", "customer"
+        )
+
+    def delivery_person(self, search_name):
+        return self._resolve(
+            'delivery', search_name, delivery.execute_get_delivery_boy_details, delivery.DELIVERY_BOY_SYNC,
+            delivery.match_delivery_boy_by_name, "Delivery Person found", "delivery person"
+        )
+
+    def product(self, search_name):
+        return self._resolve(
+            'product', search_name, product.execute_get_product_details, product.PRODUCT_SYNC,
+            product.match_product_by_name, "Products", "product"
+        )
+
+
+def prepare_transaction(entities, cust_name, boy_name, prod_name, sent, received, payment, used_ids=None, **build_kwargs):
+    """Resolves the three names and builds the entry. Returns (transaction_data, None) or (None, response)"""
+    customer_data, error = entities.customer(cust_name)
+    if error: return None, error
+
+    delivery_data, error = entities.delivery_person(boy_name)
+    if error: return None, error
+
+    product_data, error = entities.product(prod_name)
+    if error: return None, error
+
+    progress.emit("entities", customer=customer_data.get('fullName'), deliveryPerson=delivery_data.get('fullName'),
+                  product=product_data.get('name'))
+    transaction_data = build_transaction(
+        new_transaction_id(used_ids), customer_data, delivery_data, product_data, sent, received, payment, **build_kwargs
+    )
+    return transaction_data, None
+
+
+def transaction_args(args):
+    """Maps process_transaction function-call arguments to prepare_transaction keywords"""
+    return {
+        "cust_name": args.get("customer_name"),
+        "boy_name": args.get("delivery_boy_name"),
+        "prod_name": args.get("product_name"),
+        "sent": int(args.get("sent_units", 0) or 0),
+        "received": int(args.get("received_units", 0) or 0),
+        "payment": args.get("payment_amount")
+    }
+
+
+def write_transactions(transaction_list):
+    """Commits entries with one multi-path update, keyed by transactionId, and adds them to the transaction store"""
+    updates = {entry['data']['transactionId']: entry for entry in transaction_list}
+    if updates:
+        storage.reference(TRANSACTION_PATH).update(updates)
+        transaction_store.record_written(transaction_list)
+        progress.emit("committed", transactionIds=list(updates))
+
+
+def execute_batch_write(calls):
+    """Resolves and stores every process_transaction call of one message.
+
+    Returns one result per call, in order. Entries whose names cannot be resolved are reported
+    and skipped; all the others are committed together.
+    """
+    entities = EntityResolver()
+    results = []
+    prepared = []
+    used_ids = set()
+
+    for position, args in enumerate(calls):
+        try:
+            transaction_data, error = prepare_transaction(entities, **transaction_args(args), used_ids=used_ids)
+        except Exception as e:
+            print(traceback.format_exc())
+            transaction_data, error = None, {'warning': {'text': f"INVALID ENTRY: {str(e)}"}}
+
+        if error:
+            results.append({"index": position, "entry_status": "FAILED", **error})
+            continue
+
+        results.append({
+            "index": position,
+            "response": f"SUCCESS: Logged entry for {transaction_data['data']['customer']['fullName']}.",
+            "entry_status": "SUCCESS",
+            "context": transaction_data
+        })
+        prepared.append(transaction_data)
+
+    try:
+        write_transactions(prepared)
+    except Exception as e:
+        print(traceback.format_exc())
+        for result in results:
+            if result['entry_status'] == "SUCCESS":
+                result.update({
+                    "entry_status": "FAILED",
+                    "response": None,
+                    "context": None,
+                    "warning": {"text": f"DB ERROR: {str(e)}", "action": "call_admin"}
+                })
+    return results
+
+
+def execute_complex_write(cust_name, boy_name, prod_name, sent, received, payment):
+    """Single process_transaction call, with the response shape the chat widget expects"""
+    try:
+        transaction_data, error = prepare_transaction(
+            EntityResolver(), cust_name, boy_name, prod_name, sent, received, payment
+        )
+        if error: return error
+
+        print(transaction_data)
+        write_transactions([transaction_data])
+
+        return {
+            "response": f"SUCCESS: Logged entry for {transaction_data['data']['customer']['fullName']}.",
+            "entry_status": "SUCCESS",
+            "context": transaction_data
+        }
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return {
+            'warning': {
+                "text": f"DB ERROR: {str(e)}",
+                "action": "call_admin"
+            }
+        }
+
+
+def error_text(response):
+    """The user-facing reason of a warning or disambiguation response"""
+    return (response.get('warning') or {}).get('text') or response.get('response')
+
+
+def summarize_batch(results):
+    """Chat reply for a batch: a one-line summary plus the per-transaction results"""
+    logged = sum(1 for result in results if result['entry_status'] == "SUCCESS")
+    if logged == len(results):
+        batch_status = "SUCCESS"
+    elif logged:
+        batch_status = "PARTIAL"
+    else:
+        batch_status = "FAILED"
+
+    response = f"Logged {logged} of {len(results)} entries."
+    failed = [result for result in results if result['entry_status'] != "SUCCESS"]
+    if failed:
+        response += " Not logged: " + "; ".join(
+            f"#{result['index'] + 1} {error_text(result)}"
+            for result in failed
+        )
+    return {
+        "response": response,
+        "batch_status": batch_status,
+        "results": results
+    }
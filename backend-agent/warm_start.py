@@ -0,0 +1,183 @@
+import marshal
+import mmap
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_sync
+import refresh_coordinator
+
+# Startup pipeline for the in-memory caches.
+# Every node is downloaded once, all of them in parallel, instead of once per module import and
+# again by refresh_memory(). With WARM_START_SNAPSHOT set, the caches are first loaded from a local
+# binary snapshot (marshal, read through mmap) written at the previous shutdown, so the service
+# answers from slightly old data within milliseconds while the listeners (or a background fetch
+# when CACHE_SYNC=0) catch the caches up. Each phase's duration is kept in PHASES for /health.
+#
+# The snapshot only survives a restart on a persistent volume (e.g. a Cloud Run volume mount).
+
+SNAPSHOT_FILE = os.environ.get("WARM_START_SNAPSHOT", "")
+MAX_SNAPSHOT_AGE = int(os.environ.get("WARM_START_MAX_AGE", 24 * 60 * 60))   # seconds; older files are ignored
+FETCH_WORKERS = int(os.environ.get("WARM_START_WORKERS", 8))
+LISTEN_TIMEOUT = float(os.environ.get("WARM_START_LISTEN_TIMEOUT", 60))   # seconds to wait for the first snapshots
+
+# Set LAZY_STARTUP=1 to bind the port first and load the caches (and the model) in the background;
+# /ready answers 503 until they are loaded, /health stays the liveness check
+LAZY = os.environ.get("LAZY_STARTUP", "0") == "1"
+
+FORMAT = 1
+
+PHASES = {}         # phase name -> seconds
+STATE = {"source": None, "snapshotSavedAt": None}
+READY = threading.Event()   # set once start() has loaded the caches
+
+
+def record(name, seconds):
+    PHASES[name] = round(seconds, 4)
+    print(f"Startup {name}: {seconds * 1000:.0f} ms")
+
+
+class phase:
+    """Times a startup phase: `with warm_start.phase('fetch'): ...`"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def fetch_all(workers=FETCH_WORKERS):
+    """Downloads every registered node once, in parallel (through each cache's RefreshCoordinator)"""
+    coordinators = list(refresh_coordinator.COORDINATORS.values())
+    if not coordinators:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(coordinators))),
+                            thread_name_prefix="warm-start") as pool:
+        list(pool.map(lambda coordinator: coordinator.refresh(force=True), coordinators))
+
+
+def _header():
+    return {"format": FORMAT, "python": tuple(sys.version_info[:2]), "savedAt": int(time.time() * 1000)}
+
+
+def save(snapshot_file=None):
+    """Writes every synced cache to the snapshot file (atomically); returns the bytes written.
+
+    Layout: 4-byte header length, the marshalled header, then one marshalled { path: cache } body.
+    """
+    snapshot_file = snapshot_file or SNAPSHOT_FILE
+    if not snapshot_file:
+        return 0
+    nodes = {}
+    for path, synced in cache_sync.SYNCED_CACHES.items():
+        # Under the event lock so a listener delta cannot land halfway through the copy
+        with synced._lock:
+            nodes[path] = dict(synced.get_cache())
+    header = marshal.dumps(_header())
+    body = marshal.dumps(nodes)
+    temporary = f"{snapshot_file}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        f.write(body)
+    os.replace(temporary, snapshot_file)
+    size = 4 + len(header) + len(body)
+    print(f"Saved warm-start snapshot ({size / 1e6:.1f} MB) to {snapshot_file}")
+    return size
+
+
+def read(snapshot_file):
+    """The snapshot's { path: cache } nodes, or None when the file is missing, stale or unreadable"""
+    try:
+        with open(snapshot_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                memoryview(mapped) as view:
+            length = int.from_bytes(view[:4], 'little')
+            header = marshal.loads(view[4:4 + length])
+            # marshal's format can change between Python versions
+            if header.get("format") != FORMAT or tuple(header.get("python", ())) != tuple(sys.version_info[:2]):
+                print(f"Ignoring warm-start snapshot {snapshot_file}: written by another version")
+                return None
+            age = time.time() - header["savedAt"] / 1000
+            if age > MAX_SNAPSHOT_AGE:
+                print(f"Ignoring warm-start snapshot {snapshot_file}: {age / 3600:.1f} h old")
+                return None
+            # Decoded straight from the mapping: the file is never copied into a bytes object first
+            nodes = marshal.loads(view[4 + length:])
+            STATE["snapshotSavedAt"] = header["savedAt"]
+            return nodes
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warm-start snapshot error for {snapshot_file}: {e}")
+        return None
+
+
+def load(snapshot_file=None):
+    """Fills the caches from the snapshot file; returns True if it was used"""
+    snapshot_file = snapshot_file or SNAPSHOT_FILE
+    nodes = read(snapshot_file) if snapshot_file else None
+    if nodes is None:
+        return False
+    for path, cache in nodes.items():
+        synced = cache_sync.SYNCED_CACHES.get(path)
+        if synced is not None:
+            synced.load(cache)
+    return True
+
+
+def _catch_up():
+    with phase("catchUp"):
+        fetch_all()
+
+
+def start(source_for_path):
+    """Loads the caches for a new process; returns once lookups can be served"""
+    started = time.perf_counter()
+    loaded = False
+    if SNAPSHOT_FILE:
+        with phase("snapshot"):
+            loaded = load()
+    STATE["source"] = "snapshot" if loaded else "database"
+
+    if cache_sync.ENABLED:
+        # The listeners' first event is the full node, which replaces the snapshot. It arrives after
+        # listen() returns, so the service is not ready until every cache has received it
+        with phase("listen"):
+            cache_sync.start(source_for_path, workers=FETCH_WORKERS)
+        with phase("firstSnapshot"):
+            live = cache_sync.wait_live(LISTEN_TIMEOUT)
+        if not live:
+            print("Cache sync: first snapshots did not all arrive, downloading the rest")
+            with phase("fetch"):
+                fetch_all()     # caches that are live already keep their data, see SyncedCache.load
+    elif loaded:
+        threading.Thread(target=_catch_up, name="warm-start-catch-up", daemon=True).start()
+    else:
+        with phase("fetch"):
+            fetch_all()
+    record("ready", time.perf_counter() - started)
+    READY.set()
+
+
+def start_in_background(source_for_path):
+    """start() on a daemon thread, for LAZY_STARTUP"""
+    def run():
+        try:
+            start(source_for_path)
+        except Exception as e:
+            print(f"Startup error: {e}")
+    thread = threading.Thread(target=run, name="warm-start", daemon=True)
+    thread.start()
+    return thread
+
+
+def status():
+    return {"lazy": LAZY, "ready": READY.is_set(), "snapshot": SNAPSHOT_FILE or None, "phases": dict(PHASES), **STATE}
@@ -5,6 +5,7 @@ import { AiWidgetService } from '../../services/ai-widget.service';
 import { Message } from '../../../assets/models/AiChat';
 import { Router } from '@angular/router';
 import { EntryDataService } from '../../services/entry-data.service';
+import { generateRandomString } from '../../shared/commonFunctions';
 
 @Component({
   selector: 'app-ai-widget',
@@ -27,29 +28,97 @@ export class AiWidgetComponent {
 
   sendMessage() {
     if (this.userInput.trim()) {
+      const prompt = this.userInput;
+      const idempotencyKey = generateRandomString(24); // shared by the stream, its retries and its fallback, so nothing is logged twice
+
       this.aiWidgetService.aiStatus = 'thinking';
-      this.aiWidgetService.messages.push({ content: this.userInput, from: 'user', timestamp: Date.now() });
+      this.aiWidgetService.messages.push({ content: prompt, from: 'user', timestamp: Date.now() });
       this.scrollToBottom();
-      this.aiWidgetService.userEnteredPrompt(this.userInput).subscribe((response: any) => {
-        if (response.response){
-          this.aiWidgetService.messages.push({ content: response.response, action: response.action, from: 'ai', timestamp: Date.now(), context: response });
-          if(response.entry_status === 'SUCCESS') {
-            this.entryDataService.addNewEntryInCache(response.context);
-          }
-        } else
-          this.aiWidgetService.messages.push({ content: response?.warning?.text || 'Something went Wrong', action: response?.warning?.action, from: 'ai', timestamp: Date.now(), context: response });
-
-        this.aiWidgetService.aiStatus = 'ready';
-        this.scrollToBottom();
-      }, error => {
-        this.aiWidgetService.messages.push({ content: 'Error: Unable to get response from AI.', from: 'ai', timestamp: Date.now() });
-        this.aiWidgetService.aiStatus = 'error';
-        this.scrollToBottom();
-      });
+      this.streamReply(prompt, idempotencyKey, 2);
       this.userInput = '';
     }
   }
 
+  // A busy agent sends `rejected` with retryAfter before its reply: wait that long and ask again (like /chat's 429 retries)
+  streamReply(prompt: string, idempotencyKey: string, retriesLeft: number) {
+    let streamed: Message | undefined;
+    let replied = false;
+    let retryAfter = 0;
+
+    const fallback = () => {
+      if (replied) return;
+      if (streamed)
+        this.aiWidgetService.messages = this.aiWidgetService.messages.filter(message => message !== streamed);
+      this.aiWidgetService.userEnteredPrompt(prompt, idempotencyKey).subscribe(
+        (response: any) => this.showReply(response),
+        error => error?.status === 429 ? this.showReply(error.error) : this.showError() // still busy after the retries
+      );
+    };
+
+    this.aiWidgetService.streamPrompt(prompt, idempotencyKey).subscribe({
+      next: ({ event, data }) => {
+        if (event === 'rejected' && retriesLeft > 0) {
+          retryAfter = data.retryAfter || 1;
+          this.aiWidgetService.progressText = `Busy, retrying in ${retryAfter}s...`;
+        } else if (event === 'token') {
+          if (!streamed) {
+            streamed = { content: '', from: 'ai', timestamp: Date.now() };
+            this.aiWidgetService.messages.push(streamed);
+          }
+          streamed.content += data.text;
+          this.scrollToBottom();
+        } else if (event === 'reply') {
+          replied = true;
+          if (streamed) // the reply carries the complete text
+            this.aiWidgetService.messages = this.aiWidgetService.messages.filter(message => message !== streamed);
+          if (retryAfter)
+            setTimeout(() => this.streamReply(prompt, idempotencyKey, retriesLeft - 1), retryAfter * 1000);
+          else
+            this.showReply(data);
+        } else
+          this.aiWidgetService.progressText = this.describeProgress(event, data);
+      },
+      error: fallback,
+      complete: fallback
+    });
+  }
+
+  showReply(response: any) {
+    if (response.response) {
+      this.aiWidgetService.messages.push({ content: response.response, action: response.action, from: 'ai', timestamp: Date.now(), context: response });
+      this.cacheLoggedEntries(response);
+    } else
+      this.aiWidgetService.messages.push({ content: response?.warning?.text || 'Something went Wrong', action: response?.warning?.action, from: 'ai', timestamp: Date.now(), context: response });
+
+    this.aiWidgetService.aiStatus = 'ready';
+    this.aiWidgetService.progressText = '';
+    this.scrollToBottom();
+  }
+
+  showError() {
+    this.aiWidgetService.messages.push({ content: 'Error: Unable to get response from AI.', from: 'ai', timestamp: Date.now() });
+    this.aiWidgetService.aiStatus = 'error';
+    this.aiWidgetService.progressText = '';
+    this.scrollToBottom();
+  }
+
+  describeProgress(event: string, data: any): string {
+    if (event === 'intent')
+      return 'Understood, working on it...';
+    if (event === 'entities')
+      return `Found ${[data.customer, data.deliveryPerson, data.product].filter(Boolean).join(', ')}...`;
+    if (event === 'committed')
+      return 'Saved, finishing up...';
+    return this.aiWidgetService.progressText;
+  }
+
+  cacheLoggedEntries(response: any) {
+    // A batch reply carries one result per logged transaction
+    if (response?.entry_status === 'SUCCESS')
+      this.entryDataService.addNewEntryInCache(response.context);
+    response?.results?.forEach((result: any) => this.cacheLoggedEntries(result));
+  }
+
   openProfile(message: Message) {
     let objectId = message.context?.objectArray?.[0]?.userId;
     if (message?.content?.toLowerCase().includes("customer"))
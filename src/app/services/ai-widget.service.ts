@@ -1,7 +1,8 @@
 import { HttpClient } from "@angular/common/http";
 import { Injectable } from "@angular/core";
-import { Observable } from "rxjs";
-import { APPLICATION_DATA } from "../shared/constants";
+import { Observable, retry, timer } from "rxjs";
+import { APPLICATION_DATA, LOCAL_STORAGE_KEYS } from "../shared/constants";
+import { generateRandomString } from "../shared/commonFunctions";
 import { Message } from "../../assets/models/AiChat";
 
 @Injectable({
@@ -12,23 +13,74 @@ export class AiWidgetService {
     isWidgetVisible: boolean = false;
     isWidgetOpen: boolean = false;
     aiStatus: 'thinking' | 'ready' | 'error' = 'ready';
+    progressText: string = '';
     messages: Message[] = [{
         content: 'Hello! How can I assist you today?',
         from: 'ai',
         timestamp: Date.now()
     }];
+    // The agent keeps this conversation's recent turns and pending "which one?" under this id
+    private sessionId: string = generateRandomString(24);
 
     constructor(
         private httpClient: HttpClient
     ) { }
 
-    userEnteredPrompt(prompt: string): Observable<any> {
+    // Every retry of this prompt carries the same key, so the agent never logs its entries twice.
+    // A busy agent answers 429 with Retry-After, which is waited out before retrying
+    userEnteredPrompt(prompt: string, idempotencyKey: string = generateRandomString(24)): Observable<any> {
         return this.httpClient.post(APPLICATION_DATA.AI_AGENT_ENDPOINT, { message: prompt }, {
-            headers: { 'Content-Type': 'application/json' }
+            headers: this.headers(idempotencyKey)
+        }).pipe(retry({
+            count: 2,
+            delay: (error: any) => timer(error?.status === 429 ? (Number(error.headers?.get('Retry-After')) || 1) * 1000 : 1000)
+        }));
+    }
+
+    // Same request as userEnteredPrompt, answered as Server-Sent Events: intent / entities / committed / token, then reply
+    streamPrompt(prompt: string, idempotencyKey: string): Observable<AiStreamEvent> {
+        return new Observable<AiStreamEvent>(observer => {
+            const controller = new AbortController();
+            fetch(APPLICATION_DATA.AI_AGENT_STREAM_ENDPOINT, {
+                method: 'POST',
+                headers: this.headers(idempotencyKey),
+                body: JSON.stringify({ message: prompt }),
+                signal: controller.signal
+            }).then(async response => {
+                if (!response.ok || !response.body)
+                    throw new Error(`Stream failed with status ${response.status}`);
+                const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += value;
+                    const frames = buffer.split('\n\n');
+                    buffer = frames.pop() || '';
+                    frames.forEach(frame => {
+                        const event = frame.match(/^event: (.*)$/m)?.[1];
+                        const data = frame.match(/^data: (.*)$/m)?.[1];
+                        if (event && data)
+                            observer.next({ event: event, data: JSON.parse(data) });
+                    });
+                }
+                observer.complete();
+            }).catch(error => observer.error(error));
+            return () => controller.abort();
         });
     }
 
+    // The agent rate limits model-bound messages per user (X-User-Id)
+    private headers(idempotencyKey: string): { [header: string]: string } {
+        const headers: { [header: string]: string } = { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey, 'X-Session-Id': this.sessionId };
+        const userId = JSON.parse(localStorage.getItem(LOCAL_STORAGE_KEYS.AUTH_PROFILE) || 'null')?.user?.uid;
+        if (userId)
+            headers['X-User-Id'] = userId;
+        return headers;
+    }
+
     clearChatHistory() {
+        this.sessionId = generateRandomString(24);
         this.messages = [{
             content: 'Hello! How can I assist you today?',
             from: 'ai',
@@ -37,6 +89,11 @@ export class AiWidgetService {
     }
 }
 
+export interface AiStreamEvent {
+    event: 'intent' | 'entities' | 'committed' | 'token' | 'rejected' | 'reply' | string;
+    data: any;
+}
+
 /*
 fetch('https://cylinder-agent-406734351582.europe-west1.run.app/chat', {
   method: 'POST',
@@ -1,10 +1,13 @@
+import { HttpClient } from "@angular/common/http";
 import { Injectable } from "@angular/core";
+import { retry } from "rxjs";
 import { AngularFireAuth } from "@angular/fire/compat/auth";
 import { FirebaseService } from "./firebase.service";
 import { NotificationService } from "./notification.service";
 import { Customer } from "../../assets/models/Customer";
 import { EntryDataService } from "./entry-data.service";
 import { EntryTransaction } from "../../assets/models/EntryTransaction";
+import { APPLICATION_DATA } from "../shared/constants";
 
 @Injectable({
     providedIn: 'root'
@@ -17,7 +20,8 @@ export class MoveEntryService {
         private afAuth: AngularFireAuth,
         private firebaseService: FirebaseService,
         private notificationService: NotificationService,
-        private entryDataService: EntryDataService
+        private entryDataService: EntryDataService,
+        private httpClient: HttpClient
     ) {
         this.initialize();
     }
@@ -32,49 +36,53 @@ export class MoveEntryService {
     }
 
     moveEntries(data: MoveEntryPayload, targetAccount: Customer, sourceAccount: Customer) {
-        let successCount = 0;
-        let failureCount = 0;
-        let successfulMoves: EntryTransaction[] = [];
-
-        data.transactionIdList.forEach((transactionId: string) => {
-            const entryData = this.entryDataService.getEntryData(transactionId);
-            if (!entryData)
-                failureCount++;
-            else {
-                entryData.data.customer = {
-                    fullName: targetAccount.data.fullName || sourceAccount.data.fullName,
-                    phoneNumber: targetAccount.data.phoneNumber || sourceAccount.data.phoneNumber,
-                    userId: targetAccount.data.userId
-                };
-                entryData.others = {
-                    ...entryData.others,
-                    movedBy: data.movedBy,
-                    movedTime: data.moveTime,
-                    moveIds: [...(entryData.others?.moveIds || []), data.moveId]
-                };
-
-                this.firebaseService.setData(`transactionList/${transactionId}`, entryData).then(() => {
-                    successCount++;
-                    successfulMoves.push(entryData);
-                }).catch(() => {
-                    failureCount++;
-                }).finally(() => {
-                    if (successCount + failureCount === data.transactionIdList.length) {
-                        this.entryDataService.updateMovedEntries(successfulMoves); // update local data after moving
+        // The agent rewrites the entries and logs the move in chunked multi-path updates; the moveId keeps retries from moving twice
+        this.httpClient.post(APPLICATION_DATA.MOVE_ENTRIES_ENDPOINT, data, {
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': data.moveId }
+        }).pipe(retry({ count: 2, delay: 1000 })).subscribe({
+            next: (report: any) => {
+                const movedIds: string[] = report?.transactionIdList || [];
+                const successfulMoves: EntryTransaction[] = [];
+                movedIds.forEach((transactionId: string) => {
+                    const entryData = this.entryDataService.getEntryData(transactionId);
+                    if (entryData)
+                        successfulMoves.push(this.movedEntry(entryData, data, targetAccount, sourceAccount));
+                });
+                this.entryDataService.updateMovedEntries(successfulMoves); // update local data after moving
 
-                        this.notificationService.showNotification({
-                            heading: `Entries moved successfully!`,
-                            message: `${successCount} entries moved successfully, ${failureCount} entries failed to move.`,
-                            duration: 5000,
-                            leftBarColor: failureCount === 0 ? this.notificationService.color.green : successCount === 0 ? this.notificationService.color.red : this.notificationService.color.yellow
-                        });
-                    }
+                const successCount = movedIds.length;
+                const failureCount = data.transactionIdList.length - successCount;
+                this.notificationService.showNotification({
+                    heading: successCount > 0 ? `Entries moved successfully!` : `Entries not moved!`,
+                    message: report?.warning?.text || `${successCount} entries moved successfully, ${failureCount} entries failed to move.`,
+                    duration: 5000,
+                    leftBarColor: failureCount === 0 ? this.notificationService.color.green : successCount === 0 ? this.notificationService.color.red : this.notificationService.color.yellow
+                });
+            },
+            error: () => {
+                this.notificationService.showNotification({
+                    heading: `Entries not moved!`,
+                    message: 'Could not reach the server, please try again.',
+                    duration: 5000,
+                    leftBarColor: this.notificationService.color.red
                 });
             }
         });
+    }
 
-        // log this move in move history
-        this.firebaseService.setData(`moveEntryHistory/${data.moveId}`, data);
+    private movedEntry(entryData: EntryTransaction, data: MoveEntryPayload, targetAccount: Customer, sourceAccount: Customer): EntryTransaction {
+        entryData.data.customer = {
+            fullName: targetAccount.data.fullName || sourceAccount.data.fullName,
+            phoneNumber: targetAccount.data.phoneNumber || sourceAccount.data.phoneNumber,
+            userId: targetAccount.data.userId
+        };
+        entryData.others = {
+            ...entryData.others,
+            movedBy: data.movedBy,
+            movedTime: data.moveTime,
+            moveIds: [...(entryData.others?.moveIds || []), data.moveId]
+        };
+        return entryData;
     }
 }
 
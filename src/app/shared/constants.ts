@@ -19,7 +19,9 @@ export const APPLICATION_DATA = {
   APP_DESCRIPTION: 'Delivery Management App is a web application that allows business owners to track their deliveries, customers and other products.',
   DEVELOPER_NAME: 'Harsh Gupta',
   DEVELOPER_EMAIL: 'harshgupta.code1@gmail.com',
-  AI_AGENT_ENDPOINT: 'https://cylinder-agent-406734351582.europe-west1.run.app/chat' //https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app/
+  AI_AGENT_ENDPOINT: 'https://cylinder-agent-406734351582.europe-west1.run.app/chat', //https://g-event-fuel-flow-default-rtdb.europe-west1.firebasedatabase.app/
+  AI_AGENT_STREAM_ENDPOINT: 'https://cylinder-agent-406734351582.europe-west1.run.app/chat/stream',
+  MOVE_ENTRIES_ENDPOINT: 'https://cylinder-agent-406734351582.europe-west1.run.app/transactions/move'
 }
 
 export const DEFAULT_LOCAL_SETTING: Setting = {